@@ -8,6 +8,7 @@ from lib.structs.proxies.dict_proxy import DictProxy
 from lib.structs.proxies.dir_proxy import DirProxy
 from .config import PYTHON_COMMAND_LINE, APP_ROOT_DIR
 from .scripts import run_help_helper
+from .scripts.benchmarks import run_github_error_path_bench, run_github_transform_bench, run_release_feed_load_bench
 
 
 @click.group()
@@ -59,6 +60,46 @@ def generate_query_dirproxy_def():
     os.remove('tmp/gql.json')
     print(f'Wrote query directory schema to resources/gen/gql_queries_schema.py')
 
+
+@dev.group('bench', help='Microbenchmarks of the bot\'s hot paths')
+def bench():
+    pass
+
+
+@bench.command('github-error-path', help='Compare the cost of describing a failed GitHub query call')
+@click.option('--depth', type=int, default=40, help='The number of frames below the call')
+@click.option('--number', type=int, default=200, help='The number of calls per repetition')
+def bench_github_error_path(depth: int, number: int):
+    run_github_error_path_bench(depth=depth, number=number)
+
+
+@bench.command('github-transform', help='Compare the legacy and compiled flattening of recorded GraphQL responses')
+@click.option('--number', type=int, default=500, help='The number of conversions per repetition')
+def bench_github_transform(number: int):
+    run_github_transform_bench(number=number)
+
+
+@bench.command('release-feed', help='Run release feed worker cycles against a synthetic dataset and stand-in services')
+@click.option('--guilds', type=int, default=2000, help='The number of guilds with a release feed')
+@click.option('--subscriptions', type=int, default=10000, help='The number of (channel, repo) subscriptions')
+@click.option('--repos', type=int, default=5000, help='The number of repos to subscribe to')
+@click.option('--zipf', type=float, default=1.1, help='The exponent of the repo popularity distribution, 0 for uniform')
+@click.option('--channels', type=int, default=3, help='The max number of feed channels per guild')
+@click.option('--cycles', type=int, default=4, help='The number of worker cycles to run')
+@click.option('--interval', type=float, default=10.0, help='The simulated time between cycles in minutes')
+@click.option('--release-rate', type=float, default=0.02, help='The chance of a repo releasing between two cycles')
+@click.option('--missing', type=float, default=0.005, help='The fraction of repos that don\'t exist')
+@click.option('--dead-hooks', type=float, default=0.01, help='The fraction of channels with a deleted webhook')
+@click.option('--github-latency', type=float, default=0.25, help='The GraphQL stand-in\'s response time in seconds')
+@click.option('--webhook-latency', type=float, default=0.05, help='The webhook stand-in\'s response time in seconds')
+@click.option('--delivery-window', type=float, default=None, help='Override of env.release_feed_delivery_window')
+@click.option('--change-detection/--no-change-detection', default=None,
+              help='Override of env.release_feed_change_detection')
+@click.option('--seed', type=int, default=0, help='The seed of the dataset and the releases')
+def bench_release_feed(**kwargs):
+    run_release_feed_load_bench(**kwargs)
+
+
 @dev.command('update', help='Update the local code using git')
 def update():
     if sys.platform == 'win32':
@@ -0,0 +1,4 @@
+from .common import *
+from .github_error_path import *
+from .github_transform import *
+from .release_feed_load import *
@@ -0,0 +1,25 @@
+import timeit
+import click
+from typing import Callable
+
+__all__: tuple = ('time_callables', 'print_timings')
+
+
+def time_callables(callables: dict[str, Callable[[], object]], number: int, repeat: int = 5) -> dict[str, float]:
+    """
+    Time each callable and return the best per-call time in microseconds.
+
+    :param callables: The callables to time, keyed by their display name
+    :param number: The number of calls per repetition
+    :param repeat: The number of repetitions to take the best one out of
+    :return: The best per-call time of each callable in microseconds
+    """
+    return {name: min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1_000_000
+            for name, func in callables.items()}
+
+
+def print_timings(title: str, timings: dict[str, float]) -> None:
+    click.echo(click.style(title, fg='bright_cyan'))
+    baseline: float = next(iter(timings.values()))
+    for name, us in timings.items():
+        click.echo(f'  {name:<32} {us:>12.2f} µs/call  ({baseline / us:.1f}x)')
@@ -0,0 +1,45 @@
+import sys
+import inspect
+from typing import Callable
+from lib.api.github.github import GitHubQueryDescriptor
+from lib.structs.proxies.dir_proxy import DirProxy
+from cli.config import APP_ROOT_DIR
+from .common import time_callables, print_timings
+
+__all__: tuple = ('run_github_error_path_bench',)
+
+
+def _call_at_depth(depth: int, func: Callable[[], object]) -> object:
+    if depth <= 0:
+        return func()
+    return _call_at_depth(depth - 1, func)
+
+
+def run_github_error_path_bench(depth: int = 40, number: int = 200) -> None:
+    """
+    Compare how long it takes to describe a failing GitHubAPI.query call the old way
+    (inspect.stack() + a reverse scan over the loaded queries) and the new way (GitHubQueryDescriptor).
+
+    :param depth: The number of frames to put below the call, to mimic the bot's event loop + command stack
+    :param number: The number of calls per repetition
+    """
+    queries: DirProxy = DirProxy(f'{APP_ROOT_DIR}/resources/queries/', ('.gql', '.graphql'))
+    query_names: dict[str, str] = {content: f'{name}.graphql' for name, content in vars(queries).items()
+                                   if isinstance(content, str)}
+    # the first loaded query is the worst case for the old reverse scan
+    query: str = next(content for content in vars(queries).values() if isinstance(content, str))
+
+    def old() -> tuple:
+        frame = inspect.stack()[1]
+        name: str = next((name for name, content in reversed(vars(queries).items()) if content == query),
+                         '<generated query>')
+        return name, frame.function, f'{frame.filename}:#{frame.lineno}:{frame.function}()'
+
+    def new() -> GitHubQueryDescriptor:
+        caller = sys._getframe(1)  # noqa
+        return GitHubQueryDescriptor(query_names.get(query, '<generated query>'), 'GraphQL', {},
+                                     caller.f_code.co_name, caller.f_code.co_filename, caller.f_lineno)
+
+    print_timings(f'Describing a GitHub query call {depth} frames deep ({len(query_names)} loaded queries)',
+                  time_callables({'inspect.stack() + name scan': lambda: _call_at_depth(depth, old),
+                                  'GitHubQueryDescriptor': lambda: _call_at_depth(depth, new)}, number=number))
@@ -0,0 +1,70 @@
+import os
+import json
+import click
+from typing import Callable
+from lib.api.github.github import _ResponseShape  # noqa
+from lib.api.github.transformations import transform_user, transform_issue, transform_latest_release
+from lib.structs.proxies.dict_proxy import SnakeCaseDictProxy
+from lib.structs.proxies.dir_proxy import DirProxy
+from lib.utils import get_all_dict_paths, get_nested_key, set_nested_key
+from cli.config import APP_ROOT_DIR
+from .common import time_callables, print_timings
+
+__all__: tuple = ('run_github_transform_bench',)
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _legacy_flatten_total_counts(result: dict) -> SnakeCaseDictProxy:
+    result = SnakeCaseDictProxy(result)
+    for path in get_all_dict_paths(result):
+        if path[-1] == 'totalcount':
+            set_nested_key(result, path[:-2] + (f'{path[-2]}_count',), get_nested_key(result, path))
+    return result
+
+
+def _legacy_flatten_nodes(result: dict) -> SnakeCaseDictProxy:
+    result = SnakeCaseDictProxy(result)
+    for path in get_all_dict_paths(result):
+        if path[-1] == 'nodes' and len(get_nested_key(result, path[:-1])) == 1:
+            set_nested_key(result, path[:-2] + (f'{path[-2]}',), get_nested_key(result, path))
+    return result
+
+
+# query name -> (transformer, legacy flattener, new flattener kwargs)
+_CASES: dict[str, tuple[Callable[[dict], dict], Callable[[dict], SnakeCaseDictProxy], dict[str, bool]]] = {
+    'user': (transform_user, _legacy_flatten_total_counts, {'counts': True, 'nodes': False}),
+    'issue': (transform_issue, _legacy_flatten_total_counts, {'counts': True, 'nodes': False}),
+    'latest_releases': (transform_latest_release, _legacy_flatten_nodes, {'counts': False, 'nodes': True})
+}
+
+
+def run_github_transform_bench(number: int = 500) -> None:
+    """
+    Compare the legacy multi-pass flattening (get_all_dict_paths + get/set_nested_key per path, re-wrapped in
+    SnakeCaseDictProxy by every decorator) with the compiled single-pass one, on recorded responses.
+
+    :param number: The number of conversions per repetition
+    """
+    queries: DirProxy = DirProxy(f'{APP_ROOT_DIR}/resources/queries/', ('.gql', '.graphql'))
+    for query_name, (transformer, legacy, flags) in _CASES.items():
+        with open(os.path.join(FIXTURES_DIR, f'{query_name}.json'), encoding='utf-8') as fp:
+            raw: str = fp.read()
+        shape: _ResponseShape = _ResponseShape.compile(getattr(queries, query_name))
+        # the transformers work in-place, so every run decodes its own copy, like a real response
+
+        def baseline() -> dict:
+            return transformer(json.loads(raw))
+
+        def old() -> SnakeCaseDictProxy:
+            return SnakeCaseDictProxy(legacy(transformer(json.loads(raw))))
+
+        def new() -> SnakeCaseDictProxy:
+            return SnakeCaseDictProxy(shape.flatten(transformer(json.loads(raw)), **flags))
+
+        if (legacy_result := old()) != (new_result := new()):
+            click.echo(click.style(f'{query_name}: the outputs differ!', fg='red'))
+            click.echo(f'  legacy: {legacy_result!r}\n  compiled: {new_result!r}')
+        print_timings(f'Flattening a recorded {query_name}.graphql response ({len(raw)} bytes)',
+                      time_callables({'legacy multi-pass': old, 'compiled single-pass': new,
+                                      'decode + transform only': baseline}, number=number))
@@ -0,0 +1,448 @@
+import time
+import random
+import asyncio
+import logging
+import datetime
+import itertools
+import aiohttp
+import discord
+import click
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from types import SimpleNamespace
+from collections import Counter
+from time import perf_counter
+from typing import Optional, Iterable, Any
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import DuplicateKeyError
+from lib.manager import Manager
+from lib.api.github import GitHubAPI
+from lib.api.github.scheduler import GitHubTokenScheduler
+from lib.structs.db.collections.release_feed import ReleaseFeedCollection
+from lib.structs.discord.webhook_queue import WebhookDeliveryQueue
+from lib.typehints import ReleaseFeed, ReleaseFeedItem, ReleaseFeedRepo
+from cogs.backend.workers.release_feed import ReleaseFeedWorker
+
+__all__: tuple = ('run_release_feed_load_bench',)
+
+_MISSING: object = object()
+
+_OPERATORS: dict[str, Any] = {
+    '$in': lambda value, arg: value in arg,
+    '$gt': lambda value, arg: value is not _MISSING and value > arg,
+    '$lte': lambda value, arg: value is not _MISSING and value <= arg,
+    '$exists': lambda value, arg: (value is not _MISSING) == arg,
+    '$mod': lambda value, arg: isinstance(value, int) and value % arg[0] == arg[1],
+}
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        value: Any = document.get(field, _MISSING)
+        if isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _MemoryCursor:
+    def __init__(self, documents: list[dict]):
+        self.documents: list[dict] = documents
+
+    def sort(self, key: str) -> '_MemoryCursor':
+        self.documents.sort(key=lambda document: document[key])
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+class _MemoryCollection:
+    """
+    Just enough of :class:`AsyncIOMotorCollection` for the release feed worker, kept in memory.
+    Only top-level fields can be queried and $set is the only supported update operator - the simulated guilds
+    have no embedded feeds, so the worker's ops aimed at the guilds collection never match anything.
+
+    :param name: The name of the collection
+    :param indexed: The field to look documents up by when a query has an exact match on it, besides _id;
+                    it mustn't be updated, and keeps the stand-in's own cost out of the measurements
+    """
+
+    def __init__(self, name: str, indexed: Optional[str] = None):
+        self.name: str = name
+        self.indexed: Optional[str] = indexed
+        self.documents: dict[Any, dict] = {}
+        self.write_ops: int = 0
+        self._index: dict[Any, dict[Any, dict]] = {}
+        self._ids: itertools.count = itertools.count()
+
+    def _candidates(self, query: dict) -> Iterable[dict]:
+        if '_id' in query and not isinstance(query['_id'], dict):
+            return [self.documents[query['_id']]] if query['_id'] in self.documents else []
+        if self.indexed is not None and self.indexed in query and not isinstance(query[self.indexed], dict):
+            return list(self._index.get(query[self.indexed], {}).values())
+        return self.documents.values()
+
+    def _find(self, query: Optional[dict]) -> list[dict]:
+        return [document for document in self._candidates(query or {}) if _matches(document, query or {})]
+
+    def _insert(self, document: dict) -> None:
+        document.setdefault('_id', next(self._ids))
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.name}')
+        self.documents[document['_id']] = document
+        if self.indexed is not None:
+            self._index.setdefault(document.get(self.indexed), {})[document['_id']] = document
+
+    def _update(self, query: dict, update: dict, upsert: bool = False, many: bool = False) -> Optional[dict]:
+        matched: list[dict] = self._find(query)
+        if (matched or upsert) and (unsupported := set(update) - {'$set'}):
+            raise NotImplementedError(f'{", ".join(unsupported)} is not supported by the in-memory collections')
+        if not matched and upsert:
+            document: dict = {field: condition for field, condition in query.items()
+                              if not field.startswith('$') and not isinstance(condition, dict)}
+            self._insert(document)
+            matched: list[dict] = [document]
+        for document in matched if many else matched[:1]:
+            document.update(update['$set'])
+        return matched[0] if matched else None
+
+    def _delete(self, query: dict, many: bool = False) -> None:
+        for document in self._find(query)[:None if many else 1]:
+            del self.documents[document['_id']]
+            if self.indexed is not None:
+                del self._index[document.get(self.indexed)][document['_id']]
+
+    async def create_index(self, *args, **kwargs) -> None:
+        pass
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> _MemoryCursor:
+        return _MemoryCursor([dict(document) for document in self._find(query)])
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        return next(iter(self._find(query)), None)
+
+    async def insert_many(self, documents: Iterable[dict]) -> None:
+        for document in documents:
+            self.write_ops += 1
+            self._insert(dict(document))
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False) -> None:
+        self.write_ops += 1
+        self._update(query, update, upsert)
+
+    async def update_many(self, query: dict, update: dict) -> None:
+        self.write_ops += 1
+        self._update(query, update, many=True)
+
+    async def find_one_and_update(self, query: dict, update: dict, upsert: bool = False, **kwargs) -> Optional[dict]:
+        self.write_ops += 1
+        return self._update(query, update, upsert)
+
+    async def delete_one(self, query: dict) -> None:
+        self.write_ops += 1
+        self._delete(query)
+
+    async def delete_many(self, query: dict) -> None:
+        self.write_ops += 1
+        self._delete(query, many=True)
+
+    async def bulk_write(self, ops: list, ordered: bool = True) -> None:
+        self.write_ops += len(ops)
+        for op in ops:  # noqa, the ops' fields aren't public
+            if isinstance(op, InsertOne):
+                self._insert(dict(op._doc))
+            elif isinstance(op, ReplaceOne):
+                self._delete(op._filter)
+                self._insert({**op._doc, '_id': op._filter['_id']})
+            elif isinstance(op, (UpdateOne, UpdateMany)):
+                if op._array_filters is None:
+                    self._update(op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany))
+                elif self._find(op._filter):
+                    raise NotImplementedError('array filters are not supported by the in-memory collections')
+            elif isinstance(op, (DeleteOne, DeleteMany)):
+                self._delete(op._filter, many=isinstance(op, DeleteMany))
+
+
+class _MemoryReleaseFeedCollection(_MemoryCollection):
+    get_all_feeds = ReleaseFeedCollection.get_all_feeds
+    to_documents = staticmethod(ReleaseFeedCollection.to_documents)
+    to_feed = staticmethod(ReleaseFeedCollection.to_feed)
+    _partition_filter = staticmethod(ReleaseFeedCollection._partition_filter)  # noqa
+    tag_update_ops = staticmethod(ReleaseFeedCollection.tag_update_ops)
+    repo_removal_ops = staticmethod(ReleaseFeedCollection.repo_removal_ops)
+    hook_removal_ops = staticmethod(ReleaseFeedCollection.hook_removal_ops)
+
+    def __init__(self, db: '_MemoryDatabase'):
+        self.db: '_MemoryDatabase' = db
+        super().__init__('release_feed', indexed='guild_id')
+
+
+class _MemoryDatabase:
+    def __init__(self):
+        self.guilds: _MemoryCollection = _MemoryCollection('guilds')
+        self.release_feed: _MemoryReleaseFeedCollection = _MemoryReleaseFeedCollection(self)
+        self.release_feed_schedule: _MemoryCollection = _MemoryCollection('release_feed_schedule')
+        self.release_feed_leases: _MemoryCollection = _MemoryCollection('release_feed_leases')
+
+    @property
+    def collections(self) -> tuple[_MemoryCollection, ...]:
+        return self.guilds, self.release_feed, self.release_feed_schedule, self.release_feed_leases
+
+
+class _SimulatedRepo:
+    __slots__: tuple = ('name', 'exists', 'releases', 'released_at', 'color')
+
+    def __init__(self, name: str, exists: bool, released_at: float, color: Optional[str]):
+        self.name: str = name
+        self.exists: bool = exists
+        self.releases: int = 1
+        self.released_at: float = released_at
+        self.color: Optional[str] = color
+
+    @property
+    def tag(self) -> str:
+        return f'v1.{self.releases}.0'
+
+    def to_node(self) -> dict:
+        return {
+            'url': f'https://github.com/{self.name}',
+            'usesCustomOpenGraphImage': False,
+            'openGraphImageUrl': f'https://opengraph.githubassets.com/1/{self.name}',
+            'primaryLanguage': {'color': self.color} if self.color else None,
+            'latestRelease': {
+                'isDraft': False,
+                'releaseAssets': {'totalCount': self.releases % 4},
+                'descriptionHTML': f'<h2>{self.tag}</h2><ul>' + '<li>Fixed a <code>bug</code></li>' * 12 + '</ul>',
+                'tagName': self.tag,
+                'url': f'https://github.com/{self.name}/releases/tag/{self.tag}',
+                'createdAt': datetime.datetime.fromtimestamp(self.released_at, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'publishedAt': datetime.datetime.fromtimestamp(self.released_at, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'isPrerelease': self.releases % 5 == 0,
+                'isLatest': True,
+                'name': self.tag,
+                'author': {'login': self.name.split('/')[0], 'url': f'https://github.com/{self.name.split("/")[0]}'}
+            }
+        }
+
+
+class _StandInServices:
+    """
+    GitHub's GraphQL and latest release REST endpoints and Discord's webhook endpoint, served in-process.
+
+    :param repos: Lowercase repo name -> repo
+    :param dead_hooks: The webhooks that respond with 404 Unknown Webhook
+    :param github_latency: The time it takes to answer a GraphQL request in seconds
+    :param webhook_latency: The time it takes to answer a webhook request in seconds
+    """
+
+    def __init__(self, repos: dict[str, _SimulatedRepo], dead_hooks: set[str], github_latency: float,
+                 webhook_latency: float):
+        self.repos: dict[str, _SimulatedRepo] = repos
+        self.dead_hooks: set[str] = dead_hooks
+        self.github_latency: float = github_latency
+        self.webhook_latency: float = webhook_latency
+        self.stats: Counter[str] = Counter()
+        self.app: web.Application = web.Application()
+        self.app.router.add_post('/graphql', self.graphql)
+        self.app.router.add_get('/repos/{owner}/{name}/releases/latest', self.latest_release)
+        self.app.router.add_post('/api/webhooks/{hook_id}/{hook_token}', self.webhook)
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        body: dict = await request.json()
+        variables: dict[str, str] = body['variables']
+        await asyncio.sleep(self.github_latency)
+        data: dict = {}
+        errors: list[dict] = []
+        for i in range(len(variables) // 2):
+            repo: Optional[_SimulatedRepo] = self.repos.get(f'{variables[f"Owner{i}"]}/{variables[f"Name{i}"]}'.lower())
+            if repo is not None and repo.exists:
+                data[f'r{i}'] = repo.to_node()
+            else:
+                data[f'r{i}'] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [f'r{i}'],
+                               'message': f'Could not resolve to a Repository with the name \'{variables[f"Name{i}"]}\'.'})
+        data['rateLimit'] = {'cost': 1, 'remaining': 5000 - self.stats['github_requests'], 'limit': 5000}
+        self.stats['github_requests'] += 1
+        self.stats['github_repos'] += len(variables) // 2
+        return web.json_response({'data': data, **({'errors': errors} if errors else {})})
+
+    async def latest_release(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.github_latency)
+        self.stats['rest_requests'] += 1
+        repo: Optional[_SimulatedRepo] = self.repos.get(f'{request.match_info["owner"]}/{request.match_info["name"]}')
+        if repo is None or not repo.exists:
+            return web.json_response({'message': 'Not Found'}, status=404)
+        if request.headers.get('If-None-Match') == (etag := f'W/"{repo.name.lower()}@{repo.tag}"'):
+            self.stats['rest_not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.json_response({'tag_name': repo.tag, 'name': repo.tag, 'body': '- Fixed a `bug`\n' * 12},
+                                 headers={'ETag': etag})
+
+    async def webhook(self, request: web.Request) -> web.Response:
+        payload: dict = await request.json()
+        await asyncio.sleep(self.webhook_latency)
+        if f'{request.match_info["hook_id"]}/{request.match_info["hook_token"]}' in self.dead_hooks:
+            self.stats['webhook_rejected'] += 1
+            return web.json_response({'message': 'Unknown Webhook', 'code': 10015}, status=404)
+        self.stats['webhook_messages'] += 1
+        self.stats['webhook_embeds'] += len(payload['embeds'])
+        return web.Response(status=204)
+
+
+class _StandInDeliveryQueue(WebhookDeliveryQueue):
+    def __init__(self, base_url: str, *args, **kwargs):
+        self.base_url: str = base_url
+        super().__init__(*args, **kwargs)
+
+    async def _post(self, hook: str, batch: list) -> None:
+        payload: dict = {'content': batch[0].text, 'embeds': [item.embed.to_dict() for item in batch],
+                         'username': batch[0].username, 'avatar_url': batch[0].avatar_url}
+        async with self.session.post(f'{self.base_url}/api/webhooks/{hook}', json=payload) as response:
+            if response.status >= 400:
+                raise {403: discord.Forbidden, 404: discord.NotFound}.get(response.status, discord.HTTPException)(
+                    response, await response.text()
+                )
+
+
+def _build_dataset(rng: random.Random, now: float, guilds: int, subscriptions: int, repos: int, zipf: float,
+                   channels: int, missing: float, dead_hooks: float) -> tuple[dict[str, _SimulatedRepo],
+                                                                              dict[int, ReleaseFeed], set[str]]:
+    simulated: list[_SimulatedRepo] = [
+        _SimulatedRepo(f'Owner{i // 10}/Repo{i}', exists=rng.random() >= missing,
+                       released_at=now - rng.uniform(1, 60) * 24 * 60 * 60,
+                       color=rng.choice((None, '#3572A5', '#f1e05a', '#dea584', '#00ADD8')))
+        for i in range(repos)
+    ]
+    # the popularity of the k-th repo is proportional to 1/k^zipf
+    cum_weights: list[float] = list(itertools.accumulate(1 / (k + 1) ** zipf for k in range(repos)))
+    feeds: dict[int, ReleaseFeed] = {}
+    for guild_id in rng.sample(range(10 ** 17, 10 ** 18), guilds):
+        feeds[guild_id] = [ReleaseFeedItem(cid=guild_id + c, hook=f'{guild_id + c}/token{c}',
+                                           mention=rng.choice((None, None, 'everyone', guild_id)), repos=[])
+                           for c in range(rng.randint(1, channels))]
+    guild_ids: list[int] = list(feeds)
+    for _ in range(subscriptions):
+        rfi: ReleaseFeedItem = rng.choice(feeds[rng.choice(guild_ids)])
+        repo: _SimulatedRepo = rng.choices(simulated, cum_weights=cum_weights)[0]
+        if all(rfr['name'] != repo.name for rfr in rfi['repos']):  # (guild, channel, repo) is unique
+            rfi['repos'].append(ReleaseFeedRepo(name=repo.name, tag=repo.tag))
+    hooks: list[str] = [rfi['hook'] for feed in feeds.values() for rfi in feed]
+    return ({repo.name.lower(): repo for repo in simulated}, feeds,
+            set(rng.sample(hooks, round(len(hooks) * dead_hooks))))
+
+
+async def _run(guilds: int, subscriptions: int, repos: int, zipf: float, channels: int, cycles: int,
+               interval: float, release_rate: float, missing: float, dead_hooks: float, github_latency: float,
+               webhook_latency: float, delivery_window: Optional[float], change_detection: Optional[bool],
+               seed: int) -> None:
+    rng: random.Random = random.Random(seed)
+    clock: list[float] = [time.time()]
+    simulated, feeds, dead = _build_dataset(rng, clock[0], guilds, subscriptions, repos, zipf, channels,
+                                            missing, dead_hooks)
+    services: _StandInServices = _StandInServices(simulated, dead, github_latency, webhook_latency)
+    db: _MemoryDatabase = _MemoryDatabase()
+    for guild_id, feed in feeds.items():
+        await db.release_feed.insert_many(db.release_feed.to_documents(guild_id, feed))
+    subscription_count: int = sum(len(rfi['repos']) for feed in feeds.values() for rfi in feed)
+    repo_counts: Counter[str] = Counter(rfr['name'] for feed in feeds.values() for rfi in feed for rfr in rfi['repos'])
+    top: int = sum(count for _, count in repo_counts.most_common(max(len(repo_counts) // 100, 1)))
+    click.echo(click.style(f'Release feed load simulation: {guilds} guilds, '
+                           f'{sum(map(len, feeds.values()))} channels ({len(dead)} with dead webhooks), '
+                           f'{subscription_count} subscriptions to {len(repo_counts)} repos '
+                           f'(the top 1% of repos hold {top / subscription_count:.0%})', fg='bright_cyan'))
+
+    logger: logging.Logger = logging.getLogger('gitbot.bench')
+    logger.setLevel(logging.ERROR)
+    bot: SimpleNamespace = SimpleNamespace(logger=logger, user=SimpleNamespace(
+        name='GitBot', avatar=SimpleNamespace(url='https://cdn.discordapp.com/avatars/0/0.png')))
+    bot.mgr = Manager(bot, None)
+    bot.mgr.env.run_release_feed_worker = False
+    if delivery_window is not None:
+        bot.mgr.env.release_feed_delivery_window = delivery_window
+    if change_detection is not None:
+        bot.mgr.env.release_feed_change_detection = change_detection
+    async with TestServer(services.app) as server, aiohttp.ClientSession() as session:
+        base_url: str = str(server.make_url('')).rstrip('/')
+        bot.session, bot.db = session, db
+        bot.github_scheduler = GitHubTokenScheduler((GitHubAPI(bot, 'bench-main', session, base_url=base_url),
+                                                     GitHubAPI(bot, 'bench-secondary', session, base_url=base_url)))
+        worker: ReleaseFeedWorker = ReleaseFeedWorker(bot)  # noqa, the worker only needs what's simulated
+        worker.clock = lambda: clock[0]
+        worker.delivery_queue = _StandInDeliveryQueue(base_url, session, window=bot.mgr.env.release_feed_delivery_window,
+                                                      concurrency=bot.mgr.env.release_feed_webhook_concurrency)
+        click.echo(f'  {"cycle":>5} {"wall":>8} {"rest checks":>12} {"304s":>6} {"graphql calls":>14} {"repos":>7} '
+                   f'{"db write ops":>13} {"webhook sends":>14} {"embeds":>7} {"rejected":>9} {"subscriptions":>14}')
+        totals: Counter[str] = Counter()
+        for cycle in range(1, cycles + 1):
+            if cycle > 1:
+                clock[0] += interval * 60
+                for repo in simulated.values():
+                    if repo.exists and rng.random() < release_rate:
+                        repo.releases += 1
+                        repo.released_at = clock[0] - rng.uniform(0, interval * 60)
+            services.stats.clear()
+            writes: dict[str, int] = {collection.name: collection.write_ops for collection in db.collections}
+            start: float = perf_counter()
+            await worker.release_feed_worker.coro(worker)
+            wall: float = perf_counter() - start
+            written: int = sum(collection.write_ops - writes[collection.name] for collection in db.collections)
+            remaining: int = sum(document['repo'] is not None for document in db.release_feed.documents.values())
+            click.echo(f'  {cycle:>5} {wall:>7.2f}s {services.stats["rest_requests"]:>12} '
+                       f'{services.stats["rest_not_modified"]:>6} {services.stats["github_requests"]:>14} '
+                       f'{services.stats["github_repos"]:>7} {written:>13} {services.stats["webhook_messages"]:>14} '
+                       f'{services.stats["webhook_embeds"]:>7} {services.stats["webhook_rejected"]:>9} {remaining:>14}')
+            totals.update(services.stats)
+            totals.update({'wall': wall, 'writes': written})
+        click.echo(f'  {"total":>5} {totals["wall"]:>7.2f}s {totals["rest_requests"]:>12} '
+                   f'{totals["rest_not_modified"]:>6} {totals["github_requests"]:>14} '
+                   f'{totals["github_repos"]:>7} {totals["writes"]:>13} {totals["webhook_messages"]:>14} '
+                   f'{totals["webhook_embeds"]:>7} {totals["webhook_rejected"]:>9}')
+        await worker.leases.release()
+
+
+def run_release_feed_load_bench(guilds: int = 2000,
+                                subscriptions: int = 10000,
+                                repos: int = 5000,
+                                zipf: float = 1.1,
+                                channels: int = 3,
+                                cycles: int = 4,
+                                interval: float = 10.0,
+                                release_rate: float = 0.02,
+                                missing: float = 0.005,
+                                dead_hooks: float = 0.01,
+                                github_latency: float = 0.25,
+                                webhook_latency: float = 0.05,
+                                delivery_window: Optional[float] = None,
+                                change_detection: Optional[bool] = None,
+                                seed: int = 0) -> None:
+    """
+    Drive the release feed worker through a few cycles against a synthetic dataset, with GitHub's GraphQL API
+    and Discord's webhooks stood in for by an in-process server and the database by in-memory collections,
+    and report the wall time, GitHub calls, database writes and webhook sends of every cycle.
+
+    :param guilds: The number of guilds with a release feed
+    :param subscriptions: The number of (channel, repo) subscriptions to draw (duplicates within a channel are dropped)
+    :param repos: The number of repos to draw the subscriptions from
+    :param zipf: The exponent of the repo popularity distribution, 0 for uniform
+    :param channels: The max number of feed channels per guild
+    :param cycles: The number of worker cycles to run
+    :param interval: The simulated time between cycles in minutes
+    :param release_rate: The chance of a repo publishing a new release between two cycles
+    :param missing: The fraction of repos that don't exist (anymore)
+    :param dead_hooks: The fraction of channels whose webhook was deleted
+    :param github_latency: The response time of the GraphQL stand-in in seconds
+    :param webhook_latency: The response time of the webhook stand-in in seconds
+    :param delivery_window: Override of env.release_feed_delivery_window
+    :param change_detection: Override of env.release_feed_change_detection
+    :param seed: The seed of the dataset and the releases
+    """
+    asyncio.run(_run(guilds, subscriptions, repos, zipf, channels, cycles, interval, release_rate, missing,
+                     dead_hooks, github_latency, webhook_latency, delivery_window, change_detection, seed))
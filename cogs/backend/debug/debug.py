@@ -4,9 +4,13 @@ import discord.ext.commands as commands
 import discord
 import datetime as dt
 import ast
+from typing import Optional
 from lib.utils.decorators import restricted, gitbot_command
 from lib.structs import GitBotEmbed, GitBot
 from lib.structs.discord.context import GitBotContext
+from lib.api.github import GitHubAPI, GitHubMetrics
+from lib.structs.db.collections import UsersCollection, GuildsCollection
+from lib.structs.db.monitoring import DatabaseMetrics, CommandMetrics
 
 
 def insert_returns(body):
@@ -66,6 +70,112 @@ class Debug(commands.Cog):
         embed.add_field(name='Search',
                         value=f"{used_search}/{len(data) * 30}\n\
                         `{dt.datetime.fromtimestamp(search[0]['reset']).strftime('%X')}`")
+        embed.add_field(name='Tracked budget',
+                        value='\n'.join(f'`#{i}` ' + ' | '.join(f'{pool}: {budget.remaining}/{budget.limit}'
+                                                                  for pool, budget in gh.rate_limits.items())
+                                         for i, gh in enumerate(self.bot._internal_github_instances)),
+                        inline=False)
+        inflight_stats: dict[str, int] = GitHubAPI.inflight_stats
+        embed.append_footer(f'Coalesced calls: {inflight_stats["coalesced"]}/'
+                            f'{inflight_stats["coalesced"] + inflight_stats["leaders"]}')
+        await ctx.send(embed=embed)
+
+    @restricted()
+    @gitbot_command(name='ghcache', aliases=['github-cache'], hidden=True)
+    async def github_cache_command(self, ctx: GitBotContext) -> None:
+        embed: GitBotEmbed = GitBotEmbed(
+            title=f'{self.bot.mgr.e.github}  GitHub object cache',
+            description='\n'.join(f'`{name}` {len(partition)}/{partition.maxsize} · {partition.max_age}s · '
+                                   f'{partition.hits}+{partition.persistent_hits}/'
+                                   f'{partition.hits + partition.persistent_hits + partition.misses} hits '
+                                   f'({partition.hit_rate:.0%})'
+                                   for name, partition in GitHubAPI.github_object_cache.items()),
+            footer=f'Negative cache: {len(GitHubAPI.negative_cache)}/{GitHubAPI.negative_cache.maxsize} '
+                   f'· {GitHubAPI.negative_cache.max_age}s\n'
+                   f'Persistent cache: {len(self.bot.persistent_cache)}/{self.bot.persistent_cache.max_entries} '
+                   f'· {self.bot.persistent_cache.hits}/{self.bot.persistent_cache.hits + self.bot.persistent_cache.misses}'
+                   f' hits'
+        )
+        await ctx.send(embed=embed)
+
+    @restricted()
+    @gitbot_command(name='dbcache', aliases=['db-cache'], hidden=True)
+    async def db_cache_command(self, ctx: GitBotContext) -> None:
+        collections: dict[str, UsersCollection | GuildsCollection] = {'users': self.bot.db.users,
+                                                                       'guilds': self.bot.db.guilds}
+        embed: GitBotEmbed = GitBotEmbed(
+            title='Database document cache',
+            description='\n'.join(f'`{name}` {len(c.document_cache)}/{c.document_cache.maxsize} · '
+                                   f'{c.document_cache.max_age}s · {c.hits}/{c.hits + c.misses} hits '
+                                   f'({c.hit_rate:.0%})'
+                                   for name, c in collections.items()),
+            footer='\n'.join(f'{name} map: {len(m)} entries · {m.nbytes // 1024} KiB'
+                              + ('' if m.complete else ' · not loaded')
+                              for name in ('locale', 'autoconv') if (m := self.bot.get_cache(name)) is not None)
+        )
+        await ctx.send(embed=embed)
+
+    @restricted()
+    @gitbot_command(name='dbstats', aliases=['db-stats', 'dbmetrics'], hidden=True)
+    async def db_stats_command(self, ctx: GitBotContext, action: Optional[str] = None) -> None:
+        metrics: DatabaseMetrics = self.bot.db.metrics
+        if action == 'reset':
+            metrics.clear()
+            await ctx.success('Reset the database command metrics.')
+            return
+        commands_, slow = metrics.snapshot()
+        pool_wait: Optional[CommandMetrics] = commands_.pop(DatabaseMetrics.__pool_wait_key__, None)
+        top: list = sorted(commands_.items(), key=lambda item: item[1].latency_sum, reverse=True)[:15]
+        embed: GitBotEmbed = GitBotEmbed(
+            title='Database command metrics',
+            description='\n'.join(f'`{collection}.{command}` {m.calls} calls · '
+                                  f'{m.percentile(50) * 1000:.1f}/{m.percentile(95) * 1000:.1f}/'
+                                  f'{m.percentile(99) * 1000:.1f}ms · {m.latency_sum:.1f}s total'
+                                  + (f' · {sum(m.failures.values())} failed ({", ".join(m.failures)})'
+                                     if m.failures else '')
+                                  for (collection, command), m in top) or 'No commands recorded yet.',
+            footer=(f'Pool wait: {pool_wait.percentile(50) * 1000:.1f}/{pool_wait.percentile(95) * 1000:.1f}/'
+                    f'{pool_wait.percentile(99) * 1000:.1f}ms over {pool_wait.calls} checkouts'
+                    + (f', {sum(pool_wait.failures.values())} failed' if pool_wait.failures else '')
+                    if pool_wait is not None else 'Pool wait: no checkouts recorded yet')
+                   + '\np50/p95/p99 latency, sorted by total time'
+        )
+        if slow:
+            embed.add_field(name=f'Slow commands (≥{metrics.slow_threshold * 1000:.0f}ms)',
+                            value='\n'.join(f'<t:{int(s.finished_at)}:T> `{s.collection}.{s.command}` '
+                                            f'{s.duration * 1000:.0f}ms'
+                                            + (f' `{{{", ".join(s.shape)}}}`' if s.shape else '')
+                                            + (f' · {s.failure}' if s.failure else '')
+                                            for s in reversed(slow[-10:])),
+                            inline=False)
+        await ctx.send(embed=embed)
+
+    @restricted()
+    @gitbot_command(name='ghmetrics', aliases=['github-metrics'], hidden=True)
+    async def github_metrics_command(self, ctx: GitBotContext, action: Optional[str] = None) -> None:
+        metrics: GitHubMetrics = GitHubAPI.metrics
+        if action == 'export':
+            metrics.export(self.bot.mgr.env.github_metrics_export_path)
+            await ctx.success(f'Exported the metrics of {len(metrics.queries)} queries to '
+                              f'`{self.bot.mgr.env.github_metrics_export_path}`')
+            return
+        elif action == 'reset':
+            metrics.clear()
+            await ctx.success('Reset the GitHub query metrics.')
+            return
+        tokens: dict[str, int] = {gh.token_fingerprint: i for i, gh in enumerate(self.bot._internal_github_instances)}
+        top: list = sorted(metrics.queries.items(), key=lambda item: item[1].calls, reverse=True)[:15]
+        embed: GitBotEmbed = GitBotEmbed(
+            title=f'{self.bot.mgr.e.github}  GitHub query metrics',
+            description='\n'.join(f'`{query}` `#{tokens.get(token, token)}` {m.calls} calls · '
+                                   f'{m.percentile(50) * 1000:.0f}/{m.percentile(95) * 1000:.0f}/'
+                                   f'{m.percentile(99) * 1000:.0f}ms · '
+                                   f'{m.cache_hits / m.calls:.0%} cached · {m.graphql_cost} pts · '
+                                   f'{m.response_bytes / 1024:.0f}KiB'
+                                   + (f' · {sum(m.errors.values())} errors ({", ".join(m.errors)})' if m.errors else '')
+                                   for (query, token), m in top) or 'No calls recorded yet.',
+            footer='p50/p95/p99 latency · "ghmetrics export" writes OpenMetrics text'
+        )
         await ctx.send(embed=embed)
 
     @commands.is_owner()
@@ -63,6 +63,10 @@ async def silent_snippet_command(ctx: GitBotContext) -> Optional[discord.Message
 
 @silence_errors
 async def handle_codeblock_message(ctx: GitBotContext) -> Optional[discord.Message]:
+    config: AutomaticConversionSettings = await ctx.bot.db.guilds.get_autoconv_config(ctx)  # noqa
+    if not (config.get('codeblock') or config.get('gh_lines')):  # nothing to answer with, don't look the locale up
+        return None
+    await ctx.prepare()
     return await ctx.invoke(silent_snippet_command)
 
 
@@ -100,6 +104,9 @@ async def resolve_url_command(ctx: GitBotContext) -> Optional[discord.Message]:
 
 @silence_errors
 async def handle_link_message(ctx: GitBotContext) -> Optional[discord.Message]:
+    if not (await ctx.bot.db.guilds.get_autoconv_config(ctx)).get('gh_url'):
+        return None
+    await ctx.prepare()
     ctx.__silence_error_calls__ = True
     ctx.send = functools.partial(ctx.send, reference=ctx.message, mention_author=False)
     return await resolve_url_command(ctx)
@@ -2,6 +2,7 @@ import discord
 from datetime import date
 from discord.ext import commands
 from lib.structs import GitBotEmbed
+from lib.utils import regex
 from lib.structs.discord.context import GitBotContext
 from lib.structs.discord.bot import GitBot
 from ._event_tools import build_guild_embed, handle_codeblock_message, handle_link_message  # noqa
@@ -45,6 +46,7 @@ class Events(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild) -> None:
         await self.bot.db.guilds.find_one_and_delete({'_id': guild.id})
+        await self.bot.db.release_feed.delete_many({'guild_id': guild.id})
         try:
             self.bot.del_cache_value('autoconv', guild.id)
         except KeyError:
@@ -53,14 +55,31 @@ class Events(commands.Cog):
         self.bot.logger.info('Removed from guild %s (%d) Now in %d guilds', guild.name, guild.id, len(self.bot.guilds))
         await embed_l.send(self.bot.get_channel(775042132054376448))
 
+    def may_need_handling(self, message: discord.Message) -> bool:
+        """
+        Cheaply tell whether a message could be handled by on_message at all - mentions the bot, replies to it,
+        has a codeblock or a link that could be converted - so that plain chat messages are dropped
+        before a context is created. Commands are processed separately, by the bot itself.
+
+        :param message: The message to check
+        :return: Whether the message could need handling
+        """
+        content: str = message.content
+        return (self.bot.user in message.mentions
+                or '```' in content
+                or (content.startswith('`') and content.endswith('`'))
+                or regex.AUTOMATIC_CONVERSION_PREFILTER_RE.search(content) is not None
+                or self.bot.mgr.getopt(message, 'reference.cached_message.author.id') == self.bot.user.id)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
-        if message.author.bot:
+        if message.author.bot or not self.may_need_handling(message):
             return
         ctx: GitBotContext = await self.bot.get_context(message)
         if await self.bot.mgr.verify_send_perms(message.channel) and ctx.command is None:
             # only the bot is mentioned, not a reply, and the message is exactly 21 characters long (just the mention)
             if all([self.bot.user in message.mentions, message.reference is None, len(message.content) == 21]):
+                await ctx.prepare()
                 embed: GitBotEmbed = GitBotEmbed(
                     color=self.bot.mgr.c.rounded,
                     description=ctx.l.events.mention,
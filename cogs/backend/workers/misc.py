@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import statcord
 from discord.ext import commands, tasks
@@ -14,6 +15,8 @@ class MiscellaneousBackgroundTasks(commands.Cog):
     def __init__(self, bot: GitBot):
         self.bot: GitBot = bot
         self.status_changer.start()
+        self.compact_map_reloader.change_interval(seconds=self.bot.mgr.env.compact_map_reload_interval)
+        self.compact_map_reloader.start()
         self.raw_presences = self.bot.mgr.load_json('presences')
         self.make_presences()
         if self.bot.mgr.env.production:
@@ -45,6 +48,19 @@ class MiscellaneousBackgroundTasks(commands.Cog):
     async def wait_for_ready(self):
         await self.bot.wait_until_ready()
 
+    @tasks.loop(seconds=300)  # the actual interval is set from env.compact_map_reload_interval
+    async def compact_map_reloader(self):
+        # the maps only see this process' writes, the ones made by other processes are picked up here
+        try:
+            await self.bot.reload_compact_maps()
+        except Exception as e:  # the maps stay as they are until the next attempt
+            self.bot.logger.error('Failed to reload the locale and autoconv maps: %s', e)
+
+    @compact_map_reloader.before_loop
+    async def compact_map_reloader_before_loop(self):
+        await self.bot.wait_until_ready()
+        await asyncio.sleep(self.bot.mgr.env.compact_map_reload_interval)  # they were just loaded on startup
+
     @commands.Cog.listener()
     async def on_command(self, ctx: GitBotContext):
         if self.bot.mgr.env.production:
@@ -1,18 +1,311 @@
+import os
+import time
+import math
+import heapq
+import random
+import socket
 import discord
+import asyncio
 import datetime
+from time import perf_counter
 from os import environ
-from bs4 import BeautifulSoup
-from typing import Optional
+from uuid import uuid4
+from typing import Optional, Iterable, Callable
 from discord.ext import tasks, commands
+from pymongo import ReplaceOne, DeleteOne, DeleteMany, UpdateOne
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from lib.structs import BaseCache
+from lib.structs.db.collections import GuildsCollection
 from lib.structs.discord.bot import GitBot
-from lib.typehints import ReleaseFeedItem, ReleaseFeedRepo, GitBotGuild, TagNameUpdateData
+from lib.structs.discord.webhook_queue import WebhookDeliveryQueue
+from lib.api.github import GitHubAPI, LatestReleaseTagCheck
+from lib.utils.html_utils import html_to_text
+from lib.typehints import ReleaseFeed, ReleaseFeedItem, ReleaseFeedRepo, GitBotGuild, TagNameUpdateData, ReleaseFeedSubscription
+
+# collection name -> (guild ID, op) pairs of the write ops waiting to be flushed
+PendingWrites = dict[str, list[tuple[int, UpdateOne | DeleteOne | DeleteMany]]]
+
+
+class RepoPollState:
+    """
+    What the release poll scheduler knows about a single repo.
+
+    :param repo: The lowercase name of the repo
+    :param next_check: The UNIX timestamp at which the repo should be checked next
+    :param tag: The last seen tag name of the repo's latest release
+    :param released_at: The UNIX timestamp of the repo's latest release
+    :param cadence: The EWMA of the time between the repo's releases in seconds
+    :param etag: The ETag of the repo's latest release as returned by the REST API, see ReleaseFeedWorker.detect_changes
+    :param etag_tag: The tag name the ETag was received with
+    """
+
+    __slots__: tuple = ('repo', 'next_check', 'tag', 'released_at', 'cadence', 'etag', 'etag_tag')
+
+    def __init__(self,
+                 repo: str,
+                 next_check: float = 0.0,
+                 tag: Optional[str] = None,
+                 released_at: Optional[float] = None,
+                 cadence: Optional[float] = None,
+                 etag: Optional[str] = None,
+                 etag_tag: Optional[str] = None):
+        self.repo: str = repo
+        self.next_check: float = next_check
+        self.tag: Optional[str] = tag
+        self.released_at: Optional[float] = released_at
+        self.cadence: Optional[float] = cadence
+        self.etag: Optional[str] = etag
+        self.etag_tag: Optional[str] = etag_tag
+
+    def to_document(self) -> dict:
+        return {'_id': self.repo, 'next_check': self.next_check, 'tag': self.tag,
+                'released_at': self.released_at, 'cadence': self.cadence, 'etag': self.etag, 'etag_tag': self.etag_tag}
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'RepoPollState':
+        return cls(document['_id'], document['next_check'], document.get('tag'),
+                   document.get('released_at'), document.get('cadence'), document.get('etag'), document.get('etag_tag'))
+
+
+class ReleasePollScheduler:
+    """
+    A priority queue of repo next-check times, derived from every repo's release cadence,
+    so that the worker spends its GitHub budget on the repos that are likely to have changed.
+    Repos with no known cadence yet (fewer than two observed releases) are checked every max interval.
+    The state is persisted in a collection, one document per repo.
+
+    :param min_interval: The min time between checks of a single repo in seconds
+    :param max_interval: The max time between checks of a single repo in seconds
+    """
+
+    # the weight of the newest observed gap between releases in the cadence EWMA
+    __cadence_weight__: float = 0.3
+    # the fraction of the cadence to wait between checks
+    __interval_fraction__: float = 0.02
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.states: dict[str, RepoPollState] = {}
+        self.loaded: bool = False
+        self._heap: list[tuple[float, str]] = []
+        self._dirty: set[str] = set()
+        # repo -> the next check it was last scheduled for, see save()
+        self._forgotten: dict[str, float] = {}
+
+    def _push(self, state: RepoPollState) -> None:
+        heapq.heappush(self._heap, (state.next_check, state.repo))
+        self._dirty.add(state.repo)
+
+    def interval(self, state: RepoPollState) -> float:
+        """
+        Get the time to wait before checking a repo again.
+
+        :param state: The state of the repo
+        :return: The interval in seconds
+        """
+        if state.cadence is None:
+            return self.max_interval
+        return min(max(state.cadence * self.__interval_fraction__, self.min_interval), self.max_interval)
+
+    def due(self, repos: Iterable[str], now: float) -> list[str]:
+        """
+        Get the repos that should be checked now - the ones that are due and the ones that were never checked.
+
+        :param repos: The lowercase names of all the subscribed repos
+        :param now: The current UNIX timestamp
+        :return: The repos to check
+        """
+        repos: set[str] = set(repos)
+        due: list[str] = [repo for repo in repos if repo not in self.states]
+        while self._heap and self._heap[0][0] <= now:
+            next_check, repo = heapq.heappop(self._heap)
+            if (state := self.states.get(repo)) is None or state.next_check != next_check:
+                continue  # stale heap entry, the repo has been rescheduled or forgotten since
+            if repo not in repos:  # nobody is subscribed anymore
+                self.forget(repo)
+                continue
+            due.append(repo)
+        return due
+
+    def observe(self, repo: str, release: Optional[dict], now: float) -> None:
+        """
+        Update the state of a repo that was just checked and schedule its next check.
+
+        :param repo: The lowercase name of the repo
+        :param release: The repo's latest release data as returned by GitHubAPI.get_latest_releases
+        :param now: The current UNIX timestamp
+        """
+        state: RepoPollState = self.states.setdefault(repo, RepoPollState(repo))
+        if release and release['release']:
+            released_at: float = datetime.datetime.strptime(release['release']['createdAt'],
+                                                            '%Y-%m-%dT%H:%M:%SZ').replace(
+                tzinfo=datetime.timezone.utc).timestamp()
+            if state.tag is not None and release['release']['tagName'] != state.tag and state.released_at is not None:
+                gap: float = max(released_at - state.released_at, 0.0)
+                state.cadence = gap if state.cadence is None else (self.__cadence_weight__ * gap
+                                                                   + (1 - self.__cadence_weight__) * state.cadence)
+            state.tag, state.released_at = release['release']['tagName'], released_at
+        state.next_check = now + self.interval(state)
+        self._push(state)
+
+    def retry(self, repo: str, now: float) -> None:
+        """
+        Check a repo again as soon as possible, e.g. after its check failed.
+
+        :param repo: The lowercase name of the repo
+        :param now: The current UNIX timestamp
+        """
+        state: RepoPollState = self.states.setdefault(repo, RepoPollState(repo))
+        state.next_check = now + self.min_interval
+        self._push(state)
+
+    def etag(self, repo: str) -> tuple[Optional[str], Optional[str]]:
+        """
+        :return: The ETag of the repo's latest release and the tag name it was received with, if known
+        """
+        state: Optional[RepoPollState] = self.states.get(repo)
+        return (state.etag, state.etag_tag) if state is not None else (None, None)
+
+    def remember_etag(self, repo: str, etag: Optional[str], tag: Optional[str]) -> None:
+        state: RepoPollState = self.states.setdefault(repo, RepoPollState(repo))
+        state.etag, state.etag_tag = etag, tag
+        self._dirty.add(repo)
+
+    def forget(self, repo: str) -> None:
+        if (state := self.states.pop(repo, None)) is not None:
+            self._dirty.discard(repo)
+            self._forgotten[repo] = state.next_check
+
+    async def load(self, collection: AsyncIOMotorCollection) -> None:
+        async for document in collection.find():
+            state: RepoPollState = RepoPollState.from_document(document)
+            self.states[state.repo] = state
+            heapq.heappush(self._heap, (state.next_check, state.repo))
+        self.loaded = True
+
+    async def save(self, collection: AsyncIOMotorCollection) -> None:
+        ops: list[ReplaceOne | DeleteOne] = [ReplaceOne({'_id': repo}, self.states[repo].to_document(), upsert=True)
+                                             for repo in self._dirty]
+        # with the feed split between processes, another one may still be polling the repo and have saved its state
+        # since - only delete the state this process left behind
+        ops.extend(DeleteOne({'_id': repo, 'next_check': next_check}) for repo, next_check in self._forgotten.items())
+        self._dirty, self._forgotten = set(), {}
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+
+
+class PartitionLeases:
+    """
+    Time-limited leases on the partitions of the release feed keyspace (guild ID % partitions), so that the feed
+    can be split between any number of processes. The leases are stored in a collection, one document per partition:
+    {_id: partition, owner, expires_at}, next to one per process: {_id: 'process:<owner>', owner, expires_at},
+    which is what lets a process that has no partitions yet be counted in.
+
+    Every process renews its leases on every heartbeat and takes over the ones whose owner stopped renewing them,
+    aiming for an even share of the partitions among the live processes - it gives up its surplus when more join.
+
+    :param collection: The collection to store the leases in
+    :param partitions: The number of partitions
+    :param ttl: The lifetime of a lease in seconds, the clocks of the hosts have to agree to well within it
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, partitions: int, ttl: float):
+        self.collection: AsyncIOMotorCollection = collection
+        self.partitions: int = partitions
+        self.ttl: float = ttl
+        self.owner: str = f'{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}'
+        self.owned: frozenset[int] = frozenset()
+
+    def partition_of(self, guild_id: int) -> int:
+        return guild_id % self.partitions
+
+    def owns(self, guild_id: int) -> bool:
+        return self.partition_of(guild_id) in self.owned
+
+    async def heartbeat(self) -> frozenset[int]:
+        """
+        Renew the leases still held, give up the surplus over the fair share and take over free or expired partitions.
+
+        :return: The partitions owned from now on
+        """
+        now: float = time.time()
+        await self.collection.update_one({'_id': f'process:{self.owner}'},
+                                         {'$set': {'owner': self.owner, 'expires_at': now + self.ttl}}, upsert=True)
+        live: list[dict] = [document async for document in self.collection.find({'expires_at': {'$gt': now}})]
+        fair_share: int = math.ceil(self.partitions / len({document['owner'] for document in live} | {self.owner}))
+        leases: list[dict] = [document for document in live if isinstance(document['_id'], int)]
+        owned: set[int] = {document['_id'] for document in leases if document['owner'] == self.owner}
+        taken: set[int] = {document['_id'] for document in leases if document['owner'] != self.owner}
+        if surplus := sorted(owned)[fair_share:]:
+            await self.collection.update_many({'_id': {'$in': surplus}, 'owner': self.owner},
+                                              {'$set': {'expires_at': 0.0}})
+            owned.difference_update(surplus)
+        if owned:
+            await self.collection.update_many({'_id': {'$in': list(owned)}, 'owner': self.owner},
+                                              {'$set': {'expires_at': now + self.ttl}})
+        # processes starting at the same time shouldn't all race for the same partitions
+        for partition in random.sample(range(self.partitions), self.partitions):
+            if len(owned) >= fair_share:
+                break
+            if partition in owned or partition in taken:
+                continue
+            try:
+                await self.collection.find_one_and_update(
+                    {'_id': partition, '$or': [{'owner': self.owner}, {'expires_at': {'$lte': now}}]},
+                    {'$set': {'owner': self.owner, 'expires_at': now + self.ttl}},
+                    upsert=True, return_document=ReturnDocument.AFTER
+                )
+                owned.add(partition)
+            except DuplicateKeyError:  # someone else has just taken it (the upsert collided with their document)
+                continue
+        self.owned = frozenset(owned)
+        return self.owned
+
+    async def release(self) -> None:
+        await self.collection.delete_one({'_id': f'process:{self.owner}'})
+        if self.owned:
+            await self.collection.update_many({'_id': {'$in': list(self.owned)}, 'owner': self.owner},
+                                              {'$set': {'expires_at': 0.0}})
+        self.owned = frozenset()
 
 
 class ReleaseFeedWorker(commands.Cog):
+    __bulk_write_batch_size__: int = 500
+
     def __init__(self, bot: GitBot):
         self.bot: GitBot = bot
         self.iterno: int = 0
+        # the time the poll schedule is kept in, swapped for a simulated one by the load benchmarks
+        self.clock: Callable[[], float] = time.time
+        # a slow webhook or GitHub call only holds up its own guild, the limits keep the cycle from flooding either
+        self.github_semaphore: asyncio.Semaphore = asyncio.Semaphore(self.bot.mgr.env.release_feed_github_concurrency)
+        self.delivery_queue: WebhookDeliveryQueue = WebhookDeliveryQueue(
+            self.bot.session,
+            window=self.bot.mgr.env.release_feed_delivery_window,
+            concurrency=self.bot.mgr.env.release_feed_webhook_concurrency
+        )
+        self.db_semaphore: asyncio.Semaphore = asyncio.Semaphore(self.bot.mgr.env.release_feed_db_concurrency)
+        self.detector_semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            self.bot.mgr.env.release_feed_change_detection_concurrency
+        )
+        # targeted updates collected during a cycle and flushed in unordered bulk writes at its end, by collection
+        self.pending_writes: PendingWrites = {}
+        self.removed_hooks: set[str] = set()
+        # (lowercase repo name, tag name) -> the release's embed, shared by every guild subscribed to the repo
+        self.render_cache: BaseCache = BaseCache(maxsize=512, max_age=60 * 60)
+        self.scheduler: ReleasePollScheduler = ReleasePollScheduler(
+            min_interval=self.bot.mgr.env.release_feed_min_check_interval * 60,
+            max_interval=self.bot.mgr.env.release_feed_max_check_interval * 60
+        )
+        self.leases: PartitionLeases = PartitionLeases(self.bot.db.release_feed_leases,
+                                                       partitions=self.bot.mgr.env.release_feed_partitions,
+                                                       ttl=self.bot.mgr.env.release_feed_lease_ttl)
+        self.lease_heartbeat.change_interval(seconds=self.leases.ttl / 3)
         if self.bot.mgr.env.run_release_feed_worker:
+            self.lease_heartbeat.start()
             self.release_feed_worker.start()
         else:
             self.bot.logger.info('Release feed worker is disabled - env.run_release_feed_worker == False')
@@ -21,51 +314,252 @@ class ReleaseFeedWorker(commands.Cog):
     def pretty_iterno(self):
         return f'#{str(self.iterno).zfill(3)}'
 
-    async def update_tag_names_with_data(self,
-                                         guild: GitBotGuild,
-                                         update_data: list[TagNameUpdateData]) -> None:
-        feed = guild['feed']
+    def update_tag_names_with_data(self,
+                                   guild: GitBotGuild,
+                                   update_data: list[TagNameUpdateData]) -> None:
         for ud in update_data:
-            (_repos := feed[feed.index(ud.rfi)]['repos'])[_repos.index(ud.rfr)] = {'name': ud.rfr['name'],
-                                                                                   'tag': ud.tag}
-        await self.bot.db.guilds.find_one_and_update({'_id': guild['_id']}, {'$set': {'feed': feed}})
+            self.queue_writes(guild['_id'], self.bot.db.release_feed.tag_update_ops(guild['_id'], ud.rfi['hook'],
+                                                                                     ud.rfr['name'], ud.tag))
+
+    def queue_writes(self,
+                     guild_id: int,
+                     ops: dict[str, UpdateOne | DeleteOne | DeleteMany],
+                     pending: Optional[PendingWrites] = None) -> None:
+        for collection_name, op in ops.items():
+            (self.pending_writes if pending is None else pending).setdefault(collection_name, []).append((guild_id, op))
+
+    async def flush_writes(self, pending: Optional[PendingWrites] = None) -> int:
+        """
+        Flush the updates collected so far in unordered bulk writes.
+
+        :param pending: The updates to flush instead of the ones collected during the cycle
+        :return: The number of write ops flushed
+        """
+        if pending is None:
+            pending, self.pending_writes = self.pending_writes, {}
+            self.removed_hooks.clear()
+        for collection_name, writes in pending.items():
+            collection: AsyncIOMotorCollection = getattr(self.bot.db, collection_name)
+            for i in range(0, len(writes), self.__bulk_write_batch_size__):
+                batch: list[tuple[int, ...]] = writes[i:i + self.__bulk_write_batch_size__]
+                # the guilds collection drops its cached copies of the targeted guild documents
+                kwargs: dict = ({'guild_ids': {guild_id for guild_id, _ in batch}}
+                                if isinstance(collection, GuildsCollection) else {})
+                async with self.db_semaphore:
+                    try:
+                        await collection.bulk_write([op for _, op in batch], ordered=False, **kwargs)
+                    except BulkWriteError as e:
+                        self.bot.logger.error('%d release feed updates of "%s" failed: %s',
+                                              len(e.details.get('writeErrors', [])), collection_name,
+                                              e.details.get('writeErrors'))
+        return sum(map(len, pending.values()))
 
     @tasks.loop(minutes=int(environ.get('release_feed_worker_interval', '15')))
     async def release_feed_worker(self) -> None:
         self.iterno += 1
         self.bot.logger.debug('Starting worker cycle %s', self.pretty_iterno)
-        async for guild in self.bot.db.guilds.find({'feed': {'$exists': True}}):
-            self.bot.logger.debug('Handling GID %d', guild["_id"])
-            guild: GitBotGuild
-            changed: bool = False
-            update: list = []
-            for rfi in guild['feed']:
-                for repo in rfi['repos']:
-                    res: Optional[dict] = await self.bot.github.get_latest_release(repo['name'])
-                    if res:
-                        if res['release'] and (t := res['release']['tagName']) != repo['tag']:
-                            await self.handle_feed_repo(guild, repo, rfi, res)
-                            changed: bool = True
-                            update.append(TagNameUpdateData(rfi, repo, t))
-                            self.bot.logger.debug('New release found for repo "%s" (tag: %s) in GID %d', repo["name"],
-                                                  repo["tag"], guild["_id"])
-                        else:
-                            self.bot.logger.debug('No new release for repo "%s" (tag: %s) in GID %d', repo["name"],
-                                                  repo["tag"], guild["_id"])
-                    else:
-                        self.bot.logger.debug('Missing repo detected in GID %d ("%s")', guild["_id"], repo["name"])
-                        await self.handle_missing_feed_repo(guild, rfi, repo)
-            if changed:
-                self.bot.logger.debug('Changes detected in GID %d', guild["_id"])
-                await self.update_tag_names_with_data(guild, update)
+        start: float = perf_counter()
+        if not await self.leases.heartbeat():
+            self.bot.logger.info('Worker cycle %s skipped, no release feed partitions are leased by this process',
+                                 self.pretty_iterno)
+            return
+        feeds: dict[int, ReleaseFeed] = await self.bot.db.release_feed.get_all_feeds(self.leases.partitions,
+                                                                                    self.leases.owned)
+        guilds: dict[int, GitBotGuild] = {guild_id: GitBotGuild(_id=guild_id, feed=feed)
+                                          for guild_id, feed in feeds.items()}
+        index: dict[str, list[ReleaseFeedSubscription]] = self.build_subscription_index(guilds.values())
+        subscription_count: int = sum(map(len, index.values()))
+        if not self.scheduler.loaded:
+            await self.scheduler.load(self.bot.db.release_feed_schedule)
+        now: float = self.clock()
+        due: list[str] = self.scheduler.due(index, now)
+        changed: list[str] = (await self.detect_changes(index, set(due), now)
+                              if self.bot.mgr.env.release_feed_change_detection else due)
+        self.bot.logger.info('Worker cycle %s: %d unique repos across %d subscriptions (%.1f%%), %d due, %d to fetch',
+                             self.pretty_iterno, len(index), subscription_count,
+                             len(index) / subscription_count * 100 if index else 100, len(due), len(changed))
+        releases: dict[str, Optional[dict]] = await self.fetch_latest_releases(changed)
+        for repo_name in changed:
+            if repo_name not in releases:
+                self.scheduler.retry(repo_name, now)
+            elif releases[repo_name] is None:  # the subscriptions are about to be removed
+                self.scheduler.forget(repo_name)
+            else:
+                self.scheduler.observe(repo_name, releases[repo_name], now)
+        await self.scheduler.save(self.bot.db.release_feed_schedule)
+        changes: dict[int, list[tuple[ReleaseFeedSubscription, Optional[dict]]]] = {}
+        for repo_name, subscriptions in index.items():
+            if repo_name not in releases:  # not due, unchanged or the fetch failed - we know nothing new about it
+                continue
+            release: Optional[dict] = releases[repo_name]
+            tag: Optional[str] = release['release']['tagName'] if release and release['release'] else None
+            for subscription in subscriptions:
+                if release is None or (tag is not None and tag != subscription.tag):
+                    changes.setdefault(subscription.guild_id, []).append((subscription, release))
+        # guilds are handled concurrently, but everything within a single guild still happens in order
+        for guild_changes in changes.values():
+            guild_changes.sort(key=lambda change: (change[0].rfi_index, change[0].repo_index))
+        await asyncio.gather(*(self.handle_guild(guilds[guild_id], guild_changes)
+                               for guild_id, guild_changes in changes.items()))
+        await self.delivery_queue.drain()
+        flushed: int = await self.flush_writes()
+        self.bot.logger.info('Finished worker cycle %s in %.2fs (%d guilds, %d with changes, %d write ops)',
+                             self.pretty_iterno, perf_counter() - start, len(guilds), len(changes), flushed)
+
+    @staticmethod
+    def build_subscription_index(guilds: Iterable[GitBotGuild]) -> dict[str, list[ReleaseFeedSubscription]]:
+        """
+        Build an inverted index of the release feed subscriptions, so that every repo is fetched once per cycle
+        no matter how many guilds are subscribed to it.
+
+        :param guilds: The guilds with a release feed
+        :return: Lowercase repo name -> the subscriptions to it, in guild and feed order
+        """
+        index: dict[str, list[ReleaseFeedSubscription]] = {}
+        for guild in guilds:
+            for rfi_index, rfi in enumerate(guild['feed']):
+                for repo_index, repo in enumerate(rfi['repos']):
+                    index.setdefault(repo['name'].lower(), []).append(
+                        ReleaseFeedSubscription(guild['_id'], rfi_index, repo_index, repo['tag']))
+        return index
+
+    async def detect_changes(self,
+                             index: dict[str, list[ReleaseFeedSubscription]],
+                             due: set[str],
+                             now: float) -> list[str]:
+        """
+        Check the latest release tags of every subscribed repo with conditional REST requests, which are free for
+        the ones whose latest release didn't change, so that only the changed ones have to be fetched in full.
+        The adaptive schedule only applies to the repos that can't be checked this way - the ones without a release
+        or an ETag, and the ones whose check failed (including all of them if the core rate limit is running low,
+        it's the commands' budget) - they are fetched in full once they're due.
+
+        :param index: The subscription index, see build_subscription_index
+        :param due: The repos due according to the schedule
+        :param now: The current UNIX timestamp
+        :return: The repos to fetch in full
+        """
+        changed: list[str] = []
+
+        def fall_back(repo: str) -> None:
+            if repo in due:
+                changed.append(repo)
+
+        async def detect(repo: str) -> None:
+            etag, tag = self.scheduler.etag(repo)
+            async with self.detector_semaphore:
+                github: GitHubAPI = self.bot.github_scheduler.pick('core')
+                if self.bot.github_scheduler.headroom(github, 'core') < self.bot.github_scheduler.reserve:
+                    fall_back(repo)
+                    return
+                try:
+                    check: LatestReleaseTagCheck = await github.check_latest_release_tag(repo, etag)
+                except Exception as e:
+                    self.bot.logger.debug('Worker cycle %s failed to check repo "%s" for changes: %s',
+                                          self.pretty_iterno, repo, e)
+                    fall_back(repo)
+                    return
+            if check.status == 200:
+                self.scheduler.remember_etag(repo, check.etag, check.tag)
+                tag: str = check.tag
+            elif check.status != 304:  # no release, or no repo - only the full check can tell which
+                if etag is not None:
+                    self.scheduler.remember_etag(repo, None, None)
+                fall_back(repo)
+                return
+            if tag is None or any(subscription.tag != tag for subscription in index[repo]):
+                changed.append(repo)
+            elif repo in due:  # the schedule is only the fallback, keep it from piling the repo up as overdue
+                self.scheduler.observe(repo, None, now)
+
+        await asyncio.gather(*map(detect, index))
+        return changed
+
+    async def fetch_latest_releases(self, repos: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Fetch the latest releases of the repos in concurrent batches.
+        Repos in batches that failed are left out, as opposed to repos that don't exist, which map to None.
+
+        :param repos: The (unique) repos to fetch the latest releases of
+        :return: Repo name -> latest release
+        """
+        batch_size: int = self.bot.mgr.env.release_feed_batch_size
+        releases: dict[str, Optional[dict]] = {}
+
+        async def fetch(batch: list[str]) -> None:
+            async with self.github_semaphore:
+                github: GitHubAPI = await self.bot.github_scheduler.acquire('graphql', low_priority=True)
+                try:
+                    releases.update(await github.get_latest_releases(batch, batch_size=batch_size))
+                except Exception as e:
+                    self.bot.logger.error('Worker cycle %s failed to fetch a batch of %d repos: %s',
+                                          self.pretty_iterno, len(batch), e)
+
+        await asyncio.gather(*(fetch(repos[i:i + batch_size]) for i in range(0, len(repos), batch_size)))
+        return releases
+
+    async def handle_guild(self,
+                           guild: GitBotGuild,
+                           changes: list[tuple[ReleaseFeedSubscription, Optional[dict]]]) -> None:
+        if not self.leases.owns(guild['_id']):  # the lease was lost mid-cycle, the new owner will handle the guild
+            return
+        try:
+            await self._handle_guild(guild, changes)
+        except Exception as e:  # one broken guild shouldn't cancel the rest of the cycle
+            self.bot.logger.exception('Worker cycle %s failed for GID %d: %s', self.pretty_iterno, guild['_id'], e)
+
+    async def _handle_guild(self,
+                            guild: GitBotGuild,
+                            changes: list[tuple[ReleaseFeedSubscription, Optional[dict]]]) -> None:
+        self.bot.logger.debug('Handling GID %d', guild["_id"])
+        update: list = []
+        for subscription, res in changes:
+            rfi: ReleaseFeedItem = guild['feed'][subscription.rfi_index]
+            repo: ReleaseFeedRepo = rfi['repos'][subscription.repo_index]
+            if res:
+                self.handle_feed_repo(guild, repo, rfi, res)
+                update.append(TagNameUpdateData(rfi, repo, res['release']['tagName']))
+                self.bot.logger.debug('New release found for repo "%s" (tag: %s) in GID %d', repo["name"],
+                                      repo["tag"], guild["_id"])
             else:
-                self.bot.logger.debug('Finished worker cycle for GID %d - nothing changed', guild["_id"])
+                self.bot.logger.debug('Missing repo detected in GID %d ("%s")', guild["_id"], repo["name"])
+                await self.handle_missing_feed_repo(guild, rfi, repo)
+        if update:
+            self.bot.logger.debug('Changes detected in GID %d', guild["_id"])
+            self.update_tag_names_with_data(guild, update)
+
+    def handle_feed_repo(self,
+                         guild: GitBotGuild,
+                         repo: ReleaseFeedRepo,
+                         rfi: ReleaseFeedItem,
+                         new_release: dict, no_mention: bool = False,
+                         pending: Optional[PendingWrites] = None) -> asyncio.Future:
+        """
+        Queue the announcement of a new release to an RFI's channel.
+
+        :param pending: See send_to_rfi
+        :return: The future of the announcement's delivery
+        """
+        mention: Optional[str] = (self.bot.mgr.release_feed_mention_to_actual(rfi['mention'])
+                                  if rfi.get('mention') and not no_mention else None)
+        return self.send_to_rfi(guild, rfi, self.render_release(repo, new_release), mention, pending=pending)
 
-    async def handle_feed_repo(self,
-                               guild: GitBotGuild,
-                               repo: ReleaseFeedRepo,
-                               rfi: ReleaseFeedItem,
-                               new_release: dict, no_mention: bool = False) -> None:
+    def render_release(self, repo: ReleaseFeedRepo, new_release: dict) -> discord.Embed:
+        """
+        Get the embed announcing a release, rendering it only once per (repo, tag) -
+        the only per-guild part of the message is the mention, which is sent as its content.
+
+        :param repo: The RFR the release belongs to
+        :param new_release: The release data as returned by GitHubAPI.get_latest_releases
+        :return: The embed, not to be modified since it's shared
+        """
+        key: tuple[str, str] = (repo['name'].lower(), new_release['release']['tagName'])
+        if (embed := self.render_cache.get(key)) is None:
+            embed: discord.Embed = self._render_release(repo, new_release)
+            self.render_cache[key] = embed
+        return embed
+
+    def _render_release(self, repo: ReleaseFeedRepo, new_release: dict) -> discord.Embed:
         stage: str = 'prerelease' if new_release['release']['isPrerelease'] else 'release'
         if new_release['release']['isDraft']:
             stage += ' draft'
@@ -78,7 +572,7 @@ class ReleaseFeedWorker(commands.Cog):
             embed.set_image(url=new_release['openGraphImageUrl'])
 
         if body := new_release['release']['descriptionHTML']:
-            body: str = ' '.join(BeautifulSoup(body, features='html.parser').getText().split())
+            body: str = html_to_text(body, limit=400)
             body: str = f"```{self.bot.mgr.truncate(body, 400, full_word=True)}```".strip()
 
         author: dict = new_release["release"]["author"]
@@ -90,8 +584,7 @@ class ReleaseFeedWorker(commands.Cog):
         info: str = f'{author}{assets}'
         embed.add_field(name=':notepad_spiral: Body:', value=body, inline=False)
         embed.add_field(name=':mag_right: Info:', value=info)
-        await self.send_to_rfi(guild, rfi, embed,
-                               self.bot.mgr.release_feed_mention_to_actual(rfi['mention']) if rfi.get('mention') and not no_mention else None)
+        return embed
 
     async def handle_missing_feed_repo(self, guild: GitBotGuild, rfi: ReleaseFeedItem, repo: ReleaseFeedRepo) -> None:
         embed: discord.Embed = discord.Embed(
@@ -100,27 +593,62 @@ class ReleaseFeedWorker(commands.Cog):
             description=f'A repository previously saved as `{repo["name"]}` was **deleted or renamed** by the owner. '
                         f'Please re-add it under the new name.'
         )
-        await self.bot.db.guilds.update_one(guild, {'$pull': {f'feed.{guild["feed"].index(rfi)}.repos': repo}})
-        await self.send_to_rfi(guild, rfi, embed)
+        self.queue_writes(guild['_id'],
+                          self.bot.db.release_feed.repo_removal_ops(guild['_id'], rfi['hook'], repo['name']))
+        self.send_to_rfi(guild, rfi, embed)
 
     @release_feed_worker.before_loop
     async def release_feed_worker_before_loop(self) -> None:
         self.bot.logger.info('Release worker sleeping until the bot is ready...')
         await self.bot.wait_until_ready()
 
-    async def send_to_rfi(self,
-                          guild: GitBotGuild,
-                          rfi: ReleaseFeedItem,
-                          embed: Optional[discord.Embed] = None,
-                          text: Optional[str] = None) -> bool:
+    @tasks.loop(seconds=30)  # the actual interval is set from the lease TTL
+    async def lease_heartbeat(self) -> None:
+        previous: frozenset[int] = self.leases.owned
         try:
-            webhook: discord.Webhook = discord.Webhook.from_url('https://discord.com/api/webhooks/' + rfi['hook'],
-                                                                session=self.bot.session)
-            await webhook.send(text, embed=embed, username=self.bot.user.name, avatar_url=self.bot.user.avatar.url)
-        except (discord.errors.NotFound, discord.errors.Forbidden, discord.errors.HTTPException):
-            await self.bot.db.guilds.update_one({'_id': guild['_id']}, {'$pull': {'feed': {'hook': rfi['hook']}}})
-            return False
-        return True
+            owned: frozenset[int] = await self.leases.heartbeat()
+        except Exception as e:  # the leases simply expire if this keeps failing, letting other processes take over
+            self.bot.logger.error('Release feed lease heartbeat failed: %s', e)
+            return
+        if owned != previous:
+            self.bot.logger.info('Release feed partitions leased by %s: %d/%d (%s)', self.leases.owner,
+                                 len(owned), self.leases.partitions, ', '.join(map(str, sorted(owned))) or 'none')
+
+    @lease_heartbeat.before_loop
+    async def lease_heartbeat_before_loop(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def cog_unload(self) -> None:
+        self.release_feed_worker.cancel()
+        self.lease_heartbeat.cancel()
+        await self.leases.release()
+
+    def send_to_rfi(self,
+                    guild: GitBotGuild,
+                    rfi: ReleaseFeedItem,
+                    embed: discord.Embed,
+                    text: Optional[str] = None,
+                    pending: Optional[PendingWrites] = None) -> asyncio.Future:
+        """
+        Queue an embed to be delivered to an RFI's channel, see :class:`WebhookDeliveryQueue`.
+        If the webhook turns out to be gone (or the delivery is rejected for good), the RFI gets removed.
+
+        :param pending: The updates to queue the RFI's removal to instead of the ones collected during the cycle
+        :return: The future of the embed's delivery
+        """
+        def _on_delivery(future: asyncio.Future) -> None:
+            # delivered, or failed with errors that were transient - the next release will try again
+            if future.cancelled() or not self.delivery_queue.is_permanent_failure(future.exception()):
+                return
+            if rfi['hook'] not in self.removed_hooks:
+                self.removed_hooks.add(rfi['hook'])
+                self.queue_writes(guild['_id'], self.bot.db.release_feed.hook_removal_ops(guild['_id'], rfi['hook']),
+                                  pending)
+
+        future: asyncio.Future = self.delivery_queue.enqueue(rfi['hook'], embed, text, username=self.bot.user.name,
+                                                             avatar_url=self.bot.user.avatar.url)
+        future.add_done_callback(_on_delivery)
+        return future
 
 
 async def setup(bot: GitBot) -> None:
@@ -30,11 +30,11 @@ class Auth(commands.Cog):
         view.add_item(discord.ui.Button(label=ctx.fmt('button'),
                                         url=self.bot.mgr.build_github_oauth_url(ctx.author.id, secret),
                                         style=discord.ButtonStyle.link))
-        await self.bot.db.users.update_one({'_id': ctx.author.id}, {'$set': {'github': {
+        await self.bot.db.users.setitem(ctx, 'github', {
             'pending': True,
             'secret': secret,
             'exp': int(time()) + self.bot.mgr.env.oauth.github.auth_timeout
-        }}}, upsert=True)
+        }, validate=False)
         await ctx.send(embed=embed, view=view, ephemeral=True)
 
 
@@ -21,12 +21,11 @@ class Config(commands.Cog):
         }
 
     @staticmethod
-    async def construct_release_feed_list(ctx: GitBotContext, rf: ReleaseFeed) -> str:
+    async def construct_release_feed_list(ctx: GitBotContext, guild: Optional[GitBotGuild], rf: ReleaseFeed) -> str:
         item: str = '' if rf else ctx.l.generic.nonexistent.release_feed
         for rfi in rf:
             if rfi['cid'] not in map(lambda c: c.id, ctx.guild.channels):
-                await ctx.bot.db.guilds.update_one({'_id': ctx.guild.id},
-                                                   {'$pull': {'feed': {'cid': rfi['cid']}}})
+                await ctx.bot.db.release_feed.remove_channel(ctx.guild.id, guild, rfi['cid'])
                 ctx.bot.logger.debug('Removed channel %d from feed in GID %d', rfi['cid'], ctx.guild.id)
                 continue
             m: str = '' if not rfi.get('mention') else ' - ' + ctx.bot.mgr.release_feed_mention_to_actual(rfi['mention'])
@@ -39,8 +38,8 @@ class Config(commands.Cog):
     @staticmethod
     async def toggle_autoconv_item(ctx: GitBotContext,
                                    item: Literal['gh_url', 'codeblock']) -> bool:
-        guild: GitBotGuild = await ctx.bot.db.guilds.find_one({'_id': ctx.guild.id}) or {}
-        config: AutomaticConversionSettings = guild.get('autoconv', ctx.bot.mgr.env.autoconv_default)
+        guild: GitBotGuild = await ctx.get_guild_document() or {}
+        config: AutomaticConversionSettings = dict(guild.get('autoconv', ctx.bot.mgr.env.autoconv_default))
         config[item] = (state := not (config.get(item, ctx.bot.mgr.env.autoconv_default[item])))  # noqa item is str
         if guild:
             await ctx.bot.db.guilds.update_one({'_id': guild['_id']}, {'$set': {f'autoconv.{item}': state}})
@@ -53,9 +52,9 @@ class Config(commands.Cog):
         return state
 
     @staticmethod
-    async def get_feed_prerequisites(ctx: GitBotContext) -> tuple[GitBotGuild, ReleaseFeed]:
-        guild: GitBotGuild = await ctx.bot.db.guilds.find_one({'_id': ctx.guild.id}) or {}
-        feed: ReleaseFeed = guild.get('feed', [])
+    async def get_feed_prerequisites(ctx: GitBotContext) -> tuple[Optional[GitBotGuild], ReleaseFeed]:
+        guild: Optional[GitBotGuild] = await ctx.get_guild_document()
+        feed: ReleaseFeed = await ctx.bot.db.release_feed.get_feed(ctx.guild.id, guild)
         return guild, feed
 
     @gitbot_group('config', aliases=['cfg', 'configure', 'settings'])
@@ -68,11 +67,12 @@ class Config(commands.Cog):
     async def config_show_command_group(self, ctx: GitBotContext) -> None:
         if ctx.invoked_subcommand is None:
             ctx.fmt.set_prefix('config show base')
-            user: GitBotUser = await self.bot.db.users.find_one({'_id': ctx.author.id}) or {}
+            user: GitBotUser = await self.bot.db.users.get_document(ctx) or {}
             guild: Optional[GitBotGuild] = None
+            release_feed: ReleaseFeed = []
             if not isinstance(ctx.channel, discord.DMChannel):
-                guild: Optional[GitBotGuild] = await self.bot.db.guilds.find_one({'_id': ctx.guild.id})
-            if not user and guild is None or ((guild and len(guild) == 1) and not user):
+                guild, release_feed = await self.get_feed_prerequisites(ctx)
+            if not user and not release_feed and (guild is None or len(guild) == 1):
                 await ctx.error(ctx.l.generic.nonexistent.qa)
                 return
             lang: str = ctx.fmt('accessibility list locale', f'`{ctx.l.meta.localized_name.capitalize()}`')
@@ -83,9 +83,9 @@ class Config(commands.Cog):
             guild_str: str = ''
             if not isinstance(ctx.channel, discord.DMChannel):
                 feed: str = ctx.l.config.show.base.guild.list.feed + '\n' + '\n'.join([f'{self.bot.mgr.e.square} <#{rfi["cid"]}>'
-                                                                                       for rfi in guild['feed']]) \
-                    if (guild and guild.get('feed')) else f'{ctx.l.config.show.base.guild.list.feed}' \
-                                                          f' `{ctx.l.config.show.base.item_not_configured}`'
+                                                                                       for rfi in release_feed]) \
+                    if release_feed else f'{ctx.l.config.show.base.guild.list.feed}' \
+                                 f' `{ctx.l.config.show.base.item_not_configured}`'
                 ctx.fmt.set_prefix('+guild list autoconv')
                 if not guild:
                     ac: AutomaticConversionSettings = self.bot.mgr.env.autoconv_default
@@ -109,7 +109,7 @@ class Config(commands.Cog):
                 title=f"{self.bot.mgr.e.github}  {ctx.l.config.show.base.title}",
                 description=f"{accessibility}{linebreak}{qa}{linebreak if guild_str else ''}{guild_str}"
             )
-            if guild:
+            if guild or release_feed:
                 embed.set_footer(text=ctx.fmt('!config show base footer', 'git config show feed'))
             await ctx.send(embed=embed)
 
@@ -118,12 +118,12 @@ class Config(commands.Cog):
     @commands.cooldown(5, 30, commands.BucketType.user)
     async def config_show_feed_command(self, ctx: GitBotContext):
         ctx.fmt.set_prefix('config show feed')
-        guild: Optional[dict] = await self.bot.db.guilds.find_one({'_id': ctx.guild.id})
-        if guild and 'feed' in guild:
+        guild, feed = await self.get_feed_prerequisites(ctx)
+        if self.bot.db.release_feed.is_embedded(guild) or feed:
             embed: GitBotEmbed = GitBotEmbed(
                 color=self.bot.mgr.c.discord.blurple,
                 title=f"{self.bot.mgr.e.github}  {ctx.l.config.show.feed.title}",
-                description=await self.construct_release_feed_list(ctx, guild['feed']),
+                description=await self.construct_release_feed_list(ctx, guild, feed),
                 footer=ctx.fmt('footer', f'git config feed channel {{{ctx.l.help.argument_explainers.channel.name}}}'))
             await embed.send(ctx)
         else:
@@ -152,37 +152,28 @@ class Config(commands.Cog):
         except commands.BadArgument:
             await ctx.error(ctx.l.config.feed.channel.invalid_channel)
             return
-        guild: Optional[GitBotGuild] = await self.bot.db.guilds.find_one({'_id': ctx.guild.id})
+        guild, feed = await self.get_feed_prerequisites(ctx)
         success: bool = False
-        if guild:
-            feed: dict = guild.get('feed', {})
-            if len(feed) >= 5:
-                embed_limit_reached: GitBotEmbed = GitBotEmbed(
-                    color=self.bot.mgr.c.discord.yellow,
-                    title=ctx.l.config.feed.channel.channel_limit_reached_embed.title,
-                    description=ctx.l.config.feed.channel.channel_limit_reached_embed.description
-                )
-                embed_limit_reached.set_footer(text=ctx.l.config.feed.channel.channel_limit_reached_embed.footer,
-                                               icon_url=self.bot.user.avatar.url)
-                await ctx.send(embed=embed_limit_reached)
+        if len(feed) >= 5:
+            embed_limit_reached: GitBotEmbed = GitBotEmbed(
+                color=self.bot.mgr.c.discord.yellow,
+                title=ctx.l.config.feed.channel.channel_limit_reached_embed.title,
+                description=ctx.l.config.feed.channel.channel_limit_reached_embed.description
+            )
+            embed_limit_reached.set_footer(text=ctx.l.config.feed.channel.channel_limit_reached_embed.footer,
+                                           icon_url=self.bot.user.avatar.url)
+            await ctx.send(embed=embed_limit_reached)
+            return
+        for rfi in feed:
+            if rfi['cid'] == channel.id:
+                await ctx.error(ctx.l.config.feed.channel.already_taken)
                 return
-            for rfi in feed:
-                if rfi['cid'] == channel.id:
-                    await ctx.error(ctx.l.config.feed.channel.already_taken)
-                    return
-            hook: discord.Webhook = await self.create_webhook(ctx, channel)
-            if hook:
-                await self.bot.db.guilds.update_one(guild, {'$push': {'feed': ReleaseFeedItem(cid=channel.id,
-                                                                                                  hook=hook.url[33:],
-                                                                                                  repos=[])}})
-                success: bool = True
-        else:
-            hook: discord.Webhook = await self.create_webhook(ctx, channel)
-            if hook:
-                await self.bot.db.guilds.insert_one(GitBotGuild(_id=ctx.guild.id, feed=[ReleaseFeedItem(cid=channel.id,
-                                                                                                            hook=hook.url[33:],
-                                                                                                            repos=[])]))
-                success: bool = True
+        hook: discord.Webhook = await self.create_webhook(ctx, channel)
+        if hook:
+            await self.bot.db.release_feed.add_channel(ctx.guild.id, guild, ReleaseFeedItem(cid=channel.id,
+                                                                                            hook=hook.url[33:],
+                                                                                            repos=[]))
+            success: bool = True
         if success:
             embed: GitBotEmbed = GitBotEmbed(
                 color=self.bot.mgr.c.discord.green,
@@ -208,12 +199,12 @@ class Config(commands.Cog):
             await ctx.error(ctx.l.generic.nonexistent.repo.base)
             return
         tag: Optional[str] = (release.get('release') or {'tagName': None}).get('tagName')
-        guild: GitBotGuild = await self.bot.db.guilds.find_one({'_id': ctx.guild.id})
-        if not guild or not guild.get('feed'):
+        guild, feed = await self.get_feed_prerequisites(ctx)
+        if not feed:
             await ctx.error(ctx.l.generic.nonexistent.release_feed)
             return
         channel_list_embed_description: str = '\n'.join([f'{self.bot.mgr.e.square}**{index + 1} | **<#{rfi["cid"]}>'
-                                                         for index, rfi in enumerate(guild['feed'])])
+                                                         for index, rfi in enumerate(feed)])
         channel_list_embed: GitBotEmbed = GitBotEmbed(
             color=self.bot.mgr.c.brand_colors.ocean_mist,
             title=ctx.l.config.feed.repo.channel_list_embed.title,
@@ -222,7 +213,7 @@ class Config(commands.Cog):
         )
 
         async def _callback(_, res: discord.Message, repo_: str):
-            indices: list[dict] = [dict(number=ind + 1, rfi=rfi) for ind, rfi in enumerate(guild['feed'])]
+            indices: list[dict] = [dict(number=ind + 1, rfi=rfi) for ind, rfi in enumerate(feed)]
             if res.content.lower() in ('quit', 'cancel'):
                 await ctx.error(ctx.l.config.feed.repo.cancelled)
                 return GitBotCommandState.FAILURE
@@ -241,8 +232,7 @@ class Config(commands.Cog):
                 if len(selected_rfi['repos']) < 10:
                     if (repo_ := repo_.lower()) not in map(lambda r: r['name'], selected_rfi['repos']):
                         rfr: ReleaseFeedRepo = ReleaseFeedRepo(name=repo_, tag=tag)
-                        await self.bot.db.guilds.update_one(guild, {'$push':
-                                                            {f'feed.{guild["feed"].index(selected_rfi)}.repos': rfr}})
+                        await self.bot.db.release_feed.add_repo(ctx.guild.id, guild, selected_rfi, rfr)
                         await ctx.success(ctx.fmt('success',
                                                   f'`{repo_}`',
                                                   mention), view=ReleaseFeedBacklogView(ctx, selected_rfi, rfr))
@@ -325,7 +315,7 @@ class Config(commands.Cog):
 
         await ctx.success(ctx.fmt('success', channel.mention, self.bot.mgr.release_feed_mention_to_actual(id_or_enum)),
                           allowed_mentions=discord.AllowedMentions.none())
-        await self.bot.db.guilds.update_one(guild, {'$set': {f'feed.{guild["feed"].index(rfi)}.mention': id_or_enum}})
+        await self.bot.db.release_feed.set_mention(ctx.guild.id, guild, rfi['cid'], id_or_enum)
 
     @config_command_group.command(name='user', aliases=['u'])
     @commands.cooldown(5, 30, commands.BucketType.user)
@@ -379,7 +369,6 @@ class Config(commands.Cog):
                         return
                 await self.bot.db.users.setitem(ctx, 'locale', l_[0]['name'])
                 setattr(ctx, 'l', await self.bot.db.users.get_locale(ctx))
-                self.bot.set_cache_value('locale', ctx.author.id, l_[0]['name'])  # update the cache with the new locale
                 await ctx.success_embed(ctx.fmt('success', l_[0]['localized_name'].capitalize()))
                 return
             to_followup = await ctx.error(ctx.fmt('failure', locale))
@@ -438,7 +427,7 @@ class Config(commands.Cog):
     async def config_autoconv_lines_command(self, ctx: GitBotContext, skip_state: Optional[str] = None) -> None:
         ctx.fmt.set_prefix('config autoconv gh_lines')
         skip_state: Optional[int] = self._validate_github_lines_conversion_state(skip_state)
-        guild: Optional[GitBotGuild] = await self.bot.db.guilds.find_one({'_id': ctx.guild.id})
+        guild: Optional[GitBotGuild] = await ctx.get_guild_document()
         if skip_state is None:
             embed: GitBotEmbed = GitBotEmbed(
                 color=self.bot.mgr.c.rounded,
@@ -470,11 +459,11 @@ class Config(commands.Cog):
             actual_state = skip_state
         if (_str := str(actual_state)) in ctx.lp.results.keys():
             if guild:
-                config: AutomaticConversionSettings = guild.get('autoconv', self.bot.mgr.env.autoconv_default)
+                config: AutomaticConversionSettings = dict(guild.get('autoconv', self.bot.mgr.env.autoconv_default))
                 config['gh_lines'] = actual_state
                 await self.bot.db.guilds.update_one({'_id': guild['_id']}, {'$set': {'autoconv.gh_lines': actual_state}})
             else:
-                config: AutomaticConversionSettings = self.bot.mgr.env.autoconv_default
+                config: AutomaticConversionSettings = dict(self.bot.mgr.env.autoconv_default)
                 config['gh_lines'] = actual_state
                 await self.bot.db.guilds.insert_one({'_id': ctx.guild.id, 'autoconv': config})
             self.bot.set_cache_value('autoconv', ctx.guild.id, config)
@@ -514,7 +503,7 @@ class Config(commands.Cog):
     @commands.cooldown(5, 30, commands.BucketType.guild)
     async def delete_feed_channel_command(self, ctx: GitBotContext, channel: discord.TextChannel) -> None:
         ctx.fmt.set_prefix('config delete feed channel')
-        _, feed = await self.get_feed_prerequisites(ctx)
+        guild, feed = await self.get_feed_prerequisites(ctx)
         if not feed:
             await ctx.error(ctx.l.generic.nonexistent.release_feed)
             return
@@ -532,7 +521,7 @@ class Config(commands.Cog):
 
         confirmation: bool = await embed.confirmation(ctx)
         if confirmation:
-            await self.bot.db.guilds.update_one({'_id': ctx.guild.id}, {'$pull': {'feed': rfi}})
+            await self.bot.db.release_feed.remove_channel(ctx.guild.id, guild, rfi['cid'])
             await ctx.success(ctx.fmt('success', channel.mention))
         elif confirmation is False:
             await ctx.error(ctx.lp.cancelled.format(channel.mention))
@@ -553,7 +542,7 @@ class Config(commands.Cog):
     async def delete_feed_repo_command(self, ctx: GitBotContext, repo: GitHubRepository):
         ctx.fmt.set_prefix('config delete feed repo')
         guild, feed = await self.get_feed_prerequisites(ctx)
-        if not guild or not feed:
+        if not feed:
             return await ctx.error(ctx.l.generic.nonexistent.release_feed)
         present_in: list[ReleaseFeedItem] = []
         repo: str = repo.lower()
@@ -596,10 +585,7 @@ class Config(commands.Cog):
             if to_delete:
                 ctx.fmt.set_prefix('+success')
                 to_delete: list = self.bot.mgr.get_by_key_from_sequence(present_in, 'cid', to_delete, multiple=True, unpack=True)
-                ud: dict = {f'feed.{guild["feed"].index(to_delete[n])}.repos':
-                            self.bot.mgr.get_by_key_from_sequence(rf['repos'],
-                                                         'name', repo.lower()) for n, rf in enumerate(to_delete)}
-                await self.bot.db.guilds.update_one({'_id': ctx.guild.id}, {'$pull': ud})
+                await self.bot.db.release_feed.remove_repo(ctx.guild.id, guild, [rfi_['cid'] for rfi_ in to_delete], repo)
                 result_embed: GitBotEmbed = GitBotEmbed(
                     color=self.bot.mgr.c.discord.green,
                     title=ctx.l.config.delete.feed.repo.multiple.success.title,
@@ -621,9 +607,7 @@ class Config(commands.Cog):
 
             confirmation: bool = await embed.confirmation(ctx)
             if confirmation:
-                rfr: ReleaseFeedRepo = self.bot.mgr.get_by_key_from_sequence(present_in[0]['repos'], 'name', repo.lower())
-                await self.bot.db.guilds.update_one({'_id': ctx.guild.id},
-                                               {'$pull': {f'feed.{guild["feed"].index(present_in[0])}.repos': rfr}})
+                await self.bot.db.release_feed.remove_repo(ctx.guild.id, guild, [present_in[0]['cid']], repo)
                 await ctx.success(ctx.fmt('success', f'`{repo.lower()}`', f'<#{present_in[0]["cid"]}>'))
             elif confirmation is False:
                 await ctx.error(ctx.l.config.delete.feed.repo.multiple.cancelled)
@@ -635,7 +619,7 @@ class Config(commands.Cog):
     async def delete_feed_mention_command(self, ctx: GitBotContext):
         ctx.fmt.set_prefix('config delete feed mention')
         guild, feed = await self.get_feed_prerequisites(ctx)
-        if not guild or not feed:
+        if not feed:
             return await ctx.error(ctx.l.generic.nonexistent.release_feed)
         rfis_with_mention: list = [rfi for rfi in feed if rfi.get('mention')]
         if not rfis_with_mention:
@@ -671,8 +655,7 @@ class Config(commands.Cog):
 
         if to_delete:
             to_delete: ReleaseFeedItem = self.bot.mgr.get_by_key_from_sequence(feed, 'cid', to_delete)
-            await self.bot.db.guilds.update_one({'_id': guild['_id']},
-                                           {'$set': {f'feed.{feed.index(to_delete)}.mention': None}})
+            await self.bot.db.release_feed.set_mention(ctx.guild.id, guild, to_delete['cid'], None)
             await ctx.success(ctx.fmt('success',
                                       self.bot.mgr.release_feed_mention_to_actual(to_delete['mention']),
                                       f'<#{to_delete["cid"]}>'), allowed_mentions=discord.AllowedMentions.none())
@@ -715,8 +698,7 @@ class Config(commands.Cog):
     async def delete_entire_record_command(self, ctx: GitBotContext) -> None:
         # This command's naming is confusing to users.
         # It should either be removed or reworked to better reflect its effect on users' config values
-        query: dict = await self.bot.db.users.find_one_and_delete({'_id': ctx.author.id})
-        if not query:
+        if not await self.bot.db.users.delete_document(ctx):
             await ctx.error(ctx.l.config.delete.all.not_saved)
             return
         await ctx.success(ctx.l.config.delete.all.success)
@@ -85,8 +85,14 @@ class LinesOfCode(commands.Cog):
         return c_removed
 
     async def process_repo(self, ctx: GitBotContext, repo: GitHubRepository) -> Optional[tuple[dict, int | None]]:
-        if (not ctx.__nocache__) and (cached := self.bot.get_cache_value('loc', repo := repo.lower())):
-            return cached
+        repo: GitHubRepository = repo.lower()
+        if not ctx.__nocache__:
+            if cached := self.bot.get_cache_value('loc', repo):
+                return cached
+            if stored := await self.bot.persistent_cache.get('loc', repo):
+                stored: tuple[dict, int] = tuple(stored)  # JSON doesn't keep tuples
+                self.bot.set_cache_value('loc', repo, stored)
+                return stored
         tmp_zip_path: str = f'./tmp/{ctx.message.id}.zip'
         tmp_dir_path: str = tmp_zip_path[:-4]
         try:
@@ -113,6 +119,7 @@ class LinesOfCode(commands.Cog):
             self.bot.logger.error('the CLOC script failed with exit code %d', e.returncode)
         else:
             self.bot.set_cache_value('loc', repo, (output, c_removed))
+            self.bot.persistent_cache.put('loc', repo, (output, c_removed), max_age=self.bot.get_cache('loc').max_age)
             return output, c_removed
         finally:
             try:
@@ -1,2 +1,4 @@
 from .github import *
 from .transformations import *
+from .scheduler import *
+from .metrics import *
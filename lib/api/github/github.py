@@ -10,18 +10,26 @@ GitBot backend for interacting with GitHub's API.
 
 import aiohttp
 import asyncio
+import json
+import hashlib
 import functools
+import re
+import sys
 import inspect
 import gidgethub.aiohttp as gh
-from typing import Optional, Callable, Any, Literal, TYPE_CHECKING
+from types import FrameType
+from typing import Optional, Callable, Any, Literal, Iterable, Mapping, NamedTuple, TYPE_CHECKING
 from gidgethub import BadRequest, QueryError
 import datetime
-from lib.structs import TypedCache, CacheSchema, DictProxy, SnakeCaseDictProxy
+from time import perf_counter
+from lib.structs import TypedCache, CacheSchema, SnakeCaseDictProxy, FixedSizeOrderedDict, PersistentCache
 from lib.utils.decorators import normalize_repository, validate_github_name
 from lib.typehints import GitHubRepository, GitHubOrganization, GitHubUser, GraphQLQueriesDirProxyDef
-from lib.utils import get_nested_key, get_all_dict_paths, set_nested_key
+from lib.utils import get_nested_key
 from cogs.backend.handle.errors._error_tools import log_error_in_discord
 from .transformations import *
+from .scheduler import RateLimitPool, RateLimitBudget
+from .metrics import GitHubMetrics, GitHubResponseSample, current_response_sample
 
 if TYPE_CHECKING:
     from lib.structs.discord.bot import GitBot
@@ -33,21 +41,161 @@ _ReturnDict = SnakeCaseDictProxy | dict
 _GitHubAPIQueryWrapOnFailReturnDefaultNotSet = Literal['default_not_set']
 _GitHubAPIQueryWrapOnFailReturnDefaultConditionDict = dict[str, str | int | bool | None]
 
-__all__: tuple = ('GitHubAPI', 'GitHubQueryDebugInfo')
+__all__: tuple = ('GitHubAPI', 'GitHubQueryDebugInfo', 'GitHubQueryDescriptor', 'LatestReleaseTagCheck')
 
 
-def github_cached(func: Callable) -> Callable:
-    @functools.wraps(func)
-    async def wrapper(*args: tuple, **kwargs: dict) -> Any:
-        cache_key: str = f'{id(func)}:{args[1] if args else next(iter(kwargs))}'
-        if cached := GitHubAPI.github_object_cache.get(cache_key):
-            return cached
-        result: Any = await func(*args, **kwargs)
-        if isinstance(result, (dict, list)):
-            GitHubAPI.github_object_cache[cache_key] = result
-        return result
+@functools.cache
+def _build_aliased_repository_query(template: str, n: int) -> str:
+    """
+    Build a GraphQL document that queries n repositories at once, reusing the repository selection set of a template.
+    The aliases are r0, r1, ..., r(n-1) and the variables are $Owner0, $Name0, ..., $Owner(n-1), $Name(n-1).
 
-    return wrapper
+    :param template: A query with a single repository(name: $Name, owner: $Owner) field (e.g. latest_release.graphql)
+    :param n: The number of repositories to query
+    :return: The aliased query document
+    """
+    start: int = template.index('{', template.index(')', template.index('repository(')))
+    depth: int = 0
+    for end, char in enumerate(template[start:], start):
+        depth += (char == '{') - (char == '}')
+        if depth == 0:
+            break
+    selection_set: str = template[start:end + 1]
+    variables: str = ', '.join(f'$Owner{i}: String!, $Name{i}: String!' for i in range(n))
+    fields: str = '\n'.join(f'  r{i}: repository(name: $Name{i}, owner: $Owner{i}) {selection_set}' for i in range(n))
+    return f'query({variables}) {{\n{fields}\n  rateLimit {{\n    cost\n    remaining\n    limit\n  }}\n}}'
+
+
+def _strip_failed_fields(response: dict) -> dict:
+    """
+    Get the data of a partially failed GraphQL response, keeping only the top-level fields that can be trusted:
+    the ones that resolved without errors, and the ones that are null because they don't exist (NOT_FOUND).
+    Fields that failed for any other reason (timeouts, FORBIDDEN, SAML enforcement etc.) are left out.
+
+    :param response: The response body, with data and errors
+    :return: The trustworthy part of the data
+    """
+    not_found: set[str] = set()
+    failed: set[str] = set()
+    for error in response.get('errors') or []:
+        if not (path := error.get('path')):
+            continue
+        (not_found if error.get('type') == 'NOT_FOUND' and len(path) == 1 else failed).add(path[0])
+    return {field: value for field, value in response['data'].items()
+            if field not in failed and (value is not None or field in not_found)}
+
+
+class _GitBotGidgetHubAPI(gh.GitHubAPI):
+    """
+    gidgethub's aiohttp client, reporting every raw response back to the :class:`GitHubAPI` instance that owns it.
+    """
+
+    def __init__(self, owner: 'GitHubAPI', *args, **kwargs):
+        self.owner: 'GitHubAPI' = owner
+        super().__init__(*args, **kwargs)
+
+    async def _request(self, method: str, url: str, headers: Mapping[str, str],
+                       body: bytes = b'') -> tuple[int, Mapping[str, str], bytes]:
+        status, response_headers, response_body = await super()._request(method, url, headers, body)
+        self.owner._on_response(url, status, response_headers, response_body)
+        return status, response_headers, response_body
+
+
+class GitHubCachePartition(TypedCache):
+    """
+    A :class:`TypedCache` holding the results of a single cached :class:`GitHubAPI` method,
+    keeping track of its own hit rate. Misses fall through to the persistent cache (if one is attached) before GitHub.
+
+    :param name: The name of the cached method
+    :param maxsize: The max number of results to hold
+    :param max_age: The time to store results for in seconds
+    """
+
+    def __init__(self, name: str, maxsize: int, max_age: int):
+        self.name: str = name
+        self.namespace: str = f'github:{name}'
+        self.hits: int = 0
+        self.persistent_hits: int = 0
+        self.misses: int = 0
+        super().__init__(CacheSchema(key=str, value=(dict, list)), maxsize=maxsize, max_age=max_age)
+
+    @property
+    def hit_rate(self) -> float:
+        hits: int = self.hits + self.persistent_hits
+        return hits / total if (total := hits + self.misses) else 0.0
+
+
+class _ConditionalRequestCache(FixedSizeOrderedDict):
+    """
+    The url -> (etag, last_modified, data, more) mapping gidgethub uses for conditional requests,
+    writing every stored response through to the persistent cache (if one is attached).
+
+    :param maxsize: The max number of responses to hold in memory
+    :param namespace: The persistent cache namespace to write to
+    :param max_age: The time to keep responses in the persistent cache for in seconds
+    """
+
+    def __init__(self, maxsize: int, namespace: str, max_age: int = 24 * 60 * 60):
+        self.namespace: str = namespace
+        self.max_age: int = max_age
+        self.persistent_cache: Optional[PersistentCache] = None
+        super().__init__(maxsize=maxsize)
+
+    def load(self, url: str, entry: tuple) -> None:
+        """
+        Store a response without writing it through, used to warm the cache up from the persistent one.
+        """
+        super().__setitem__(url, entry)
+
+    def __setitem__(self, url: str, entry: tuple) -> Any:
+        if self.persistent_cache is not None:
+            self.persistent_cache.put(self.namespace, url, entry, max_age=self.max_age, etag=entry[0])
+        return super().__setitem__(url, entry)
+
+
+# method name -> partition; every cached method gets its own budget, so that hot object types don't evict each other
+_github_object_cache: dict[str, GitHubCachePartition] = {}
+
+
+def github_cached(max_age: int = 450, maxsize: int = 64) -> Callable[[Callable], Callable]:
+    """
+    Cache the results of a GitHubAPI method in its own partition, keyed by all of its (bound) arguments.
+    Place it under argument-normalizing decorators (like normalize_repository), so that the key is normalized too.
+
+    :param max_age: The time to store results for in seconds
+    :param maxsize: The max number of results to hold for this method
+    :return: The decorated method
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature: inspect.Signature = inspect.signature(func)
+        partition: GitHubCachePartition = GitHubCachePartition(func.__name__, maxsize=maxsize, max_age=max_age)
+        _github_object_cache[func.__name__] = partition
+
+        @functools.wraps(func)
+        async def wrapper(*args: tuple, **kwargs: dict) -> Any:
+            bound: inspect.BoundArguments = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache_key: str = repr(tuple(value for name, value in bound.arguments.items() if name != 'self'))
+            if cached := partition.get(cache_key):
+                partition.hits += 1
+                return cached
+            persistent_cache: Optional[PersistentCache] = bound.arguments['self'].persistent_cache
+            if persistent_cache is not None and (stored := await persistent_cache.get(partition.namespace, cache_key)):
+                partition.persistent_hits += 1
+                partition[cache_key] = stored
+                return stored
+            partition.misses += 1
+            result: Any = await func(*args, **kwargs)
+            if isinstance(result, (dict, list)):
+                partition[cache_key] = result
+                if persistent_cache is not None:
+                    persistent_cache.put(partition.namespace, cache_key, result, max_age=partition.max_age)
+            return result
+
+        return wrapper
+
+    return decorator
 
 
 # decorator to wrap return in snake-case-DictProxy if the return is not None else None; ! use before any other decos !
@@ -62,54 +210,150 @@ def _wrap_proxy(func: Callable) -> Callable[..., SnakeCaseDictProxy | None]:
     return wrapper
 
 
-def _flatten_total_counts(func: Callable) -> Callable[..., DictProxy | SnakeCaseDictProxy | None]:
+_GRAPHQL_IGNORED: re.Pattern = re.compile(r'#[^\n]*|"(?:\\.|[^"\\])*"')
+_GRAPHQL_ARGUMENTS: re.Pattern = re.compile(r'\([^()]*\)')
+_GRAPHQL_TOKEN: re.Pattern = re.compile(r'\.\.\.\s*on\s+\w+|\w+\s*:\s*\w+|\w+|[{}]')
+
+
+class _ResponseShape(NamedTuple):
     """
-    Flattens totalCount fields in the response dict by copying the value up one level and setting a "<parent>_count" key.
+    What a GraphQL query's response looks like, as far as flattening it goes. Compiled once per query at load time.
 
-    :param func: The function to wrap (must return a dict-like interface)
-    :return: The wrapped functions output, with the totalCount fields flattened
+    count_fields frozenset[str]: The fields selecting totalCount, flattened into a "<field>_count" key next to them
+    nodes_fields frozenset[str]: The fields selecting nothing but nodes, replaced with the nodes list
     """
 
-    @functools.wraps(func)
-    async def wrapper(*args: tuple, **kwargs: dict) -> Any:
-        result: dict | None = await func(*args, **kwargs)
-        if result is not None and isinstance(result, (DictProxy, SnakeCaseDictProxy, dict)):
-            result = SnakeCaseDictProxy(result)
-            paths: list[tuple[str, ...]] = get_all_dict_paths(result)
-            for path in paths:
-                if path[-1] == 'totalcount':  # noqa
-                    # this dict path contains a totalCount field in the last position -
-                    # we flatten it by copying the dict item up one level and renaming the key to <parent>_count.
-                    # note that this does not remove the totalCount field from the dict or anything for that matter,
-                    # it just makes it easier to access the value.
-                    set_nested_key(result, path[:-2] + (f'{path[-2]}_count',), get_nested_key(result, path))
-        return result
+    count_fields: frozenset[str]
+    nodes_fields: frozenset[str]
 
-    return wrapper
+    @classmethod
+    def compile(cls, query: str) -> '_ResponseShape':
+        """
+        Derive the shape of a query's response from its document.
+
+        :param query: The GraphQL query document
+        :return: The compiled shape
+        """
+        document: str = _GRAPHQL_IGNORED.sub('', query)
+        while (stripped := _GRAPHQL_ARGUMENTS.sub('', document)) != document:  # arguments can contain objects
+            document = stripped
+        count_fields: set[str] = set()
+        nodes_fields: set[str] = set()
+        # (response key of the field or None for the operation/inline fragments, response keys of its selections)
+        stack: list[tuple[Optional[str], set[str]]] = []
+        last: Optional[str] = None
+        for token in _GRAPHQL_TOKEN.findall(document[document.index('{'):]):
+            if token == '{':
+                stack.append((last, set()))
+                last = None
+            elif token == '}':
+                field, selections = stack.pop()
+                if field is None and stack:  # inline fragment, its selections belong to the enclosing field
+                    stack[-1][1].update(selections)
+                elif field is not None:
+                    if 'totalCount' in selections:
+                        count_fields.add(field)
+                    if selections == {'nodes'}:
+                        nodes_fields.add(field)
+            elif token.startswith('...'):
+                last = None
+            else:
+                last = token.split(':')[0].strip()  # the alias is the response key
+                if stack:
+                    stack[-1][1].add(last)
+        return cls(frozenset(count_fields), frozenset(nodes_fields))
+
+    def flatten(self, data: dict, counts: bool = True, nodes: bool = True) -> dict:
+        """
+        Flatten a (transformed) response in a single walk, without modifying it.
+        Only nested dicts are walked, items of lists are kept as they are.
 
+        :param data: The response to flatten
+        :param counts: Whether to flatten the totalCount fields by copying them up one level as "<field>_count"
+        :param nodes: Whether to replace the fields selecting only nodes with the nodes themselves
+        :return: The flattened copy of the response
+        """
+        flattened: dict = {}
+        for key, value in data.items():
+            if isinstance(value, dict):
+                if nodes and key in self.nodes_fields and len(value) == 1 and 'nodes' in value:
+                    flattened[key] = value['nodes']
+                    continue
+                if counts and key in self.count_fields and 'totalCount' in value:
+                    flattened[f'{key}_count'] = value['totalCount']
+                value = self.flatten(value, counts, nodes)
+            flattened[key] = value
+        return flattened
+
+
+def _shaped_proxy(query_name: str, counts: bool = True, nodes: bool = False) -> Callable[[Callable], Callable]:
+    """
+    Flatten the result using the compiled shape of the query it came from and wrap it in a snake-case-DictProxy,
+    all at once. Replaces :func:`_wrap_proxy`, so it has to be the outermost decorator too.
 
-def _flatten_nodes(func: Callable) -> Callable[..., DictProxy | SnakeCaseDictProxy | None]:
+    :param query_name: The name of the query the result came from
+    :param counts: Whether to flatten totalCount fields into "<parent>_count" keys
+    :param nodes: Whether to replace fields selecting only nodes with the nodes themselves
+    :return: The decorated method
     """
-    Flattens the nodes field in the response dict by copying the value up one level and removing the old key
 
-    :param func: The function to wrap (must return a dict-like interface)
-    :return: The wrapped functions output, with the nodes field flattened and removed
+    def decorator(func: Callable) -> Callable[..., SnakeCaseDictProxy | str | None]:
+        @functools.wraps(func)
+        async def wrapper(self: 'GitHubAPI', *args: tuple, **kwargs: dict) -> Any:
+            result: dict | str | None = await func(self, *args, **kwargs)
+            if isinstance(result, dict):
+                return SnakeCaseDictProxy(self.response_shapes[query_name].flatten(result, counts, nodes))
+            if result is not None and not isinstance(result, str):
+                return SnakeCaseDictProxy(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class LatestReleaseTagCheck(NamedTuple):
     """
+    The result of :meth:`GitHubAPI.check_latest_release_tag`.
 
-    @functools.wraps(func)
-    async def wrapper(*args: tuple, **kwargs: dict) -> Any:
-        result: dict | None = await func(*args, **kwargs)
-        if result is not None and isinstance(result, (DictProxy, SnakeCaseDictProxy, dict)):
-            result = SnakeCaseDictProxy(result)
-            paths: list[tuple[str, ...]] = get_all_dict_paths(result)
-            for path in paths:
-                if path[-1] == 'nodes' and len(get_nested_key(result, path[:-1])) == 1:  # noqa
-                    # this dict path contains a nodes field in the last position -
-                    # we flatten it by copying the dict item up one level and effectively replacing the nodes field with it
-                    set_nested_key(result, path[:-2] + (f'{path[-2]}',), get_nested_key(result, path))
-        return result
+    Attributes
+    ----------
+    status int: The response status - 200, 304 (unchanged since the passed ETag) or 404 (no release or no repo)
+    etag Optional[str]: The ETag to revalidate the latest release with next time
+    tag Optional[str]: The latest release's tag name, None unless the status is 200
+    """
+
+    status: int
+    etag: Optional[str]
+    tag: Optional[str]
 
-    return wrapper
+
+class GitHubQueryDescriptor(NamedTuple):
+    """
+    Describes a single call made through :meth:`GitHubAPI.query`.
+    It's built once per call with O(1) operations and carried along, so that the error path doesn't have to
+    reconstruct it by inspecting the stack or scanning the loaded queries.
+
+    Attributes
+    ----------
+    name str: The query's name (e.g. "repo.graphql") or the REST path
+    method str: "GraphQL" or "REST"
+    variables dict: The sanitized GraphQL variables (empty for REST)
+    caller str: The name of the GitHubAPI method that made the call
+    filename str: The file the call was made from
+    lineno int: The line the call was made from
+    """
+
+    name: str
+    method: Literal['GraphQL', 'REST']
+    variables: dict[str, int | str | bool]
+    caller: str
+    filename: str
+    lineno: int
+
+    @property
+    def location(self) -> str:
+        return f'{self.filename}:#{self.lineno}:{self.caller}()'
 
 
 class GitHubQueryDebugInfo:
@@ -123,6 +367,9 @@ class GitHubQueryDebugInfo:
         'No commit found for the ref',
         'Variable $Oid of type GitObjectID! was provided invalid value'
     )
+    __ignorable_error_substrings_casefolded__: tuple[str, ...] = tuple(
+        substring.casefold() for substring in __ignorable_error_substrings__
+    )
 
     """
     A class used to store information about a failed GitHub API query.
@@ -131,29 +378,22 @@ class GitHubQueryDebugInfo:
     ----------
     error: BadRequest | QueryError
         The error that was raised by the GitHub API.
-    faulty_frame: inspect.FrameInfo
-        The frame in which the error was raised.
-    additional_info: dict[str, int | str | bool] | str | None
-        Additional information to be included in the error message.
+    descriptor: GitHubQueryDescriptor
+        The descriptor of the failed call.
     """
 
-    def __init__(self, error: BadRequest | QueryError, faulty_frame: inspect.FrameInfo,
-                 additional_info: tuple[str, dict[str, int | str | bool]] | str | None = None):
+    def __init__(self, error: BadRequest | QueryError, descriptor: GitHubQueryDescriptor):
         self.error: BadRequest | QueryError = error
-        self.faulty_frame: inspect.FrameInfo = faulty_frame
-        self.filename: str = faulty_frame.filename
-        self.lineno: int = faulty_frame.lineno
-        self.function: str = faulty_frame.function
-        self._additional_info: dict[str, int | str | bool] | str | None = additional_info
+        self.descriptor: GitHubQueryDescriptor = descriptor
+        self.function: str = descriptor.caller
+        self._error_casefolded: str = str(error).casefold()
 
     @property
     def additional_info(self) -> str | None:
-        if self._additional_info is None:
-            return None
-        if isinstance(self._additional_info, tuple):
-            return f'GraphQL query "{self._additional_info[0]}" failed with the following variables:\n' \
-                   f'{" ".join([f"{key}={value};" for key, value in self._additional_info[1].items()])}'
-        return f'REST query path: {self._additional_info}'  # additional info is from a rest call
+        if self.descriptor.method == 'GraphQL':
+            return f'GraphQL query "{self.descriptor.name}" failed with the following variables:\n' \
+                   f'{" ".join([f"{key}={value};" for key, value in self.descriptor.variables.items()])}'
+        return f'REST query path: {self.descriptor.name}'
 
     @property
     def status_code(self) -> int | None:
@@ -167,16 +407,17 @@ class GitHubQueryDebugInfo:
 
         :return: A list of ignorable error substrings/rules that match the error message.
         """
-        return [substring for substring in self.__ignorable_error_substrings__ if
-                substring.casefold() in str(self.error).casefold()]
+        return [substring for substring, casefolded in zip(self.__ignorable_error_substrings__,
+                                                           self.__ignorable_error_substrings_casefolded__)
+                if casefolded in self._error_casefolded]
 
     @property
     def is_ignorable(self) -> bool:
-        return bool(self.matching_ignore_rules)
+        return any(casefolded in self._error_casefolded for casefolded in self.__ignorable_error_substrings_casefolded__)
 
     @property
     def code_location(self) -> str:
-        return f'{self.filename}:#{self.lineno}:{self.function}()'
+        return self.descriptor.location
 
     def __repr__(self) -> str:
         return f'<{self.__class__.__name__} error={self.error} ignorable={self.is_ignorable} code_location="{self.code_location}">'
@@ -184,9 +425,19 @@ class GitHubQueryDebugInfo:
 
 class GitHubAPI:
     __base_url__: str = 'https://api.github.com'
-    __non_query_methods__: tuple[str, ...] = ('query', '_sanitize_graphql_variables')
+    __conditional_request_cache_size__: int = 512
     requester: str = 'gitbot'
-    github_object_cache: TypedCache = TypedCache(CacheSchema(key=str, value=(dict, list)), maxsize=64, max_age=450)
+    github_object_cache: dict[str, GitHubCachePartition] = _github_object_cache
+    # requests currently on their way to GitHub, shared between instances so that identical concurrent calls
+    # (e.g. the same repo link posted in several guilds) result in a single request
+    inflight_requests: dict[tuple, asyncio.Future] = {}
+    inflight_stats: dict[str, int] = {'leaders': 0, 'coalesced': 0}
+    # (query or path, variables) -> error message of recent queries that failed with an ignorable error,
+    # so that the same typo or dead link isn't sent to GitHub again on the next message
+    negative_cache: TypedCache = TypedCache(CacheSchema(key=tuple, value=str), maxsize=512, max_age=90)
+    # the on-disk tier behind github_object_cache and the conditional request cache, see attach_persistent_cache
+    persistent_cache: Optional[PersistentCache] = None
+    metrics: GitHubMetrics = GitHubMetrics()
 
     """
     The main class used to interact with the GitHub API.
@@ -200,14 +451,65 @@ class GitHubAPI:
         The GitHub API token to use for authorization.
     session: aiohttp.ClientSession
         The aiohttp session to use for requests.
+    base_url: str
+        The root of the API to send requests to, GitHub's unless a stand-in is used (e.g. by the load benchmarks).
     """
 
-    def __init__(self, bot: 'GitBot', token: str, session: aiohttp.ClientSession):
+    def __init__(self, bot: 'GitBot', token: str, session: aiohttp.ClientSession, base_url: str = __base_url__):
         self.bot: 'GitBot' = bot
+        self.base_url: str = base_url
         self.__token: str = token
+        # identifies the token in metrics and persistent cache namespaces without exposing it
+        self.token_fingerprint: str = hashlib.sha256(str(token).encode()).hexdigest()[:12]
         self.queries: GraphQLQueriesDirProxyDef = GraphQLQueriesDirProxyDef('./resources/queries/', ('.gql', '.graphql'))
+        self._query_names: dict[str, str] = {content: f'{name}.graphql' for name, content in vars(self.queries).items()
+                                             if isinstance(content, str)}
+        self.response_shapes: dict[str, _ResponseShape] = {name: _ResponseShape.compile(content)
+                                                           for name, content in vars(self.queries).items()
+                                                           if isinstance(content, str)}
         self.session: aiohttp.ClientSession = session
-        self.gh: gh.GitHubAPI = gh.GitHubAPI(session=self.session, requester=self.requester, oauth_token=self.__token)
+        # gidgethub stores the ETag/Last-Modified of REST GETs in here and revalidates them with If-None-Match,
+        # serving the stored body on 304 (which doesn't count towards the rate limit). It's kept per-instance,
+        # since the validators are tied to the token that fetched the resource
+        self.conditional_request_cache: _ConditionalRequestCache = _ConditionalRequestCache(
+            maxsize=self.__conditional_request_cache_size__,
+            namespace=f'github:conditional:{self.token_fingerprint}'
+        )
+        self.rate_limits: dict[RateLimitPool, RateLimitBudget] = {'core': RateLimitBudget(),
+                                                                  'graphql': RateLimitBudget()}
+        self.gh: gh.GitHubAPI = _GitBotGidgetHubAPI(self, session=self.session, requester=self.requester,
+                                                    oauth_token=self.__token, cache=self.conditional_request_cache,
+                                                    base_url=self.base_url)
+
+    async def attach_persistent_cache(self, persistent_cache: PersistentCache) -> None:
+        """
+        Put a persistent cache behind the in-memory ones and warm the conditional request cache up from it,
+        so that the first requests after a restart can be revalidated instead of fetched.
+
+        :param persistent_cache: The persistent cache to attach
+        """
+        self.persistent_cache = persistent_cache
+        self.conditional_request_cache.persistent_cache = persistent_cache
+        for url, entry in await persistent_cache.recent(self.conditional_request_cache.namespace,
+                                                        self.conditional_request_cache.maxsize):
+            self.conditional_request_cache.load(url, tuple(entry))
+
+    def _on_response(self, url: str, status: int, headers: Mapping[str, str], body: bytes) -> None:
+        """
+        Called with every raw response received by this instance,
+        used to keep track of the rate limits and to fill in the metrics sample of the current call.
+
+        :param url: The URL that was requested
+        :param status: The response status code
+        :param headers: The response headers
+        :param body: The response body
+        """
+        if (sample := current_response_sample.get()) is not None:
+            sample.status = status
+            sample.response_bytes += len(body)
+        pool: str = headers.get('x-ratelimit-resource') or ('graphql' if url.endswith('/graphql') else 'core')
+        if pool in self.rate_limits:  # the bot makes no calls charged to the other pools (search etc.)
+            self.rate_limits[pool].update_from_headers(headers)
 
     @staticmethod
     def _sanitize_graphql_variables(variables: dict[str, ...]) -> dict[str, ...]:
@@ -223,11 +525,31 @@ class GitHubAPI:
             del variables['_Repo']
         return variables
 
+    @staticmethod
+    def _resolve_on_fail_return(on_fail_return: _GitHubAPIQueryWrapOnFailReturnDefaultConditionDict | bool | list | None,
+                                error: str) -> Any:
+        """
+        Resolve the value to return from a query that failed with an ignorable error.
+
+        :param on_fail_return: The on_fail_return argument passed to :meth:`query`
+        :param error: The error message
+        :return: The value to return
+        """
+        # {condition: return_value, __default__?: return_value}
+        if isinstance(on_fail_return, dict):
+            for cond, ret in on_fail_return.items():
+                if cond in error:
+                    return ret
+            return on_fail_return.get('__default__')
+        return on_fail_return
+
     async def query(self,
                     query_or_path: str,
                     transformer: tuple[str, ...] | str | Callable[[dict], dict] | None = None,
                     on_fail_return: _GitHubAPIQueryWrapOnFailReturnDefaultConditionDict |
                                     _GitHubAPIQueryWrapOnFailReturnDefaultNotSet | bool | list | None = 'default_not_set',
+                    allow_partial: bool = False,
+                    query_name: Optional[str] = None,
                     **graphql_variables) -> _ReturnDict | list[_ReturnDict] | str | bool | None:
         """
         Wraps a GitHub API query call, handling errors and returning the result.
@@ -239,41 +561,121 @@ class GitHubAPI:
         :param on_fail_return: What to return if the query fails. If set to 'default_not_set', the query will raise an exception.
                A dict can be passed to specify conditional matching of returns, where the content of the API errors response
                is matched against the dict keys and the value of the matched key is returned.
+        :param allow_partial: If True, a GraphQL response that carries both errors and data is passed to the transformer
+               instead of being treated as a failure (used by batched queries where some of the aliases may not resolve)
+        :param query_name: The name to describe the query with, required for GraphQL queries that were not loaded
+               from the queries directory (e.g. generated ones)
         :param graphql_variables: The variables to pass to the GraphQL query if GraphQL is used.
         :return: The result of the query, or the result of the transformer if one was provided.
         """
         is_graphql: bool = not query_or_path.startswith('/')
+        if is_graphql:
+            graphql_variables = self._sanitize_graphql_variables(graphql_variables)
+        caller: FrameType = sys._getframe(1)  # noqa, query is only ever called directly by the method making the call
+        descriptor: GitHubQueryDescriptor = GitHubQueryDescriptor(
+            name=query_name or self._query_names.get(query_or_path, '<generated query>') if is_graphql else query_or_path,
+            method='GraphQL' if is_graphql else 'REST',
+            variables=graphql_variables,
+            caller=caller.f_code.co_name,
+            filename=caller.f_code.co_filename,
+            lineno=caller.f_lineno
+        )
+        # REST paths contain the requested resource, so they're grouped by the method making the call instead
+        metrics_name: str = descriptor.name if is_graphql else descriptor.caller
+        start: float = perf_counter()
+        request: tuple = (query_or_path, tuple(sorted(graphql_variables.items())))
+        if on_fail_return != 'default_not_set' and (error := self.negative_cache.get(request)) is not None:
+            # this exact query recently failed with an ignorable error (nonexistent user, deleted repo etc.)
+            self.bot.logger.debug('Negative cache hit for GitHub query call: "%s"', error)
+            self.metrics.record(metrics_name, self.token_fingerprint, perf_counter() - start, cache_hit=True)
+            return self._resolve_on_fail_return(on_fail_return, error)
+        key: tuple = request + (transformer, repr(on_fail_return), allow_partial)
+        if (inflight := self.inflight_requests.get(key)) is not None:
+            # an identical request is already on its way, so we wait for it instead of making our own
+            self.inflight_stats['coalesced'] += 1
+            try:
+                result: Any = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # we were cancelled ourselves, there's nothing to record
+                # the leading call was cancelled, not us - fall through and make the request ourselves
+            except Exception as e:
+                # only successful results count as served without a request, failures are recorded as such
+                failed: GitHubResponseSample = GitHubResponseSample()
+                failed.error = e.__class__.__name__
+                self.metrics.record(metrics_name, self.token_fingerprint, perf_counter() - start,
+                                    cache_hit=False, sample=failed)
+                raise
+            else:
+                self.metrics.record(metrics_name, self.token_fingerprint, perf_counter() - start, cache_hit=True)
+                return result
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.inflight_requests[key] = future
+        self.inflight_stats['leaders'] += 1
+        sample: GitHubResponseSample = GitHubResponseSample()
+        context_token = current_response_sample.set(sample)
+        try:
+            result: Any = await self._query(query_or_path, descriptor, transformer, on_fail_return, allow_partial)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            sample.error = sample.error or e.__class__.__name__
+            future.set_exception(e)
+            future.exception()  # mark the exception as retrieved in case nobody else was waiting for it
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            current_response_sample.reset(context_token)
+            if self.inflight_requests.get(key) is future:
+                del self.inflight_requests[key]
+            if not future.cancelled():
+                # a 304 means gidgethub served the body from the conditional request cache
+                self.metrics.record(metrics_name, self.token_fingerprint, perf_counter() - start,
+                                    cache_hit=sample.status == 304, sample=sample)
+
+    async def _query(self,
+                     query_or_path: str,
+                     descriptor: GitHubQueryDescriptor,
+                     transformer: tuple[str, ...] | str | Callable[[dict], dict] | None,
+                     on_fail_return: _GitHubAPIQueryWrapOnFailReturnDefaultConditionDict |
+                                     _GitHubAPIQueryWrapOnFailReturnDefaultNotSet | bool | list | None,
+                     allow_partial: bool) -> _ReturnDict | list[_ReturnDict] | str | bool | None:
+        """
+        Performs the actual request for :meth:`query`, after the variables have been sanitized
+        and no identical request turned out to be in flight.
+        """
+        is_graphql: bool = descriptor.method == 'GraphQL'
         try:
             q_res: _ReturnDict = (
                 await (self.gh.getitem(query_or_path) if not is_graphql else self.gh.graphql(query_or_path,
-                                                                                             **self._sanitize_graphql_variables(
-                                                                                                 graphql_variables))))
+                                                                                             endpoint=self.base_url + '/graphql',
+                                                                                             **descriptor.variables)))
+            if is_graphql and isinstance(q_res, dict) and (rate_limit := q_res.get('rateLimit')):
+                self.rate_limits['graphql'].update_from_graphql(rate_limit)
+                if (sample := current_response_sample.get()) is not None:
+                    sample.cost = rate_limit.get('cost')
             transformer = (transformer,) if isinstance(transformer, str) and transformer is not None else transformer
             if isinstance(transformer, tuple):
                 return get_nested_key(q_res, transformer)
             return transformer(q_res) if callable(transformer) else q_res
         except (QueryError, BadRequest) as e:
             e: BadRequest | QueryError  # idk why pycharm doesn't pick the types up on its own
-            # below we get the frame of the function from this class that this very function was called from.
-            # we cannot simply get the last one or anything, because of decorators getting in the way.
-            # we make some expensive calls here, but it's fine because this is only called on errors
-            actual_f_frame: inspect.FrameInfo = [frame for frame in inspect.stack() if frame.function in dir(self) and (
-                    frame.function not in self.__non_query_methods__)][0]
-            debug: GitHubQueryDebugInfo = GitHubQueryDebugInfo(e, actual_f_frame, (
-                f'{[q_name for q_name, q_content in self.queries.__dict__.items() if q_content == query_or_path][0]}.graphql',
-                graphql_variables) if is_graphql else query_or_path if is_graphql else query_or_path)
+            if allow_partial and isinstance(e, QueryError) and e.response.get('data'):
+                data: dict = _strip_failed_fields(e.response)
+                return transformer(data) if callable(transformer) else data
+            if (sample := current_response_sample.get()) is not None:
+                sample.error = e.__class__.__name__
+            debug: GitHubQueryDebugInfo = GitHubQueryDebugInfo(e, descriptor)
             if debug.is_ignorable and on_fail_return != 'default_not_set':
                 self.bot.logger.debug(f'Ignoring GitHub {e.__class__.__name__} in query call {self.__class__.__name__}'
-                                      f'.{actual_f_frame.function}(): "{e}" -> ignore conditions matched: {debug.matching_ignore_rules}')
-                # {condition: return_value, __default__?: return_value}
-                if isinstance(on_fail_return, dict):
-                    for cond, ret in on_fail_return.items():
-                        if cond in str(e):
-                            return ret
-                    return on_fail_return.get('__default__')
-                return on_fail_return
+                                      f'.{descriptor.caller}(): "{e}" -> ignore conditions matched: {debug.matching_ignore_rules}')
+                self.negative_cache[(query_or_path, tuple(sorted(descriptor.variables.items())))] = str(e)
+                return self._resolve_on_fail_return(on_fail_return, str(e))
             self.bot.logger.error(
-                f'GitHub {e.__class__.__name__} in query call {self.__class__.__name__}.{actual_f_frame.function}: "{e}"')
+                f'GitHub {e.__class__.__name__} in query call {self.__class__.__name__}.{descriptor.caller}: "{e}"')
             # we need to create a fake context to pass to the error logger; jank and probs needs rework in the future,
             # but it works just fine for now
             moot_context = type('_ctx', (object,), {'command': None, 'message': None, 'bot': self.bot,
@@ -291,17 +693,17 @@ class GitHubAPI:
     async def me(self) -> _ReturnDict:
         return await self.query('/user')
 
-    @github_cached
+    @github_cached(max_age=5 * 60)
     @validate_github_name('user')
     async def get_user_repos(self, user: GitHubUser) -> list[_ReturnDict]:
         return await self.query(f'/users/{user}/repos', on_fail_return=[])
 
-    @github_cached
+    @github_cached(max_age=30 * 60)
     @validate_github_name('org')
     async def get_org(self, org: GitHubOrganization) -> Optional[_ReturnDict]:
         return await self.query(f'/orgs/{org}', on_fail_return=None)
 
-    @github_cached
+    @github_cached(max_age=10 * 60)
     @validate_github_name('org', default=[])
     async def get_org_repos(self, org: GitHubOrganization) -> list[_ReturnDict]:
         return await self.query(f'/orgs/{org}/repos', on_fail_return=[])
@@ -319,22 +721,22 @@ class GitHubAPI:
         return await self.query(f'/repos/{repo}/contents{path}' + (f'?ref={ref}' if ref else ''),
                                 on_fail_return={'ref': False, '__default__': None})
 
-    @github_cached
+    @github_cached(max_age=30 * 60)
     @validate_github_name('user', default=[])
     async def get_user_orgs(self, user: GitHubUser) -> list[_ReturnDict]:
         return await self.query(f'/users/{user}/orgs', on_fail_return=[])
 
-    @github_cached
+    @github_cached(max_age=60 * 60, maxsize=32)
     @validate_github_name('org', default=[])
     async def get_org_members(self, org: GitHubOrganization) -> list[_ReturnDict]:
         return await self.query(f'/orgs/{org}/public_members', on_fail_return=[])
 
-    @github_cached
+    @github_cached(max_age=10 * 60)
     async def get_gist(self, gist_id: str) -> Optional[_ReturnDict]:
         return await self.query(f'/gists/{gist_id}', on_fail_return=None)
 
     @_wrap_proxy
-    @github_cached
+    @github_cached(max_age=5 * 60)
     @validate_github_name('user')
     async def get_user_gists(self, user: GitHubUser) -> Optional[_ReturnDict]:
         return await self.query(self.queries.user_gists, 'user', Login=user, on_fail_return=None)
@@ -347,6 +749,7 @@ class GitHubAPI:
 
     @_wrap_proxy
     @normalize_repository
+    @github_cached(max_age=60 * 60)  # commits are immutable, so they can be cached for longer
     async def get_commit(self, repo: GitHubRepository, oid: str) -> Optional[_ReturnDict] | Literal[False]:
         return await self.query(self.queries.commit, on_fail_return={'Repository': False, '__default__': None},
                                 _Repo=repo, Oid=oid, transformer=('repository', 'object'))
@@ -384,7 +787,7 @@ class GitHubAPI:
                            size_threshold: int = DISCORD_UPLOAD_SIZE_THRESHOLD_BYTES) -> Optional[bool | bytes]:
         if '/' not in repo or repo.count('/') > 1:
             return None
-        res = await self.session.get(self.__base_url__ + f'/repos/{repo}/zipball',
+        res = await self.session.get(self.base_url + f'/repos/{repo}/zipball',
                                      headers={'Authorization': f'token {self.__token}'})
         if res.status == 200:
             try:
@@ -401,15 +804,86 @@ class GitHubAPI:
         return await self.query(self.queries.latest_release, _Repo=repo, transformer=transform_latest_release,
                                 on_fail_return=None)
 
+    async def check_latest_release_tag(self, repo: GitHubRepository, etag: Optional[str] = None) -> LatestReleaseTagCheck:
+        """
+        Check the tag name of a repository's latest release with a conditional REST request,
+        which doesn't count towards the rate limit if the release didn't change since the ETag was received.
+        Only the tag name is kept, so the ETags can be stored by the caller instead of in the conditional request cache.
+
+        :param repo: The repository to check
+        :param etag: The ETag returned by the previous check, if any
+        :return: The status, the ETag to use next time and the tag name; other statuses raise aiohttp.ClientResponseError
+        """
+        start: float = perf_counter()
+        sample: GitHubResponseSample = GitHubResponseSample()
+        headers: dict[str, str] = {'Authorization': f'token {self.__token}', 'Accept': 'application/vnd.github+json',
+                                   'User-Agent': self.requester}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        try:
+            async with self.session.get(self.base_url + f'/repos/{repo}/releases/latest', headers=headers) as res:
+                sample.status = res.status
+                self.rate_limits['core'].update_from_headers(res.headers)
+                if res.status == 304:
+                    return LatestReleaseTagCheck(304, etag, None)
+                if res.status == 404:
+                    return LatestReleaseTagCheck(404, None, None)
+                res.raise_for_status()
+                body: bytes = await res.read()
+                sample.response_bytes = len(body)
+                return LatestReleaseTagCheck(res.status, res.headers.get('ETag'), json.loads(body)['tag_name'])
+        except Exception as e:
+            sample.error = e.__class__.__name__
+            raise
+        finally:
+            self.metrics.record('check_latest_release_tag', self.token_fingerprint, perf_counter() - start,
+                                cache_hit=sample.status == 304, sample=sample)
+
+    async def get_latest_releases(self,
+                                  repos: Iterable[GitHubRepository],
+                                  batch_size: int = 25) -> dict[GitHubRepository, Optional[_ReturnDict]]:
+        """
+        Fetch the latest releases of many repositories, querying up to batch_size of them in a single GraphQL request.
+
+        :param repos: The repositories to fetch the latest releases of, in the owner/name format
+        :param batch_size: The max number of repositories to query in a single request
+        :return: A mapping of repo -> result in the shape of get_latest_release, None if the repo doesn't exist;
+                 repos that couldn't be fetched (failed batches, aliases failing with other errors) are left out
+        """
+        results: dict[GitHubRepository, Optional[_ReturnDict]] = {}
+        valid: list[GitHubRepository] = []
+        for repo in dict.fromkeys(repos):
+            if repo.count('/') == 1:
+                valid.append(repo)
+            else:
+                results[repo] = None
+        for offset in range(0, len(valid), batch_size):
+            batch: list[GitHubRepository] = valid[offset:offset + batch_size]
+            variables: dict[str, str] = {}
+            for i, repo in enumerate(batch):
+                variables[f'Owner{i}'], variables[f'Name{i}'] = repo.split('/')
+            data: Optional[dict] = await self.query(
+                _build_aliased_repository_query(self.queries.latest_release, len(batch)),
+                on_fail_return=None, allow_partial=True,
+                query_name=f'latest_release.graphql (batch of {len(batch)})', **variables
+            )
+            if not data:  # the whole batch failed, its repos are left out to be retried
+                continue
+            for i, repo in enumerate(batch):
+                if (alias := f'r{i}') in data:  # aliases that failed for any other reason than not existing aren't
+                    results[repo] = (SnakeCaseDictProxy(transform_latest_release({'repository': data[alias]}))
+                                     if data[alias] else None)
+        return results
+
     @_wrap_proxy
     @normalize_repository
-    @github_cached
+    @github_cached(max_age=10 * 60, maxsize=128)
     async def get_repo(self, repo: GitHubRepository) -> Optional[_ReturnDict]:
         return await self.query(self.queries.repo, transformer=transform_repo, on_fail_return=None, _Repo=repo)
 
     @_wrap_proxy
     @normalize_repository
-    @github_cached
+    @github_cached(max_age=10 * 60, maxsize=128)
     async def rest_get_repo(self, repo: GitHubRepository) -> Optional[_ReturnDict]:
         return await self.query(f'/repos/{repo}', on_fail_return=None)
 
@@ -434,8 +908,7 @@ class GitHubAPI:
         return await self.query(self.queries.pull_requests, _Repo=repo, Last=last, States=state,
                                 on_fail_return=None, transformer=('repository', 'pullRequests', 'nodes'))
 
-    @_wrap_proxy
-    @_flatten_total_counts
+    @_shaped_proxy('issue')
     @normalize_repository
     async def get_issue(self,
                         repo: GitHubRepository,
@@ -458,9 +931,8 @@ class GitHubAPI:
         return await self.query(self.queries.issues, _Repo=repo, Last=last, States=state,
                                 transformer=('repository', 'issues', 'nodes'), on_fail_return=None)
 
-    @_wrap_proxy
-    @_flatten_total_counts
-    @github_cached
+    @_shaped_proxy('user')
+    @github_cached(max_age=5 * 60, maxsize=128)
     @validate_github_name('user')
     async def get_user(self, user: GitHubUser) -> Optional[_ReturnDict]:
         return await self.query(self.queries.user, Login=user, FromTime=YEAR_START,
@@ -473,8 +945,7 @@ class GitHubAPI:
         return await self.query(self.queries.latest_releases, _Repo=repo, N=n,
                                 on_fail_return=[], transformer=('repository', 'releases', 'nodes'))
 
-    @_wrap_proxy
-    @_flatten_nodes
+    @_shaped_proxy('latest_releases', counts=False, nodes=True)
     @normalize_repository
     async def get_latest_n_releases_with_repo(self, repo: GitHubRepository, n: int = 5) -> list[_ReturnDict]:
         return await self.query(self.queries.latest_releases, _Repo=repo, N=n, on_fail_return=None,
@@ -0,0 +1,175 @@
+# coding: utf-8
+
+"""
+Instrumentation of the calls made through GitHubAPI.query.
+~~~~~~~~~~~~~~~~~~~
+Keeps per-query, per-token call counts, latency histograms, GraphQL costs, response sizes, cache outcomes and errors,
+and renders them in the OpenMetrics text format.
+:copyright: (c) 2020-present, statch
+:license: CC BY-NC-ND 4.0, see LICENSE for more details.
+"""
+
+import os
+import bisect
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+__all__: tuple = ('GitHubResponseSample', 'QueryMetrics', 'GitHubMetrics', 'current_response_sample')
+
+# upper bounds of the latency histogram buckets in seconds, the last (implicit) bucket is +Inf
+LATENCY_BUCKETS: tuple[float, ...] = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class GitHubResponseSample:
+    """
+    What's known about the responses received while serving a single call, filled in as the call goes.
+    """
+
+    __slots__: tuple = ('response_bytes', 'status', 'cost', 'error')
+
+    def __init__(self):
+        self.response_bytes: int = 0
+        self.status: Optional[int] = None
+        self.cost: Optional[int] = None
+        self.error: Optional[str] = None
+
+
+# the sample of the call currently being served in this task, set by GitHubAPI.query for the raw response hook
+current_response_sample: ContextVar[Optional[GitHubResponseSample]] = ContextVar('current_response_sample',
+                                                                                 default=None)
+
+
+class QueryMetrics:
+    """
+    The metrics of a single query (or REST route) made with a single token.
+
+    :param sample_size: The number of most recent latencies to compute the percentiles from
+    """
+
+    __slots__: tuple = ('calls', 'cache_hits', 'cache_misses', 'errors', 'graphql_cost', 'response_bytes',
+                        'latency_buckets', 'latency_sum', 'latencies')
+
+    def __init__(self, sample_size: int = 1024):
+        self.calls: int = 0
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.errors: Counter[str] = Counter()
+        self.graphql_cost: int = 0
+        self.response_bytes: int = 0
+        self.latency_buckets: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum: float = 0.0
+        self.latencies: deque[float] = deque(maxlen=sample_size)
+
+    def record(self, latency: float, cache_hit: bool, sample: Optional[GitHubResponseSample] = None) -> None:
+        self.calls += 1
+        self.latency_sum += latency
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.latencies.append(latency)
+        if cache_hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        if sample is not None:
+            self.response_bytes += sample.response_bytes
+            self.graphql_cost += sample.cost or 0
+            if sample.error is not None:
+                self.errors[sample.error] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Get a latency percentile (nearest-rank) out of the most recent calls.
+
+        :param q: The percentile to get, 0-100
+        :return: The latency in seconds, 0.0 if there were no calls yet
+        """
+        if not self.latencies:
+            return 0.0
+        ordered: list[float] = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class GitHubMetrics:
+    """
+    The registry of :class:`QueryMetrics`, keyed by (query, token).
+    The query is the name of the GraphQL query or the GitHubAPI method making the REST call,
+    the token is a short fingerprint of the token used.
+    """
+
+    def __init__(self):
+        self.queries: dict[tuple[str, str], QueryMetrics] = {}
+
+    def get(self, query: str, token: str) -> QueryMetrics:
+        if (metrics := self.queries.get(key := (query, token))) is None:
+            metrics = self.queries[key] = QueryMetrics()
+        return metrics
+
+    def record(self, query: str, token: str, latency: float, cache_hit: bool,
+               sample: Optional[GitHubResponseSample] = None) -> None:
+        """
+        Record a single call.
+
+        :param query: The name of the query or route
+        :param token: The fingerprint of the token used
+        :param latency: The time the call took in seconds
+        :param cache_hit: Whether the call was served without GitHub sending a body (coalesced, negatively cached, 304)
+        :param sample: What's known about the responses received while serving the call
+        """
+        self.get(query, token).record(latency, cache_hit, sample)
+
+    def clear(self) -> None:
+        self.queries.clear()
+
+    def render_openmetrics(self, prefix: str = 'gitbot_github_query') -> str:
+        """
+        Render the metrics in the OpenMetrics text exposition format.
+
+        :param prefix: The prefix of the metric family names
+        :return: The rendered metrics, terminated with # EOF
+        """
+        lines: list[str] = [f'# TYPE {prefix}_calls counter',
+                            f'# HELP {prefix}_calls Calls made through GitHubAPI.query.']
+        labeled: list[tuple[str, QueryMetrics]] = [
+            (f'query="{_escape_label(query)}",token="{_escape_label(token)}"', metrics)
+            for (query, token), metrics in sorted(self.queries.items())
+        ]
+        lines.extend(f'{prefix}_calls_total{{{labels}}} {m.calls}' for labels, m in labeled)
+        lines += [f'# TYPE {prefix}_cache counter',
+                  f'# HELP {prefix}_cache Calls served without (hit) and with (miss) a response body from GitHub.']
+        for labels, m in labeled:
+            lines += [f'{prefix}_cache_total{{{labels},result="hit"}} {m.cache_hits}',
+                      f'{prefix}_cache_total{{{labels},result="miss"}} {m.cache_misses}']
+        lines += [f'# TYPE {prefix}_errors counter', f'# HELP {prefix}_errors Failed calls by error class.']
+        lines.extend(f'{prefix}_errors_total{{{labels},error="{_escape_label(error)}"}} {count}'
+                     for labels, m in labeled for error, count in sorted(m.errors.items()))
+        lines += [f'# TYPE {prefix}_graphql_cost counter', f'# HELP {prefix}_graphql_cost GraphQL rate limit points spent.']
+        lines.extend(f'{prefix}_graphql_cost_total{{{labels}}} {m.graphql_cost}' for labels, m in labeled)
+        lines += [f'# TYPE {prefix}_response_bytes counter', f'# HELP {prefix}_response_bytes Response body bytes received.']
+        lines.extend(f'{prefix}_response_bytes_total{{{labels}}} {m.response_bytes}' for labels, m in labeled)
+        lines += [f'# TYPE {prefix}_latency_seconds histogram', f'# UNIT {prefix}_latency_seconds seconds',
+                  f'# HELP {prefix}_latency_seconds Call latency.']
+        for labels, m in labeled:
+            cumulative: int = 0
+            for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), m.latency_buckets):
+                cumulative += count
+                lines.append(f'{prefix}_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines += [f'{prefix}_latency_seconds_count{{{labels}}} {m.calls}',
+                      f'{prefix}_latency_seconds_sum{{{labels}}} {m.latency_sum:.6f}']
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> None:
+        """
+        Atomically write the metrics to a file in the OpenMetrics text format.
+
+        :param path: The path of the file
+        """
+        if directory := os.path.dirname(path):
+            os.makedirs(directory, exist_ok=True)
+        with open(tmp_path := f'{path}.tmp', 'w', encoding='utf-8') as fp:
+            fp.write(self.render_openmetrics())
+        os.replace(tmp_path, path)
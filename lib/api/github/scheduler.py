@@ -0,0 +1,135 @@
+# coding: utf-8
+
+"""
+Rate-limit-aware scheduling of GitHub API calls between the bot's tokens.
+~~~~~~~~~~~~~~~~~~~
+Keeps track of the remaining budget of every token in every rate limit pool and routes calls accordingly.
+:copyright: (c) 2020-present, statch
+:license: CC BY-NC-ND 4.0, see LICENSE for more details.
+"""
+
+import time
+import asyncio
+from typing import Literal, Mapping, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from lib.api.github.github import GitHubAPI
+
+__all__: tuple = ('RateLimitPool', 'RateLimitBudget', 'GitHubTokenScheduler')
+
+RateLimitPool = Literal['core', 'graphql']
+
+
+class RateLimitBudget:
+    """
+    The last known rate limit state of a single token in a single pool.
+
+    :param limit: The number of points/requests available per window
+    :param remaining: The number of points/requests left in the current window
+    :param reset: The UNIX timestamp at which the current window resets
+    """
+
+    __slots__: tuple = ('limit', 'remaining', 'reset', 'last_cost')
+
+    def __init__(self, limit: Optional[int] = None, remaining: Optional[int] = None, reset: float = 0.0):
+        self.limit: Optional[int] = limit
+        self.remaining: Optional[int] = remaining
+        self.reset: float = reset
+        self.last_cost: Optional[int] = None
+
+    @property
+    def headroom(self) -> float:
+        """
+        The fraction of the budget that's left, 1.0 if it's unknown or the window has already reset.
+        """
+        if self.limit is None or self.remaining is None or not self.limit or time.time() >= self.reset:
+            return 1.0
+        return max(self.remaining, 0) / self.limit
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> bool:
+        """
+        Update the budget using the X-RateLimit-* headers of a response.
+
+        :param headers: The response headers (lowercase keys)
+        :return: Whether the headers contained rate limit information
+        """
+        try:
+            self.limit = int(headers['x-ratelimit-limit'])
+            self.remaining = int(headers['x-ratelimit-remaining'])
+            self.reset = float(headers['x-ratelimit-reset'])
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def update_from_graphql(self, rate_limit: Mapping[str, int | str]) -> None:
+        """
+        Update the budget using the rateLimit object of a GraphQL response.
+
+        :param rate_limit: The rateLimit object ({cost, remaining, limit?, resetAt?})
+        """
+        self.last_cost = rate_limit.get('cost', self.last_cost)
+        self.remaining = rate_limit.get('remaining', self.remaining)
+        self.limit = rate_limit.get('limit', self.limit)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} remaining={self.remaining} limit={self.limit} reset={self.reset}>'
+
+
+class GitHubTokenScheduler:
+    """
+    Routes GitHub API calls to the token with the most budget left in the relevant pool.
+    The budgets themselves are kept on the :class:`GitHubAPI` instances and updated from every response.
+
+    :param instances: The GitHubAPI instances (one per token) to schedule between
+    :param reserve: The headroom fraction below which a token is considered nearly exhausted;
+                    low-priority calls are held back when every token is below it
+    :param max_hold: The max number of seconds to hold back a low-priority call for
+    """
+
+    def __init__(self, instances: tuple['GitHubAPI', ...], reserve: float = 0.1, max_hold: float = 15 * 60):
+        self.instances: tuple['GitHubAPI', ...] = instances
+        self.reserve: float = reserve
+        self.max_hold: float = max_hold
+        self._rotation: int = 0
+
+    def headroom(self, instance: 'GitHubAPI', pool: Optional[RateLimitPool] = None) -> float:
+        """
+        Get the headroom of an instance in a pool, or in its most depleted general-purpose pool if pool is None.
+
+        :param instance: The instance to get the headroom of
+        :param pool: The pool to check
+        :return: The headroom fraction
+        """
+        if pool is not None:
+            return instance.rate_limits[pool].headroom
+        return min(instance.rate_limits['core'].headroom, instance.rate_limits['graphql'].headroom)
+
+    def pick(self, pool: Optional[RateLimitPool] = None) -> 'GitHubAPI':
+        """
+        Pick the instance with the most headroom, rotating between instances that are tied.
+
+        :param pool: The pool the call will be charged to, None if unknown
+        :return: The chosen instance
+        """
+        self._rotation = (self._rotation + 1) % len(self.instances)
+        rotated: tuple['GitHubAPI', ...] = self.instances[self._rotation:] + self.instances[:self._rotation]
+        return max(rotated, key=lambda instance: self.headroom(instance, pool))
+
+    async def acquire(self, pool: RateLimitPool, low_priority: bool = False) -> 'GitHubAPI':
+        """
+        Pick an instance for a call, holding back low-priority calls until a window resets
+        if every token is nearly exhausted in the pool.
+
+        :param pool: The pool the call will be charged to
+        :param low_priority: Whether the call can wait in favour of interactive ones
+        :return: The chosen instance
+        """
+        instance: 'GitHubAPI' = self.pick(pool)
+        if low_priority and self.headroom(instance, pool) < self.reserve:
+            reset: float = min(i.rate_limits[pool].reset for i in self.instances)
+            if (delay := min(reset - time.time(), self.max_hold)) > 0:
+                instance.bot.logger.warning('All GitHub tokens are nearly exhausted in the "%s" pool, '
+                                            'holding back a low-priority call for %.0fs', pool, delay)
+                await asyncio.sleep(delay)
+            instance: 'GitHubAPI' = self.pick(pool)
+        return instance
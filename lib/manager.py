@@ -43,7 +43,7 @@ from lib.structs import (DirProxy, DictProxy,
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection  # noqa
 from typing import Optional, Callable, Any, Reversible, Iterable, Type, TYPE_CHECKING, Generator
 if TYPE_CHECKING:
-    from cogs.backend.workers.release_feed import ReleaseFeedWorker
+    from cogs.backend.workers.release_feed import ReleaseFeedWorker, PendingWrites
     from lib.structs.discord.context import GitBotContext
     from lib.api.github import GitHubAPI
     from lib.structs.discord.bot import GitBot
@@ -1056,8 +1056,15 @@ class Manager:
     async def handle_backlog_request(self, ctx: 'GitBotContext', rfi: 'ReleaseFeedItem', rfr: 'ReleaseFeedRepo', n: int) -> int:
         backlog = await self.bot.github.get_latest_n_releases_with_repo(rfr['name'], n)
         rf_worker: 'ReleaseFeedWorker' = self.bot.get_cog('ReleaseFeedWorker')  # noqa
+        # kept apart from the worker's, which belong to the cycle that may be running
+        pending: 'PendingWrites' = {}
+        deliveries: list[asyncio.Future] = []
         for release in reversed(backlog['releases']):
             # the release is weirdly wrapped for parity (laziness)
             backlog['release'] = release  # since we iterate sequentially, we can just overwrite the key each time
-            await rf_worker.handle_feed_repo({'_id': ctx.guild.id}, rfr, rfi, backlog, no_mention=True)
+            deliveries.append(rf_worker.handle_feed_repo({'_id': ctx.guild.id}, rfr, rfi, backlog,
+                                                         no_mention=True, pending=pending))
+        # the backlog goes out packed into as few messages as possible
+        await asyncio.gather(*deliveries, return_exceptions=True)
+        await rf_worker.flush_writes(pending)
         return len(backlog['releases'])
@@ -7,10 +7,13 @@ from .dicts.max_age_dict import MaxAgeDict
 from .caches.typedcache import *
 from .caches.self_hashing_cache import SelfHashingCache
 from .caches.base_cache import BaseCache
+from .caches.persistent_cache import PersistentCache
+from .caches.compact_id_map import CompactIDMap
 from .discord.embed import *
 from .discord.commands import *
 from .discord.bot import GitBot
 from .discord.context import GitBotContext
 from .discord.pages import *
+from .discord.webhook_queue import WebhookDeliveryQueue
 from .enums import CheckFailureCode, GitBotCommandState
 from .discord.components import *
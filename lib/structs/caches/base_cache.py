@@ -1,15 +1,22 @@
+from time import time
+from collections import OrderedDict
 from typing import Optional, Any
 from ..dicts.max_age_dict import CaseInsensitiveMaxAgeDict
 from ..dicts.fixed_size_ordered_dict import CaseInsensitiveFixedSizeOrderedDict
 
 __all__: tuple = ('BaseCache',)
 
+_MISSING: object = object()
+
 
 class BaseCache(CaseInsensitiveMaxAgeDict, CaseInsensitiveFixedSizeOrderedDict):
     """
     The base class that nearly all cache structures should inherit from.
     Operations on this special instance of :class:`dict` are case-insensitive.
 
+    Item operations are routed straight to :class:`OrderedDict`, since the cooperative super() chain of the
+    parent classes would otherwise end up in plain :class:`dict` and bypass both the ordering and the size limit.
+
     :param maxsize: The max number of keys to hold in the cache, delete the oldest one upon setting a new one if full
     :param max_age: The time to store cache keys for in seconds
     """
@@ -18,9 +25,55 @@ class BaseCache(CaseInsensitiveMaxAgeDict, CaseInsensitiveFixedSizeOrderedDict):
         CaseInsensitiveFixedSizeOrderedDict.__init__(self, maxsize=maxsize)
         CaseInsensitiveMaxAgeDict.__init__(self, max_age=max_age)
 
+    def age(self, key: Any, default: Any = None) -> Any:
+        if (ts := self._age_map.get(self._casefold(key))) is not None:
+            return int(time()) - ts
+        return default
+
+    def valid(self, key: Any, delete: bool = False) -> bool:
+        key: Any = self._casefold(key)
+        if self.max_age is not None and (age := self.age(key)) is not None and age >= self.max_age:
+            if delete:
+                BaseCache.__delitem__(self, key)
+            return False
+        return True
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            return BaseCache.__getitem__(self, key)
+        except KeyError:
+            return default
+
+    def pop(self, key: Any, default: Any = _MISSING) -> Any:
+        key: Any = self._casefold(key)
+        self._age_map.pop(key, None)
+        if default is _MISSING:
+            return OrderedDict.pop(self, key)
+        return OrderedDict.pop(self, key, default)
+
+    def _pop(self) -> Any:
+        if len(self) > self.maxsize:
+            evicted: tuple = self.popitem(last=False)
+            self._age_map.pop(evicted[0], None)
+            return evicted
+
+    def __contains__(self, key: Any) -> bool:
+        key: Any = self._casefold(key)
+        return OrderedDict.__contains__(self, key) and self.valid(key, delete=True)
+
     def __setitem__(self, key: Any, value: Any) -> Any:
-        CaseInsensitiveMaxAgeDict.__setitem__(self, key, value)
-        return CaseInsensitiveFixedSizeOrderedDict._pop(self)
+        key: Any = self._casefold(key)
+        self._age_map[key] = int(time())
+        OrderedDict.__setitem__(self, key, value)
+        return self._pop()
 
     def __getitem__(self, key: Any) -> Any:
-        return CaseInsensitiveMaxAgeDict.__getitem__(self, key)
+        key: Any = self._casefold(key)
+        if not self.valid(key, delete=True):
+            raise KeyError(key)
+        return OrderedDict.__getitem__(self, key)
+
+    def __delitem__(self, key: Any) -> None:
+        key: Any = self._casefold(key)
+        self._age_map.pop(key, None)
+        OrderedDict.__delitem__(self, key)
@@ -0,0 +1,133 @@
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Optional
+
+__all__: tuple = ('CompactIDMap',)
+
+_DELETED: object = object()
+
+
+class CompactIDMap:
+    """
+    A memory-compact map of Discord IDs to small values that can be encoded as unsigned ints,
+    meant to hold a value for every user or guild at once instead of caching the most recent ones.
+
+    Loaded entries live in two parallel sorted arrays - 8 bytes per ID plus the size of the value's typecode -
+    and are looked up by bisection. Entries set or deleted after the load go to a delta dict,
+    which is merged into the arrays once it grows past a fraction of their size.
+
+    Until :meth:`load` is called, a missing ID means the value isn't known yet.
+    After that, the map is :attr:`complete` - a missing ID means there is no value.
+    Since only the writes made by this process reach the delta, the map is meant to be reloaded periodically
+    (:meth:`begin_load` before fetching the items, :meth:`load` once they're fetched) to pick up everyone else's.
+
+    :param encode: The function turning a value into an unsigned int that fits the typecode
+    :param decode: The function turning an unsigned int back into a value
+    :param typecode: The :mod:`array` typecode to store the encoded values with
+    :param merge_threshold: The min number of delta entries to merge into the arrays
+    """
+
+    __slots__: tuple = ('encode', 'decode', 'typecode', 'merge_threshold', 'complete', '_ids', '_values', '_delta',
+                        '_stale_delta', '_loading')
+
+    def __init__(self,
+                 encode: Callable[[Any], int],
+                 decode: Callable[[int], Any],
+                 typecode: str = 'B',
+                 merge_threshold: int = 4096):
+        self.encode: Callable[[Any], int] = encode
+        self.decode: Callable[[int], Any] = decode
+        self.typecode: str = typecode
+        self.merge_threshold: int = merge_threshold
+        self.complete: bool = False
+        self._ids: array = array('Q')
+        self._values: array = array(typecode)
+        self._delta: dict[int, int | object] = {}
+        # the delta from before the ongoing load began, superseded by the loaded items once they're in
+        self._stale_delta: dict[int, int | object] = {}
+        self._loading: bool = False
+
+    def begin_load(self) -> None:
+        """
+        Mark the point in time the items passed to the next :meth:`load` are fetched from.
+        Entries set or deleted before it are dropped by the load, the ones set or deleted after it are kept.
+        """
+        self._stale_delta.update(self._delta)
+        self._delta = {}
+        self._loading = True  # merging now would fold the entries set since into the arrays the load replaces
+
+    def load(self, items: Iterable[tuple[int, Any]]) -> None:
+        """
+        Replace the loaded entries, marking the map as complete.
+        Entries set or deleted since :meth:`begin_load` (while the items were being fetched) are kept on top of them.
+
+        :param items: (ID, value) pairs
+        """
+        encoded: dict[int, int] = {_id: self.encode(value) for _id, value in items}
+        self._ids = array('Q', sorted(encoded))
+        self._values = array(self.typecode, map(encoded.__getitem__, self._ids))
+        self._stale_delta = {}
+        self._loading = False
+        self.complete = True
+        self._merge_if_needed()
+
+    def _find(self, _id: int) -> Optional[int]:
+        if (i := bisect_left(self._ids, _id)) < len(self._ids) and self._ids[i] == _id:
+            return i
+        return None
+
+    def _merge_if_needed(self) -> None:
+        if self._loading or len(self._delta) + len(self._stale_delta) < max(self.merge_threshold, len(self._ids) // 4):
+            return
+        merged: dict[int, int | object] = dict(zip(self._ids, self._values))
+        merged.update(self._stale_delta)
+        merged.update(self._delta)
+        ids: list[int] = sorted(_id for _id, value in merged.items() if value is not _DELETED)
+        self._ids = array('Q', ids)
+        self._values = array(self.typecode, map(merged.__getitem__, ids))
+        self._delta.clear()
+        self._stale_delta.clear()
+
+    def get(self, _id: int, default: Any = None) -> Any:
+        if (value := self._delta.get(_id)) is None and (value := self._stale_delta.get(_id)) is None:
+            if (i := self._find(_id)) is None:
+                return default
+            value: int = self._values[i]
+        return default if value is _DELETED else self.decode(value)
+
+    def pop(self, _id: int, default: Any = None) -> Any:
+        value: Any = self.get(_id, default)
+        self._delta[_id] = _DELETED
+        self._merge_if_needed()
+        return value
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate memory used by the arrays (not counting the delta dict).
+        """
+        return self._ids.itemsize * len(self._ids) + self._values.itemsize * len(self._values)
+
+    def __setitem__(self, _id: int, value: Any) -> None:
+        self._delta[_id] = self.encode(value)
+        self._merge_if_needed()
+
+    def __getitem__(self, _id: int) -> Any:
+        if (value := self.get(_id, _DELETED)) is _DELETED:
+            raise KeyError(_id)
+        return value
+
+    def __delitem__(self, _id: int) -> None:
+        self.pop(_id)
+
+    def __contains__(self, _id: int) -> bool:
+        return self.get(_id, _DELETED) is not _DELETED
+
+    def __len__(self) -> int:
+        length: int = len(self._ids)
+        for _id, value in {**self._stale_delta, **self._delta}.items():
+            length += (value is not _DELETED) - (self._find(_id) is not None)
+        return length
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} entries={len(self)} delta={len(self._delta)} complete={self.complete}>'
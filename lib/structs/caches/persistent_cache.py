@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Optional
+
+__all__: tuple = ('PersistentCache',)
+
+_logger: logging.Logger = logging.getLogger('bot')
+
+
+class PersistentCache:
+    """
+    An on-disk second cache tier backed by SQLite, meant to sit behind the in-memory caches so that they survive restarts.
+    Values are stored as JSON with an expiry timestamp and an optional ETag, split into namespaces.
+
+    Reads go straight to the database (in a worker thread), writes are buffered and flushed in the background.
+    When the number of entries exceeds max_entries, expired entries and then the least recently accessed ones are removed.
+
+    :param path: The path of the database file
+    :param max_entries: The max number of entries to keep across all namespaces
+    :param flush_delay: The number of seconds to buffer writes for before flushing them
+    """
+
+    def __init__(self, path: str, max_entries: int = 20_000, flush_delay: float = 2.0):
+        if directory := os.path.dirname(path):
+            os.makedirs(directory, exist_ok=True)
+        self.path: str = path
+        self.max_entries: int = max_entries
+        self.flush_delay: float = flush_delay
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                etag TEXT,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access);
+        ''')
+        # (namespace, key) -> (value, etag, expires_at); later writes to the same key replace the pending ones
+        self._pending_writes: dict[tuple[str, str], tuple[str, Optional[str], float]] = {}
+        self._pending_touches: dict[tuple[str, str], float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _get_sync(self, namespace: str, key: str) -> Optional[tuple[str, Optional[str]]]:
+        with self._lock:
+            row: Optional[tuple[str, Optional[str]]] = self._connection.execute(
+                'SELECT value, etag FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (namespace, key, time.time())).fetchone()
+        return row
+
+    def _flush_sync(self, writes: dict[tuple[str, str], tuple[str, Optional[str], float]],
+                    touches: dict[tuple[str, str], float]) -> int:
+        now: float = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)',
+                                         [(ns, key, value, etag, expires_at, now)
+                                          for (ns, key), (value, etag, expires_at) in writes.items()])
+            self._connection.executemany('UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?',
+                                         [(ts, ns, key) for (ns, key), ts in touches.items()])
+            count: int = self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            removed: int = self._connection.execute('DELETE FROM cache WHERE expires_at <= ?', (now,)).rowcount
+            if (overflow := count - removed - self.max_entries) > 0:
+                # compact down to 90% of the cap, so that a full cache doesn't compact on every single flush
+                overflow += self.max_entries // 10
+                removed += self._connection.execute('DELETE FROM cache WHERE rowid IN '
+                                                    '(SELECT rowid FROM cache ORDER BY last_access LIMIT ?)',
+                                                    (overflow,)).rowcount
+            return removed
+
+    async def get(self, namespace: str, key: str) -> Any:
+        """
+        Get a value that hasn't expired yet.
+
+        :param namespace: The namespace of the value
+        :param key: The key of the value
+        :return: The deserialized value or None if it's missing or expired
+        """
+        return (await self.get_with_etag(namespace, key))[0]
+
+    async def get_with_etag(self, namespace: str, key: str) -> tuple[Any, Optional[str]]:
+        """
+        Get a value that hasn't expired yet along with its ETag.
+
+        :param namespace: The namespace of the value
+        :param key: The key of the value
+        :return: A (value, etag) tuple, (None, None) if the value is missing or expired
+        """
+        if (pending := self._pending_writes.get((namespace, key))) and pending[2] > time.time():
+            self.hits += 1
+            return json.loads(pending[0]), pending[1]
+        row: Optional[tuple[str, Optional[str]]] = await asyncio.to_thread(self._get_sync, namespace, key)
+        if row is None:
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        self._pending_touches[(namespace, key)] = time.time()
+        self._schedule_flush()
+        return json.loads(row[0]), row[1]
+
+    async def recent(self, namespace: str, limit: int) -> list[tuple[str, Any]]:
+        """
+        Get the most recently accessed values of a namespace that haven't expired yet, useful for warming up caches.
+
+        :param namespace: The namespace to get the values from
+        :param limit: The max number of values to get
+        :return: A list of (key, value) tuples, the least recently accessed first
+        """
+        rows: list[tuple] = await asyncio.to_thread(self._execute,
+                                                    'SELECT key, value FROM cache WHERE namespace = ? AND expires_at > ? '
+                                                    'ORDER BY last_access DESC LIMIT ?',
+                                                    (namespace, time.time(), limit))
+        return [(key, json.loads(value)) for key, value in reversed(rows)]
+
+    def put(self, namespace: str, key: str, value: Any, max_age: float, etag: Optional[str] = None) -> bool:
+        """
+        Queue a value to be written to the database in the background.
+
+        :param namespace: The namespace of the value
+        :param key: The key of the value
+        :param value: The value, must be JSON-serializable
+        :param max_age: The time to store the value for in seconds
+        :param etag: The ETag of the response the value came from
+        :return: Whether the value was queued (False if it couldn't be serialized)
+        """
+        try:
+            serialized: str = json.dumps(value, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return False
+        self._pending_writes[(namespace, key)] = (serialized, etag, time.time() + max_age)
+        self._schedule_flush()
+        return True
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write the buffered values and access times to the database, compacting it if it's over the size cap.
+        """
+        if not self._pending_writes and not self._pending_touches:
+            return
+        writes, self._pending_writes = self._pending_writes, {}
+        touches, self._pending_touches = self._pending_touches, {}
+        try:
+            if removed := await asyncio.to_thread(self._flush_sync, writes, touches):
+                _logger.debug('Compacted the persistent cache, removed %d entries', removed)
+        except sqlite3.Error as e:
+            _logger.error('Failed to flush %d entries to the persistent cache: %s', len(writes), e)
+
+    async def close(self) -> None:
+        """
+        Flush the buffered values and close the database connection.
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        return self._execute('SELECT COUNT(*) FROM cache')[0][0]
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} path={self.path!r} max_entries={self.max_entries}>'
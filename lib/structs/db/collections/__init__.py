@@ -1,3 +1,4 @@
 from .users import UsersCollection
 from .guilds import GuildsCollection
 from .collection_wrapper import CollectionWrapper
+from .release_feed import ReleaseFeedCollection
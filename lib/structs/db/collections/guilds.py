@@ -1,9 +1,10 @@
 # coding: utf-8
 
-from typing import Optional, Type
+from typing import Optional, Type, Iterable, Any
 from lib.utils.decorators import normalize_identity
 from typing import TYPE_CHECKING
 from lib.structs.db.collections.collection_wrapper import CollectionWrapper
+from lib.structs import TypedCache, CacheSchema
 from lib.typehints import Identity, GitBotGuild, AutomaticConversionSettings
 
 if TYPE_CHECKING:
@@ -11,6 +12,8 @@ if TYPE_CHECKING:
 
 __all__: tuple = ('GuildsCollection',)
 
+_MISSING: object = object()
+
 
 class GuildsCollection(CollectionWrapper):
     __wrapped_collection_name__: str = 'guilds'
@@ -18,6 +21,11 @@ class GuildsCollection(CollectionWrapper):
     """
     A wrapper around :class:`AsyncIOMotorCollection` adding methods to the guilds collection.
 
+    Whole guild documents are cached by ID (including the absence of one). Every write made through this wrapper
+    drops the cached copies of the guilds it targets (all of them if that can't be told from the filter),
+    and bumps :attr:`writes`, which lets copies of documents held elsewhere (see :meth:`GitBotContext.get_guild_document`)
+    tell whether they're still current.
+
     Parameters
     ----------
     collection: :class:`AsyncIOMotorCollection`
@@ -26,6 +34,122 @@ class GuildsCollection(CollectionWrapper):
 
     def __init__(self, db: 'DatabaseProxy'):
         super().__init__(db, self.__wrapped_collection_name__)
+        self.document_cache: TypedCache = TypedCache(CacheSchema(key=int, value=(dict, type(None))),
+                                                     maxsize=self.bot.mgr.env.guild_document_cache_size,
+                                                     max_age=self.bot.mgr.env.guild_document_cache_max_age)
+        self.hits: int = 0
+        self.misses: int = 0
+        self.writes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / total if (total := self.hits + self.misses) else 0.0
+
+    @normalize_identity(context_resource='guild')
+    async def get_document(self, _id: Identity) -> Optional[GitBotGuild]:
+        """
+        Get a guild's document, from the cache if possible.
+        The returned document is the cached copy - it shouldn't be modified.
+
+        :param _id: The guild object/ID to get the document of
+        :return: The document, None if the guild doesn't have one
+        """
+        if (cached := self.document_cache.get(_id, _MISSING)) is not _MISSING:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        writes: int = self.writes
+        document: Optional[GitBotGuild] = await self.find_one({'_id': _id})
+        if writes == self.writes:  # a write made while the document was being fetched might not be reflected in it
+            self.document_cache[_id] = document
+        return document
+
+    def invalidate(self, filters: Iterable[Optional[dict]]) -> None:
+        """
+        Drop the cached documents of the guilds targeted by writes.
+
+        :param filters: The filters of the writes, None if a write's target is unknown
+        """
+        self.writes += 1
+        for filter_ in filters:
+            if filter_ is None or not isinstance(_id := filter_.get('_id'), int):
+                self.document_cache.clear()
+                return
+            self.document_cache.pop(_id, None)
+
+    async def _write(self, method: str, filter_: Optional[dict], *args, **kwargs) -> Any:
+        self.invalidate((filter_,))
+        try:
+            return await getattr(super(), method)(*args, **kwargs)
+        finally:
+            self.invalidate((filter_,))  # in case it was fetched again before the write went through
+
+    async def insert_one(self, document: dict, *args, **kwargs) -> Any:
+        return await self._write('insert_one', document, document, *args, **kwargs)
+
+    async def update_one(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('update_one', filter_, filter_, *args, **kwargs)
+
+    async def update_many(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('update_many', None, filter_, *args, **kwargs)
+
+    async def replace_one(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('replace_one', filter_, filter_, *args, **kwargs)
+
+    async def delete_one(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('delete_one', filter_, filter_, *args, **kwargs)
+
+    async def delete_many(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('delete_many', None, filter_, *args, **kwargs)
+
+    async def find_one_and_update(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('find_one_and_update', filter_, filter_, *args, **kwargs)
+
+    async def find_one_and_replace(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('find_one_and_replace', filter_, filter_, *args, **kwargs)
+
+    async def find_one_and_delete(self, filter_: dict, *args, **kwargs) -> Any:
+        return await self._write('find_one_and_delete', filter_, filter_, *args, **kwargs)
+
+    async def bulk_write(self, requests: list, *args, guild_ids: Optional[Iterable[int]] = None, **kwargs) -> Any:
+        """
+        :param guild_ids: The IDs of the guilds targeted by the requests - every cached document is dropped if not given
+        """
+        filters: list[Optional[dict]] = [{'_id': _id} for _id in guild_ids] if guild_ids is not None else [None]
+        self.invalidate(filters)
+        try:
+            return await super().bulk_write(requests, *args, **kwargs)
+        finally:
+            self.invalidate(filters)
+
+    def encode_autoconv_config(self, config: AutomaticConversionSettings) -> int:
+        """
+        Pack automatic conversion settings into an int for the autoconv :class:`CompactIDMap` -
+        bit 0 is codeblock, bit 1 is gh_url and the rest is gh_lines. Missing settings are filled in with the defaults.
+        """
+        default: AutomaticConversionSettings = self.bot.mgr.env.autoconv_default
+        return (bool(config.get('codeblock', default['codeblock']))
+                | bool(config.get('gh_url', default['gh_url'])) << 1
+                | int(config.get('gh_lines', default['gh_lines'])) << 2)
+
+    @staticmethod
+    def decode_autoconv_config(packed: int) -> AutomaticConversionSettings:
+        return AutomaticConversionSettings(codeblock=bool(packed & 1), gh_url=bool(packed & 2), gh_lines=packed >> 2)
+
+    async def load_autoconv_configs(self) -> int:
+        """
+        (Re)load the automatic conversion settings of every guild that has them into the autoconv :class:`CompactIDMap`,
+        with a single cursor.
+
+        :return: The number of settings loaded
+        """
+        self.bot.get_cache('autoconv').begin_load()
+        configs: list[tuple[int, AutomaticConversionSettings]] = [
+            (document['_id'], document['autoconv'])
+            async for document in self.find({'autoconv': {'$exists': True}}, {'autoconv': 1})
+        ]
+        self.bot.get_cache('autoconv').load(configs)
+        return len(configs)
 
     @normalize_identity(context_resource='guild')
     async def get_autoconv_config(self,
@@ -45,9 +169,10 @@ class GuildsCollection(CollectionWrapper):
         if cached := self.bot.get_cache_value('autoconv', _id):
             _did_exist: bool = True
             permission: AutomaticConversionSettings = cached
-            self.bot.logger.debug('Returning cached auto values for identity "%d"', _id)
+        elif self.bot.get_cache('autoconv').complete:  # guilds missing from it have the default settings
+            permission: AutomaticConversionSettings = self.bot.mgr.env.autoconv_default
         else:
-            stored: Optional[GitBotGuild] = await self.find_one({'_id': _id})
+            stored: Optional[GitBotGuild] = await self.get_document(_id)
             if stored:
                 permission: AutomaticConversionSettings = stored.get('autoconv', self.bot.mgr.env.autoconv_default)
                 _did_exist: bool = True
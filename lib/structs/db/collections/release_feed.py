@@ -0,0 +1,203 @@
+# coding: utf-8
+
+from typing import Optional, Iterable, TYPE_CHECKING
+from pymongo import ASCENDING, UpdateOne, DeleteOne, DeleteMany
+from lib.structs.db.collections.collection_wrapper import CollectionWrapper
+from lib.typehints import (GitBotGuild, ReleaseFeed, ReleaseFeedItem, ReleaseFeedRepo, ReleaseFeedItemMention,
+                           ReleaseFeedDocument, TagName)
+
+if TYPE_CHECKING:
+    from lib.structs.db.database_proxy import DatabaseProxy
+
+__all__: tuple = ('ReleaseFeedCollection',)
+
+_MISSING: object = object()
+
+
+class ReleaseFeedCollection(CollectionWrapper):
+    __wrapped_collection_name__: str = 'release_feed'
+
+    """
+    A wrapper around :class:`AsyncIOMotorCollection` holding the release feeds in normalized form -
+    one document per (guild, channel, repo) subscription, plus one per channel with repo set to None.
+
+    While guilds are being migrated off the feed arrays embedded in their documents (see migrations/),
+    reads prefer the embedded feed if the guild still has one, and writes go to wherever the guild's feed lives.
+
+    Parameters
+    ----------
+    collection: :class:`AsyncIOMotorCollection`
+        The collection to add methods to.
+    """
+
+    def __init__(self, db: 'DatabaseProxy'):
+        super().__init__(db, self.__wrapped_collection_name__)
+
+    async def ensure_indexes(self) -> None:
+        await self.create_index([('repo', ASCENDING)])
+        await self.create_index([('guild_id', ASCENDING), ('cid', ASCENDING), ('repo', ASCENDING)], unique=True)
+        await self.create_index([('guild_id', ASCENDING), ('hook', ASCENDING)])
+
+    @staticmethod
+    def is_embedded(guild: Optional[GitBotGuild]) -> bool:
+        """
+        Check if the guild's feed still lives in the guild document.
+
+        :param guild: The guild document, None if there is none
+        :return: Whether the feed is embedded in the guild document
+        """
+        return guild is not None and 'feed' in guild
+
+    @staticmethod
+    def to_documents(guild_id: int, feed: ReleaseFeed) -> list[ReleaseFeedDocument]:
+        """
+        Convert an embedded feed into normalized documents, in feed order.
+
+        :param guild_id: The ID of the guild the feed belongs to
+        :param feed: The embedded feed
+        :return: The documents
+        """
+        documents: list[ReleaseFeedDocument] = []
+        for rfi in feed:
+            base: dict = {'guild_id': guild_id, 'cid': rfi['cid'], 'hook': rfi['hook'], 'mention': rfi.get('mention')}
+            documents.append(ReleaseFeedDocument(**base, repo=None, name=None, tag=None))
+            documents.extend(ReleaseFeedDocument(**base, repo=rfr['name'].lower(), name=rfr['name'], tag=rfr['tag'])
+                             for rfr in rfi['repos'])
+        return documents
+
+    @staticmethod
+    def to_feed(documents: Iterable[ReleaseFeedDocument]) -> ReleaseFeed:
+        """
+        Assemble normalized documents (in insertion order) back into the embedded feed shape.
+
+        :param documents: The documents of a single guild
+        :return: The feed
+        """
+        feed: dict[int, ReleaseFeedItem] = {}
+        for document in documents:
+            if (rfi := feed.get(document['cid'])) is None:
+                rfi = feed[document['cid']] = ReleaseFeedItem(cid=document['cid'], hook=document['hook'],
+                                                              mention=document.get('mention'), repos=[])
+            if document['repo'] is not None:
+                rfi['repos'].append(ReleaseFeedRepo(name=document['name'], tag=document['tag']))
+        return list(feed.values())
+
+    async def get_feed(self, guild_id: int, guild: Optional[GitBotGuild] | object = _MISSING) -> ReleaseFeed:
+        """
+        Get a guild's feed from wherever it lives.
+
+        :param guild_id: The ID of the guild
+        :param guild: The guild document if it was already fetched, None if there is none
+        :return: The feed, empty if the guild has none
+        """
+        if guild is _MISSING:
+            guild: Optional[GitBotGuild] = await self.db.guilds.get_document(guild_id)
+        if self.is_embedded(guild):
+            return guild['feed']
+        return self.to_feed([document async for document in self.find({'guild_id': guild_id}).sort('_id')])
+
+    @staticmethod
+    def _partition_filter(field: str, partitions: int, owned: Optional[Iterable[int]]) -> dict:
+        if owned is None:
+            return {}
+        if not owned:
+            return {'_id': {'$in': []}}
+        return {'$or': [{field: {'$mod': [partitions, partition]}} for partition in sorted(owned)]}
+
+    async def get_all_feeds(self, partitions: int = 1, owned: Optional[Iterable[int]] = None) -> dict[int, ReleaseFeed]:
+        """
+        Get the feeds of every guild that has one, from wherever they live.
+
+        :param partitions: The number of partitions the guilds are split into (by guild ID % partitions)
+        :param owned: The partitions to get the feeds of, None for all of them
+        :return: Guild ID -> feed
+        """
+        owned: Optional[list[int]] = list(owned) if owned is not None else None
+        feeds: dict[int, ReleaseFeed] = {guild['_id']: guild['feed']
+                                         async for guild in self.db.guilds.find(
+                                             {'feed': {'$exists': True}, **self._partition_filter('_id', partitions, owned)},
+                                             {'feed': 1})}
+        documents: dict[int, list[ReleaseFeedDocument]] = {}
+        async for document in self.find(self._partition_filter('guild_id', partitions, owned)).sort('_id'):
+            if document['guild_id'] not in feeds:  # the embedded feed takes precedence until the guild is migrated
+                documents.setdefault(document['guild_id'], []).append(document)
+        feeds.update({guild_id: self.to_feed(guild_documents) for guild_id, guild_documents in documents.items()})
+        return feeds
+
+    async def add_channel(self, guild_id: int, guild: Optional[GitBotGuild], rfi: ReleaseFeedItem) -> None:
+        if self.is_embedded(guild):
+            await self.db.guilds.update_one({'_id': guild_id}, {'$push': {'feed': rfi}})
+        else:
+            await self.insert_many(self.to_documents(guild_id, [rfi]))
+
+    async def add_repo(self, guild_id: int, guild: Optional[GitBotGuild], rfi: ReleaseFeedItem,
+                       rfr: ReleaseFeedRepo) -> None:
+        if self.is_embedded(guild):
+            await self.db.guilds.update_one({'_id': guild_id}, {'$push': {'feed.$[f].repos': rfr}},
+                                            array_filters=[{'f.cid': rfi['cid']}])
+        else:
+            await self.insert_one(self.to_documents(guild_id, [ReleaseFeedItem({**rfi, 'repos': [rfr]})])[1])
+
+    async def remove_repo(self, guild_id: int, guild: Optional[GitBotGuild], cids: Iterable[int], repo: str) -> None:
+        """
+        Remove a repo from one or more of a guild's channels.
+
+        :param guild_id: The ID of the guild
+        :param guild: The guild document, None if there is none
+        :param cids: The IDs of the channels to remove the repo from
+        :param repo: The name of the repo (case-insensitive)
+        """
+        cids: list[int] = list(cids)
+        if self.is_embedded(guild):
+            await self.db.guilds.update_one({'_id': guild_id},
+                                            {'$pull': {'feed.$[f].repos': {'name': repo.lower()}}},
+                                            array_filters=[{'f.cid': {'$in': cids}}])
+        else:
+            await self.delete_many({'guild_id': guild_id, 'cid': {'$in': cids}, 'repo': repo.lower()})
+
+    async def remove_channel(self, guild_id: int, guild: Optional[GitBotGuild], cid: int) -> None:
+        if self.is_embedded(guild):
+            await self.db.guilds.update_one({'_id': guild_id}, {'$pull': {'feed': {'cid': cid}}})
+        else:
+            await self.delete_many({'guild_id': guild_id, 'cid': cid})
+
+    async def set_mention(self, guild_id: int, guild: Optional[GitBotGuild], cid: int,
+                          mention: Optional[ReleaseFeedItemMention]) -> None:
+        if self.is_embedded(guild):
+            await self.db.guilds.update_one({'_id': guild_id}, {'$set': {'feed.$[f].mention': mention}},
+                                            array_filters=[{'f.cid': cid}])
+        else:
+            await self.update_many({'guild_id': guild_id, 'cid': cid}, {'$set': {'mention': mention}})
+
+    # The following build write ops for the release feed worker to batch. Since the worker doesn't know where
+    # a guild's feed lives, they target both - the op aimed at the other storage simply matches nothing.
+    # The ones aimed at the guilds collection can be dropped once every guild has been migrated.
+
+    @staticmethod
+    def tag_update_ops(guild_id: int, hook: str, repo: str, tag: TagName) -> dict[str, UpdateOne]:
+        """
+        :return: Collection name -> the op updating the recorded tag name of a repo in a channel
+        """
+        return {'guilds': UpdateOne({'_id': guild_id, 'feed.hook': hook},
+                                    {'$set': {'feed.$[f].repos.$[r].tag': tag}},
+                                    array_filters=[{'f.hook': hook}, {'r.name': repo}]),
+                'release_feed': UpdateOne({'guild_id': guild_id, 'hook': hook, 'repo': repo.lower()},
+                                          {'$set': {'tag': tag}})}
+
+    @staticmethod
+    def repo_removal_ops(guild_id: int, hook: str, repo: str) -> dict[str, UpdateOne | DeleteOne]:
+        """
+        :return: Collection name -> the op removing a repo from a channel
+        """
+        return {'guilds': UpdateOne({'_id': guild_id, 'feed.hook': hook},
+                                    {'$pull': {'feed.$[f].repos': {'name': repo}}},
+                                    array_filters=[{'f.hook': hook}]),
+                'release_feed': DeleteOne({'guild_id': guild_id, 'hook': hook, 'repo': repo.lower()})}
+
+    @staticmethod
+    def hook_removal_ops(guild_id: int, hook: str) -> dict[str, UpdateOne | DeleteMany]:
+        """
+        :return: Collection name -> the op removing a channel (by its webhook) with all of its repos
+        """
+        return {'guilds': UpdateOne({'_id': guild_id, 'feed.hook': hook}, {'$pull': {'feed': {'hook': hook}}}),
+                'release_feed': DeleteMany({'guild_id': guild_id, 'hook': hook})}
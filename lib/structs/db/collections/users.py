@@ -5,8 +5,8 @@ from lib.utils.decorators import normalize_identity
 from typing import TYPE_CHECKING, Iterable
 from lib.structs.db.collections.collection_wrapper import CollectionWrapper
 from lib.utils.dict_utils import get_nested_key
-from lib.typehints import Identity, LocaleName
-from lib.structs import DictProxy
+from lib.typehints import Identity, LocaleName, GitBotUser
+from lib.structs import DictProxy, TypedCache, CacheSchema
 
 if TYPE_CHECKING:
     from lib.structs.db.database_proxy import DatabaseProxy
@@ -14,6 +14,8 @@ if TYPE_CHECKING:
 
 __all__: tuple = ('UsersCollection',)
 
+_MISSING: object = object()
+
 
 class UsersCollection(CollectionWrapper):
     __wrapped_collection_name__: str = 'users'
@@ -21,6 +23,10 @@ class UsersCollection(CollectionWrapper):
     """
     A wrapper around :class:`AsyncIOMotorCollection` adding methods to the users collection.
 
+    Whole user documents are cached by ID (including the absence of one), and the writes made through this wrapper
+    are applied to the cached copies as well, so that a command only reads the user's document once.
+    Writes made elsewhere (e.g. by the OAuth backend) show up once the cached copy expires.
+
     Parameters
     ----------
     collection: :class:`AsyncIOMotorCollection`
@@ -29,20 +35,94 @@ class UsersCollection(CollectionWrapper):
 
     def __init__(self, db: 'DatabaseProxy'):
         super().__init__(db, self.__wrapped_collection_name__)
+        self.document_cache: TypedCache = TypedCache(CacheSchema(key=int, value=(dict, type(None))),
+                                                     maxsize=self.bot.mgr.env.user_document_cache_size,
+                                                     max_age=self.bot.mgr.env.user_document_cache_max_age)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._writes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / total if (total := self.hits + self.misses) else 0.0
+
+    def encode_locale(self, locale: LocaleName) -> int:
+        """
+        Encode a locale name as its index in the list of languages, for the locale :class:`CompactIDMap`.
+        Unknown names are encoded as the master locale, which is what they resolve to anyway.
+        """
+        for i, l_ in enumerate(self.bot.mgr.locale.languages):
+            if l_['name'] == locale:
+                return i
+        return self.encode_locale(self.bot.mgr.locale.master.meta.name)
+
+    def decode_locale(self, index: int) -> LocaleName:
+        return self.bot.mgr.locale.languages[index]['name']
+
+    async def load_locales(self) -> int:
+        """
+        (Re)load the locale of every user that has one set into the locale :class:`CompactIDMap`, with a single cursor.
+
+        :return: The number of locales loaded
+        """
+        self.bot.get_cache('locale').begin_load()
+        locales: list[tuple[int, LocaleName]] = [(document['_id'], document['locale']) async for document in
+                                                 self.find({'locale': {'$exists': True}}, {'locale': 1})]
+        self.bot.get_cache('locale').load(locales)
+        return len(locales)
+
+    @normalize_identity()
+    async def get_document(self, _id: int) -> Optional[GitBotUser]:
+        """
+        Get a user's document, from the cache if possible.
+        The returned document is the cached copy - it shouldn't be modified.
+
+        :param _id: The user object/ID to get the document of
+        :return: The document, None if the user doesn't have one
+        """
+        if (cached := self.document_cache.get(_id, _MISSING)) is not _MISSING:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        writes: int = self._writes
+        document: Optional[GitBotUser] = await self.find_one({'_id': _id})
+        if writes == self._writes:  # a write made while the document was being fetched might not be reflected in it
+            self.document_cache[_id] = document
+        return document
+
+    def _patch_cached(self, _id: int, field: str, value: object = _MISSING) -> None:
+        self._writes += 1
+        if (cached := self.document_cache.get(_id, _MISSING)) is _MISSING:
+            return
+        if '.' in field or (cached is None and value is _MISSING):  # nested paths aren't worth replicating
+            self.document_cache.pop(_id, None)
+        elif cached is None:
+            self.document_cache[_id] = {'_id': _id, field: value}
+        elif value is _MISSING:
+            cached.pop(field, None)
+        else:
+            cached[field] = value
 
     @normalize_identity()
     async def delitem(self, _id: Identity, field: str | Iterable[str]) -> bool:
-        query: Optional[dict] = await self.find_one({'_id': _id})
-        if query is not None and get_nested_key(query, field) is not None:
-            await self.update_one(query, {'$unset': {field: ''}})
+        document: Optional[GitBotUser] = await self.get_document(_id)
+        if document is not None and get_nested_key(document, field) is not None:
+            field: str = field if isinstance(field, str) else '.'.join(field)
+            await self.update_one({'_id': _id}, {'$unset': {field: ''}})
+            self._patch_cached(_id, field)
+            if field == 'locale':
+                self.bot.get_cache('locale').pop(_id)
             return True
         return False
 
     @normalize_identity()
     async def getitem(self, _id: Identity, item: str | Iterable[str], query_additional_kwargs: Optional[dict] = None) -> Optional[
         str | dict | list | bool | int | float]:
-        query: Optional[dict] = await self.find_one({'_id': _id, **(query_additional_kwargs or {})})
-        if query and (ret := get_nested_key(query, item)) is not None:
+        if query_additional_kwargs:
+            document: Optional[GitBotUser] = await self.find_one({'_id': _id, **query_additional_kwargs})
+        else:
+            document: Optional[GitBotUser] = await self.get_document(_id)
+        if document and (ret := get_nested_key(document, item)) is not None:
             return ret
         return None
 
@@ -58,14 +138,27 @@ class UsersCollection(CollectionWrapper):
         else:
             valid: bool = True
         if valid:
-            query: Optional[dict] = await self.find_one({'_id': _id})
-            if query is not None:
-                await self.update_one(query, {'$set': {item: value}})
-            else:
-                await self.insert_one({'_id': _id, item: value})
+            await self.update_one({'_id': _id}, {'$set': {item: value}}, upsert=True)
+            self._patch_cached(_id, item, value)
+            if item == 'locale':
+                self.bot.set_cache_value('locale', _id, value)
             return True
         return False
 
+    @normalize_identity()
+    async def delete_document(self, _id: Identity) -> bool:
+        """
+        Delete a user's document.
+
+        :param _id: The user object/ID to delete the document of
+        :return: Whether the user had a document
+        """
+        self._writes += 1
+        deleted: Optional[GitBotUser] = await self.find_one_and_delete({'_id': _id})
+        self.document_cache[_id] = None
+        self.bot.get_cache('locale').pop(_id)
+        return deleted is not None
+
     @normalize_identity()
     async def get_locale(self, _id: Identity) -> DictProxy:
         """
@@ -77,12 +170,11 @@ class UsersCollection(CollectionWrapper):
         locale: LocaleName = self.bot.mgr.locale.master.meta.name
         if cached := self.bot.get_cache_value('locale', _id):
             locale: LocaleName = cached
-            self.bot.logger.debug('Returning cached locale for identity "%d"', _id)
-        else:
+        elif not self.bot.get_cache('locale').complete:  # once it is, users missing from it don't have a locale set
             if stored := await self.getitem(_id, 'locale'):
                 locale: str = stored
-        try:
             self.bot.set_cache_value('locale', _id, locale)
+        try:
             return getattr(self.bot.mgr.l, locale)
         except AttributeError:
             return self.bot.mgr.locale.master
@@ -4,7 +4,8 @@ import certifi
 from motor import motor_asyncio as ma
 from typing import TYPE_CHECKING
 from lib.structs import DictProxy
-from .collections import UsersCollection, GuildsCollection
+from .collections import UsersCollection, GuildsCollection, ReleaseFeedCollection, CollectionWrapper
+from .monitoring import DatabaseMetrics, DatabaseCommandListener, ConnectionPoolWaitListener
 
 if TYPE_CHECKING:
     import aiohttp
@@ -22,14 +23,28 @@ class DatabaseProxy:
         self.ses: 'aiohttp.ClientSession' = self.bot.session
         self._env: DictProxy = self.bot.mgr.env
         self._ca_cert: str = certifi.where()
-        self.client: ma.AsyncIOMotorClient = ma.AsyncIOMotorClient(self._env.db_connection,
-                                                                   appname=self.bot.get_dev_name(),
-                                                                   tls=self._env.db_use_tls,
-                                                                   tlsCAFile=self._ca_cert,
-                                                                   tlsAllowInvalidCertificates=False)
+        self.metrics: DatabaseMetrics = DatabaseMetrics(slow_threshold=self._env.db_slow_command_threshold_ms / 1000,
+                                                        slow_samples=self._env.db_slow_command_samples)
+        self.client: ma.AsyncIOMotorClient = ma.AsyncIOMotorClient(
+            self._env.db_connection,
+            appname=self.bot.get_dev_name(),
+            tls=self._env.db_use_tls,
+            tlsCAFile=self._ca_cert,
+            tlsAllowInvalidCertificates=False,
+            maxPoolSize=self._env.db_max_pool_size,
+            minPoolSize=self._env.db_min_pool_size,
+            waitQueueTimeoutMS=self._env.db_wait_queue_timeout_ms,
+            serverSelectionTimeoutMS=self._env.db_server_selection_timeout_ms,
+            event_listeners=[DatabaseCommandListener(self.metrics), ConnectionPoolWaitListener(self.metrics)]
+        )
         self._actual_db: ma.AsyncIOMotorDatabase = self.client.get_database('store' if self._env.production else 'test')
         self.users: UsersCollection = UsersCollection(self)
         self.guilds: GuildsCollection = GuildsCollection(self)
+        self.release_feed: ReleaseFeedCollection = ReleaseFeedCollection(self)
+        # the release feed worker's per-repo poll schedule, see cogs/backend/workers/release_feed.py
+        self.release_feed_schedule: CollectionWrapper = CollectionWrapper(self, 'release_feed_schedule')
+        # the leases splitting the release feed between processes
+        self.release_feed_leases: CollectionWrapper = CollectionWrapper(self, 'release_feed_leases')
 
 
     @property
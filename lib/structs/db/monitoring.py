@@ -0,0 +1,216 @@
+# coding: utf-8
+
+"""
+Instrumentation of the commands sent to MongoDB.
+~~~~~~~~~~~~~~~~~~~
+pymongo event listeners keeping per-collection, per-command latency histograms, failures and slow command samples,
+along with the time spent waiting for a connection from the pool.
+:copyright: (c) 2020-present, statch
+:license: CC BY-NC-ND 4.0, see LICENSE for more details.
+"""
+
+import time
+import bisect
+import threading
+from collections import Counter, deque
+from typing import Optional, NamedTuple
+from pymongo import monitoring
+
+__all__: tuple = ('SlowCommandSample', 'CommandMetrics', 'DatabaseMetrics', 'DatabaseCommandListener',
+                  'ConnectionPoolWaitListener')
+
+# upper bounds of the latency histogram buckets in seconds, the last (implicit) bucket is +Inf
+LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class SlowCommandSample(NamedTuple):
+    finished_at: float
+    collection: str
+    command: str
+    duration: float
+    shape: tuple[str, ...]  # the top-level keys of the command's filter, values are never kept
+    failure: Optional[str]
+
+
+class CommandMetrics:
+    """
+    The metrics of a single command (or of waiting for a connection) on a single collection.
+
+    :param sample_size: The number of most recent latencies to compute the percentiles from
+    """
+
+    __slots__: tuple = ('calls', 'failures', 'latency_buckets', 'latency_sum', 'latencies')
+
+    def __init__(self, sample_size: int = 1024):
+        self.calls: int = 0
+        self.failures: Counter[str] = Counter()
+        self.latency_buckets: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum: float = 0.0
+        self.latencies: deque[float] = deque(maxlen=sample_size)
+
+    def record(self, latency: float, failure: Optional[str] = None) -> None:
+        self.calls += 1
+        self.latency_sum += latency
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.latencies.append(latency)
+        if failure is not None:
+            self.failures[failure] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Get a latency percentile (nearest-rank) out of the most recent calls.
+
+        :param q: The percentile to get, 0-100
+        :return: The latency in seconds, 0.0 if there were no calls yet
+        """
+        if not self.latencies:
+            return 0.0
+        ordered: list[float] = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class DatabaseMetrics:
+    """
+    The registry of :class:`CommandMetrics`, keyed by (collection, command), plus the slowest recent commands.
+    Written to from pymongo's threads, so every access goes through a lock.
+
+    :param slow_threshold: The duration in seconds past which a command is sampled as slow
+    :param slow_samples: The number of most recent slow commands to keep
+    """
+
+    # the key the time spent waiting for a pooled connection is recorded under
+    __pool_wait_key__: tuple[str, str] = ('-', 'pool wait')
+
+    def __init__(self, slow_threshold: float = 0.1, slow_samples: int = 50):
+        self.slow_threshold: float = slow_threshold
+        self.commands: dict[tuple[str, str], CommandMetrics] = {}
+        self.slow: deque[SlowCommandSample] = deque(maxlen=slow_samples)
+        self._lock: threading.Lock = threading.Lock()
+
+    def record(self, collection: str, command: str, latency: float,
+               failure: Optional[str] = None, shape: tuple[str, ...] = ()) -> None:
+        """
+        Record a single command.
+
+        :param collection: The name of the collection, '-' for commands not run against one
+        :param command: The name of the command
+        :param latency: The time the command took in seconds
+        :param failure: The error the command failed with
+        :param shape: The top-level keys of the command's filter
+        """
+        with self._lock:
+            if (metrics := self.commands.get(key := (collection, command))) is None:
+                metrics = self.commands[key] = CommandMetrics()
+            metrics.record(latency, failure)
+            if latency >= self.slow_threshold:
+                self.slow.append(SlowCommandSample(time.time(), collection, command, latency, shape, failure))
+
+    def record_pool_wait(self, latency: float, failure: Optional[str] = None) -> None:
+        self.record(*self.__pool_wait_key__, latency, failure)
+
+    def snapshot(self) -> tuple[dict[tuple[str, str], CommandMetrics], list[SlowCommandSample]]:
+        """
+        Get a consistent copy of the metrics to read from.
+
+        :return: (collection, command) -> metrics, the slow command samples (oldest first)
+        """
+        with self._lock:
+            commands: dict[tuple[str, str], CommandMetrics] = {}
+            for key, metrics in self.commands.items():
+                copied: CommandMetrics = CommandMetrics(metrics.latencies.maxlen)
+                commands[key] = copied
+                copied.calls, copied.latency_sum = metrics.calls, metrics.latency_sum
+                copied.failures = metrics.failures.copy()
+                copied.latency_buckets = metrics.latency_buckets.copy()
+                copied.latencies.extend(metrics.latencies)
+            return commands, list(self.slow)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.commands.clear()
+            self.slow.clear()
+
+
+def _command_shape(command: dict) -> tuple[str, ...]:
+    filter_: Optional[dict] = command.get('filter', command.get('query'))
+    if filter_ is None and (statements := command.get('updates') or command.get('deletes')):
+        filter_ = statements[0].get('q')
+    if filter_ is None and (pipeline := command.get('pipeline')):
+        filter_ = pipeline[0].get('$match')
+    return tuple(filter_) if isinstance(filter_, dict) else ()
+
+
+class DatabaseCommandListener(monitoring.CommandListener):
+    """
+    Record the duration and outcome of every command into :class:`DatabaseMetrics`.
+
+    :param metrics: The metrics to record into
+    """
+
+    def __init__(self, metrics: DatabaseMetrics):
+        self.metrics: DatabaseMetrics = metrics
+        # (connection, request ID) -> (collection, command shape) of the commands in flight
+        self._started: dict[tuple, tuple[str, tuple[str, ...]]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target: object = (event.command.get('collection') if event.command_name == 'getMore'
+                          else event.command.get(event.command_name))
+        self._started[(event.connection_id, event.request_id)] = (target if isinstance(target, str) else '-',
+                                                                  _command_shape(event.command))
+
+    def _finish(self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent,
+                failure: Optional[str] = None) -> None:
+        collection, shape = self._started.pop((event.connection_id, event.request_id), ('-', ()))
+        self.metrics.record(collection, event.command_name, event.duration_micros / 1_000_000, failure, shape)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        failure: dict = event.failure or {}
+        self._finish(event, str(failure.get('codeName') or failure.get('errtype') or 'unknown'))
+
+
+class ConnectionPoolWaitListener(monitoring.ConnectionPoolListener):
+    """
+    Record the time spent waiting to check a connection out of the pool into :class:`DatabaseMetrics`,
+    which tells a saturated pool apart from slow commands.
+
+    :param metrics: The metrics to record into
+    """
+
+    def __init__(self, metrics: DatabaseMetrics):
+        self.metrics: DatabaseMetrics = metrics
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self.metrics.record_pool_wait(event.duration)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self.metrics.record_pool_wait(event.duration, str(event.reason))
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pass
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        pass
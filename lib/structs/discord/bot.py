@@ -13,7 +13,6 @@ import logging
 import aiohttp
 import platform
 import aiofiles
-import itertools
 from sys import version_info
 from dotenv import load_dotenv
 from time import perf_counter
@@ -23,11 +22,12 @@ from lib.structs.discord.context import GitBotContext
 from lib.structs.discord.commands import GitBotCommand, GitBotCommandGroup
 from lib.utils.logging_utils import GitBotLoggingStreamHandler
 from lib.api.github.github import GitHubAPI
+from lib.api.github.scheduler import GitHubTokenScheduler
 from lib.api.carbonara import Carbon
 from lib.api.pypi import PyPIAPI
 from lib.api.crates import CratesIOAPI
 from lib.manager import Manager
-from lib.structs import TypedCache, CacheSchema, SelfHashingCache
+from lib.structs import TypedCache, CacheSchema, SelfHashingCache, PersistentCache, CompactIDMap
 from lib.structs.db import DatabaseProxy
 
 load_dotenv()
@@ -43,12 +43,12 @@ class GitBot(commands.AutoShardedBot):
     pypi: PyPIAPI | None = None
     crates: CratesIOAPI | None = None
     mgr: Manager | None = None
+    persistent_cache: PersistentCache | None = None
     runtime_vars: dict[str, str] = {}
     statch_guild: discord.Guild | None = None
     error_log_channel: discord.TextChannel | None = None
-    __caches__: dict[str, TypedCache | SelfHashingCache] = {
-        'autoconv': TypedCache(CacheSchema(key=int, value=dict)),
-        'locale': TypedCache(CacheSchema(key=int, value=str), maxsize=256),
+    # 'autoconv' and 'locale' are added in _setup_compact_maps, since they need the database and the locales
+    __caches__: dict[str, TypedCache | SelfHashingCache | CompactIDMap] = {
         'carbon': SelfHashingCache(max_age=60 * 60),
         'loc': TypedCache(CacheSchema(key=str, value=(dict, tuple)), maxsize=64, max_age=60 * 7)
     }
@@ -95,28 +95,54 @@ class GitBot(commands.AutoShardedBot):
 
     @property
     def github(self) -> GitHubAPI | None:
-        return next(self.__internal_github_instances_cycle) if self._internal_github_instances else None
+        return self.github_scheduler.pick() if self._internal_github_instances else None
 
     async def _setup_github(self) -> None:
         self._internal_github_instances: tuple[GitHubAPI, ...] = (
             GitHubAPI(self, os.getenv('GITHUB_MAIN'), self.session),
             GitHubAPI(self, os.getenv('GITHUB_SECONDARY'), self.session)
         )
-        self.__internal_github_instances_cycle: itertools.cycle = itertools.cycle(self._internal_github_instances)
+        self.github_scheduler: GitHubTokenScheduler = GitHubTokenScheduler(self._internal_github_instances)
 
     async def _setup_services(self) -> None:
         self.session: aiohttp.ClientSession = aiohttp.ClientSession(loop=self.loop)
         await self._setup_github()
         self.mgr: Manager = Manager(self, self.github)
         self.github.requester = self.get_dev_name(with_python_version=False)
+        self.persistent_cache: PersistentCache = PersistentCache(self.mgr.env.persistent_cache_path,
+                                                                 max_entries=self.mgr.env.persistent_cache_max_entries)
+        for instance in self._internal_github_instances:
+            await instance.attach_persistent_cache(self.persistent_cache)
         self.db: DatabaseProxy = DatabaseProxy(self)
+        await self.db.release_feed.ensure_indexes()
         self.carbon: Carbon = Carbon(self.session)
         self.pypi: PyPIAPI = PyPIAPI(self.session)
         self.crates: CratesIOAPI = CratesIOAPI(self.session)
 
+    async def _setup_compact_maps(self) -> None:
+        self.__caches__['locale'] = CompactIDMap(self.db.users.encode_locale, self.db.users.decode_locale)
+        self.__caches__['autoconv'] = CompactIDMap(self.db.guilds.encode_autoconv_config,
+                                                   self.db.guilds.decode_autoconv_config)
+        await self.reload_compact_maps()
+
+    async def reload_compact_maps(self) -> None:
+        """
+        (Re)load the locale and autoconv maps from the database, picking up the changes made by other processes.
+        Called periodically by the background tasks cog.
+        """
+        start: float = perf_counter()
+        locales: int = await self.db.users.load_locales()
+        autoconv_configs: int = await self.db.guilds.load_autoconv_configs()
+        self.logger.info('Loaded %d user locales and %d guild autoconv configs in %.3fs (%d KiB)',
+                         locales, autoconv_configs, perf_counter() - start,
+                         (self.__caches__['locale'].nbytes + self.__caches__['autoconv'].nbytes) // 1024)
+
     async def get_context(self, message: discord.Message, *, cls=GitBotContext) -> GitBotContext:
         ctx: GitBotContext = await super().get_context(message, cls=cls)
-        await ctx.prepare()
+        # only command invocations (valid or not) need the locale right away, the rest of the messages load it
+        # if and when they're responded to, see Events.on_message
+        if ctx.prefix is not None:
+            await ctx.prepare()
         return ctx
 
     def command(self, *args, **kwargs):
@@ -142,6 +168,7 @@ class GitBot(commands.AutoShardedBot):
             os.mkdir('tmp')
         self._setup_logging()
         await self._setup_services()
+        await self._setup_compact_maps()
         self.logger.setLevel(getattr(logging, self.mgr.env.log_level.upper(), self.mgr.env.log_level))
         self._set_runtime_vars()
         self._setup_uvloop()
@@ -160,6 +187,7 @@ class GitBot(commands.AutoShardedBot):
         await super().close()
         await self.session.close()
         await self.github.session.close()
+        await self.persistent_cache.close()
 
     async def on_ready(self) -> None:
         self.logger.info(f'Bot bootstrap time: {perf_counter() - self.__init_start:.3f}s')
@@ -193,7 +221,7 @@ class GitBot(commands.AutoShardedBot):
         self.logger.info('Reloaded extension: "%s"', name)
 
     def get_cache(self,
-                  cache_name: _CacheNameT) -> TypedCache | SelfHashingCache | None:
+                  cache_name: _CacheNameT) -> TypedCache | SelfHashingCache | CompactIDMap | None:
         """
         Get a cache by name
 
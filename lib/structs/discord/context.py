@@ -11,7 +11,7 @@ import discord
 import enum
 from discord.ext import commands
 from typing import Optional, Any, Sequence
-from lib.typehints import EmbedLike, LocaleDictProxyDef
+from lib.typehints import EmbedLike, LocaleDictProxyDef, GitBotGuild
 from lib.structs import DictProxy
 from lib.structs.discord.embed import GitBotEmbed
 from lib.structs.discord.commands import GitBotCommand, GitBotCommandGroup, GitBotHybridCommandGroup
@@ -38,7 +38,6 @@ class MessageFormattingStyle(enum.Enum):
 
 
 class GitBotContext(commands.Context):
-    l: LocaleDictProxyDef | None
     bot: 'GitBot'
     command: GitBotCommand | GitBotCommandGroup
     check_failure_code: Union[int, 'CheckFailureCode'] | None = None
@@ -53,7 +52,8 @@ class GitBotContext(commands.Context):
         super().__init__(**attrs)
         self.session: ClientSession = self.bot.session
         self.fmt = self.bot.mgr.fmt(self)
-        self.l = None  # noqa
+        self._locale: LocaleDictProxyDef | None = None
+        self._guild_document: tuple[int, Optional[GitBotGuild]] | None = None  # (guilds collection writes, document)
         self.data: Optional[dict] = None  # field used by chained invocations and quick access
         self.invoked_with_stored: bool = False
         self.gh: 'GitHubAPI' = self.bot.github  # overwritten in bot.py before_invoke hook
@@ -69,6 +69,23 @@ class GitBotContext(commands.Context):
             case _:
                 return content
 
+    @property
+    def l(self) -> LocaleDictProxyDef:  # noqa
+        """
+        The locale of the invoking user, loaded by :meth:`prepare` - which is only awaited once it's clear that
+        the message is going to be responded to, so that plain chat messages never have to look it up.
+        Until then, it's resolved from the locale cache alone, falling back to the master locale.
+        """
+        if self._locale is not None:
+            return self._locale
+        if cached := self.bot.get_cache_value('locale', self.author.id):
+            return getattr(self.bot.mgr.l, cached, self.bot.mgr.locale.master)
+        return self.bot.mgr.locale.master
+
+    @l.setter
+    def l(self, locale: LocaleDictProxyDef) -> None:  # noqa
+        self._locale = locale
+
     @property
     def lp(self) -> DictProxy:
         """
@@ -139,7 +156,26 @@ class GitBotContext(commands.Context):
         return await GitBotEmbed.success(text, **kwargs).send(self)
 
     async def prepare(self) -> None:
-        self.l = await self.bot.db.users.get_locale(self)  # noqa
+        """
+        Load the locale of the invoking user, unless it's already loaded.
+        """
+        if self._locale is None:
+            self._locale = await self.bot.db.users.get_locale(self)
+
+    async def get_guild_document(self) -> Optional[GitBotGuild]:
+        """
+        Get the document of the guild the context is in, fetched once per invocation
+        and shared between the checks and the command - unless the guilds collection is written to in the meantime.
+        The returned document shouldn't be modified.
+
+        :return: The document, None if the guild doesn't have one (or the context isn't in a guild)
+        """
+        if self.guild is None:
+            return None
+        if self._guild_document is None or self._guild_document[0] != self.bot.db.guilds.writes:
+            writes: int = self.bot.db.guilds.writes
+            self._guild_document = (writes, await self.bot.db.guilds.get_document(self))
+        return self._guild_document[1]
 
     async def group_help(self, subcommand_check: bool = True):
         """
@@ -0,0 +1,207 @@
+"""
+Webhook delivery queue implementation for GitBot
+~~~~~~~~~~~~~~~~~~~
+A queue of webhook messages that packs embeds bound for the same webhook into as few messages as possible
+:copyright: (c) 2020-present statch
+:license: CC BY-NC-ND 4.0, see LICENSE for more details.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import aiohttp
+import discord
+from collections import deque
+from typing import Optional, NamedTuple
+
+__all__: tuple = ('WebhookDeliveryQueue',)
+
+_logger: logging.Logger = logging.getLogger('bot')
+
+
+class _QueuedEmbed(NamedTuple):
+    embed: discord.Embed
+    text: Optional[str]
+    username: Optional[str]
+    avatar_url: Optional[str]
+    future: asyncio.Future
+
+
+class WebhookDeliveryQueue:
+    """
+    A delivery queue keyed by webhook. Embeds enqueued for the same webhook within a short window are packed
+    into as few messages as Discord allows, and every webhook is served by its own task, so that a slow
+    or rate-limited webhook doesn't hold up the others.
+
+    Every enqueued embed gets a future that resolves to True once it's delivered,
+    or to the exception that made its delivery fail for good.
+
+    :param session: The session to send the messages with
+    :param window: The number of seconds to wait for more embeds before sending the first message of a webhook
+    :param concurrency: The max number of messages to be sending at once, across all webhooks
+    :param max_attempts: The max number of attempts to send a message that keeps failing with transient errors
+    :param backoff: The delay before the first retry in seconds, doubled with every following one
+    :param rate: The number of messages a single webhook can send per period
+    :param per: The rate limit period in seconds
+    """
+
+    __max_embeds__: int = 10
+    __max_embed_chars__: int = 6000
+
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 window: float = 1.5,
+                 concurrency: int = 8,
+                 max_attempts: int = 4,
+                 backoff: float = 2.0,
+                 rate: int = 5,
+                 per: float = 2.0):
+        self.session: aiohttp.ClientSession = session
+        self.window: float = window
+        self.max_attempts: int = max_attempts
+        self.backoff: float = backoff
+        self.rate: int = rate
+        self.per: float = per
+        self.messages_sent: int = 0
+        self.embeds_sent: int = 0
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self._queues: dict[str, deque[_QueuedEmbed]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._sent_at: dict[str, deque[float]] = {}
+
+    def enqueue(self,
+                hook: str,
+                embed: discord.Embed,
+                text: Optional[str] = None,
+                username: Optional[str] = None,
+                avatar_url: Optional[str] = None) -> asyncio.Future:
+        """
+        Queue an embed to be sent through a webhook.
+
+        :param hook: The webhook, the part of the URL after /api/webhooks/
+        :param embed: The embed to send
+        :param text: The message content to send along with it, embeds with different content aren't packed together
+        :param username: The username to send the message with
+        :param avatar_url: The avatar URL to send the message with
+        :return: The future of the embed's delivery
+        """
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(hook, deque()).append(_QueuedEmbed(embed, text, username, avatar_url, future))
+        if hook not in self._tasks:
+            self._tasks[hook] = asyncio.create_task(self._deliver(hook))
+        return future
+
+    @staticmethod
+    def is_permanent_failure(error: Optional[BaseException]) -> bool:
+        """
+        Check if a delivery failed in a way that retrying won't fix - the webhook is gone or the message was rejected.
+
+        :param error: The exception the delivery failed with
+        :return: Whether the failure is permanent
+        """
+        return isinstance(error, discord.errors.HTTPException) and error.status != 429 and error.status < 500
+
+    async def drain(self) -> None:
+        """
+        Wait until everything queued so far (and anything queued in the meantime) is delivered or has failed.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _take_batch(self, queue: deque[_QueuedEmbed]) -> list[_QueuedEmbed]:
+        batch: list[_QueuedEmbed] = [queue.popleft()]
+        chars: int = len(batch[0].embed)
+        while (queue and len(batch) < self.__max_embeds__ and queue[0].text == batch[0].text
+               and chars + len(queue[0].embed) <= self.__max_embed_chars__):
+            chars += len(queue[0].embed)
+            batch.append(queue.popleft())
+        return batch
+
+    async def _wait_for_bucket(self, hook: str) -> None:
+        sent_at: deque[float] = self._sent_at.setdefault(hook, deque(maxlen=self.rate))
+        if len(sent_at) == self.rate and (delay := sent_at[0] + self.per - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _deliver(self, hook: str) -> None:
+        batch: list[_QueuedEmbed] = []
+        error: Optional[BaseException] = None
+        try:
+            await asyncio.sleep(self.window)
+            while self._queues.get(hook):
+                batch: list[_QueuedEmbed] = self._take_batch(self._queues[hook])
+                result: bool | BaseException = await self._send(hook, batch)
+                if self.is_permanent_failure(result):  # the rest would fail the same way
+                    batch.extend(self._queues[hook])
+                    self._queues[hook].clear()
+                for item in batch:
+                    if item.future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        item.future.set_exception(result)
+                    else:
+                        item.future.set_result(result)
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        except Exception as e:  # e.g. a malformed webhook URL - _send only handles the errors of the request itself
+            error = e
+        finally:
+            # no awaits since the queue was last seen empty, so nothing could've been queued in between
+            queued: deque[_QueuedEmbed] = self._queues.pop(hook, deque())
+            self._tasks.pop(hook, None)
+            if error is not None:
+                # nothing is left to deliver these, they'd otherwise never resolve
+                dropped: list[asyncio.Future] = [item.future for item in (*batch, *queued) if not item.future.done()]
+                for future in dropped:
+                    if isinstance(error, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(error)
+                if not isinstance(error, asyncio.CancelledError):
+                    _logger.error('Webhook delivery task failed, %d embeds were not delivered: %r',
+                                  len(dropped), error, exc_info=error)
+            if (sent_at := self._sent_at.get(hook)) is not None and (not sent_at
+                                                                     or sent_at[-1] + self.per < time.monotonic()):
+                del self._sent_at[hook]
+
+    async def _post(self, hook: str, batch: list[_QueuedEmbed]) -> None:
+        """
+        Send a single message, raising on failure. Overridden by the load benchmarks to send to a stand-in.
+        """
+        webhook: discord.Webhook = discord.Webhook.from_url('https://discord.com/api/webhooks/' + hook,
+                                                            session=self.session)
+        await webhook.send(batch[0].text, embeds=[item.embed for item in batch],
+                           username=batch[0].username, avatar_url=batch[0].avatar_url)
+
+    async def _send(self, hook: str, batch: list[_QueuedEmbed]) -> bool | BaseException:
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2))
+            await self._wait_for_bucket(hook)
+            try:
+                async with self._semaphore:
+                    await self._post(hook, batch)
+            except discord.errors.HTTPException as e:
+                if self.is_permanent_failure(e):
+                    return e
+                error: BaseException = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error: BaseException = e
+            else:
+                self._sent_at[hook].append(time.monotonic())
+                self.messages_sent += 1
+                self.embeds_sent += len(batch)
+                return True
+            _logger.debug('Webhook delivery attempt %d/%d of %d embeds failed: %s',
+                          attempt + 1, self.max_attempts, len(batch), error)
+        _logger.warning('Giving up on delivering %d embeds through a webhook after %d attempts: %s',
+                        len(batch), self.max_attempts, error)
+        return error
+
+    def __len__(self) -> int:
+        return sum(map(len, self._queues.values()))
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} pending={len(self)} webhooks={len(self._tasks)}>'
@@ -36,6 +36,8 @@ __all__: tuple = (
     'CommandGroupHelp',
     'CratesIOCrate',
     'ReleaseFeedItemMention',
+    'ReleaseFeedSubscription',
+    'ReleaseFeedDocument',
     'GitbotRepoConfig',
     'LocaleDictProxyDef',
     'GraphQLQueriesDirProxyDef'
@@ -6,7 +6,9 @@ __all__: tuple = (
     'ReleaseFeedItem',
     'ReleaseFeed',
     'TagNameUpdateData',
-    'ReleaseFeedItemMention'
+    'ReleaseFeedItemMention',
+    'ReleaseFeedSubscription',
+    'ReleaseFeedDocument'
 )
 
 
@@ -61,3 +63,46 @@ class TagNameUpdateData(NamedTuple):
     rfi: ReleaseFeedItem
     rfr: ReleaseFeedRepo
     tag: TagName
+
+
+class ReleaseFeedSubscription(NamedTuple):
+    """
+    A single guild's subscription to a repo, as stored in the release feed worker's per-cycle repo index
+
+    Attributes
+    ----------
+    guild_id int: The ID of the guild the subscription belongs to
+    rfi_index int: The index of the RFI in the guild's feed
+    repo_index int: The index of the RFR in the RFI's repos
+    tag TagName: The last recorded tag name of the repo's release
+    """
+
+    guild_id: int
+    rfi_index: int
+    repo_index: int
+    tag: TagName
+
+
+class ReleaseFeedDocument(TypedDict):
+    """
+    A single document of the normalized release feed collection - a channel's subscription to a repo,
+    or the channel itself if repo is None
+
+    Attributes
+    ----------
+    guild_id int: The ID of the guild the channel belongs to
+    cid int: The channel ID
+    hook str: The webhook pointing to the channel
+    mention ReleaseFeedItemMention: The mention to send along with new releases
+    repo str: The lowercase name of the repo, None for the channel document
+    name str: The name of the repo as it was added
+    tag str: The last recorded tag name of the repo's release
+    """
+
+    guild_id: int
+    cid: int
+    hook: str
+    mention: Optional[ReleaseFeedItemMention]
+    repo: Optional[str]
+    name: Optional[str]
+    tag: Optional[TagName]
@@ -30,11 +30,12 @@ def bot_can_manage_release_feed_channels():
     """
 
     async def pred(ctx: 'GitBotContext') -> bool:
-        rf: Optional['ReleaseFeed'] = (await ctx.bot.db.guilds.find_one({'_id': ctx.guild.id}) or {}).get('feed', None)
+        rf: 'ReleaseFeed' = await ctx.bot.db.release_feed.get_feed(ctx.guild.id, await ctx.get_guild_document())
         if rf:
             for rfi in rf:
-                channel: discord.TextChannel = await ctx.bot.fetch_channel(rfi['cid'])
-                if not channel.permissions_for(ctx.guild.me).manage_channels:
+                # channels that no longer exist are dropped from the feed by the commands themselves
+                channel: Optional[discord.abc.GuildChannel] = ctx.guild.get_channel(rfi['cid'])
+                if channel is not None and not channel.permissions_for(ctx.guild.me).manage_channels:
                     ctx.check_failure_code = structs.CheckFailureCode.MISSING_RELEASE_FEED_CHANNEL_PERMISSIONS_GUILDWIDE
                     return False
         return True
@@ -48,7 +49,7 @@ def guild_has_release_feeds():
     """
 
     async def pred(ctx: 'GitBotContext') -> bool:
-        rf: Optional['ReleaseFeed'] = (await ctx.bot.db.guilds.find_one({'_id': ctx.guild.id}) or {}).get('feed', None)
+        rf: 'ReleaseFeed' = await ctx.bot.db.release_feed.get_feed(ctx.guild.id, await ctx.get_guild_document())
         if not rf:
             ctx.check_failure_code = structs.CheckFailureCode.NO_GUILD_RELEASE_FEEDS
             return False
@@ -0,0 +1,56 @@
+from html.parser import HTMLParser
+from typing import Optional
+
+__all__: tuple[str, ...] = ('html_to_text',)
+
+
+class _TextExtractor(HTMLParser):
+    # tags whose contents aren't text meant to be read
+    __skipped_tags__: frozenset[str] = frozenset({'script', 'style', 'template'})
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.length: int = 0
+        self._skip_depth: int = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in self.__skipped_tags__:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.__skipped_tags__ and self._skip_depth:
+            self._skip_depth -= 1
+
+    def unknown_decl(self, data: str) -> None:
+        if data.startswith('CDATA['):
+            self.handle_data(data[6:])
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self.parts.append(data)
+            self.length += len(data)
+
+
+def html_to_text(html: str, limit: Optional[int] = None, chunk_size: int = 4096) -> str:
+    """
+    Get the text of an HTML document with whitespace collapsed, like ' '.join(BeautifulSoup(html).getText().split()),
+    using the standard library's streaming parser.
+
+    :param html: The HTML to convert
+    :param limit: Stop parsing once the text is longer than this (the result then being longer than limit too),
+                  useful when the text is going to be truncated anyway
+    :param chunk_size: The number of characters to feed the parser at a time when there's a limit
+    :return: The text
+    """
+    extractor: _TextExtractor = _TextExtractor()
+    if limit is None:
+        extractor.feed(html)
+    else:
+        for i in range(0, len(html), chunk_size):
+            extractor.feed(html[i:i + chunk_size])
+            # the raw length is an upper bound of the collapsed one, so only collapse when it could be enough
+            if extractor.length > limit and len(' '.join(''.join(extractor.parts).split())) > limit:
+                break
+    extractor.close()
+    return ' '.join(''.join(extractor.parts).split())
@@ -22,4 +22,6 @@ GITHUB_REPO_GIT_URL_RE: re.Pattern = re.compile(r'(?:https?://)?github\.com/(?P<
 GITHUB_LINES_URL_RE: re.Pattern = re.compile(r'(?:https?://)?(?P<platform>github)\.com/(?P<repo>[a-zA-Z0-9-_]+/[A-Za-z0-9_.-]+)/blob/(.+?)/(.+?)#L(?P<first_line_number>\d+)[-~]?L?(?P<second_line_number>\d*)', re.IGNORECASE)
 GITLAB_LINES_URL_RE: re.Pattern = re.compile(r'(?:https?://)?(?P<platform>gitlab)\.com/(?P<repo>[a-zA-Z0-9-_]+/[A-Za-z0-9_.-]+)/-/blob/(.+?)/(.+?)#L(?P<first_line_number>\d+)-?(?P<second_line_number>\d*)', re.IGNORECASE)
 GITHUB_COMMIT_URL_RE: re.Pattern = re.compile(r'(?:https?://)?github\.com/(?P<repo>[a-zA-Z0-9-_]+/[A-Za-z0-9_.-]+)/commit/(?P<oid>\b([a-f0-9]{40})\b)')
+# a cheap first pass over every message, anything that could be one of the URLs handled automatically matches it
+AUTOMATIC_CONVERSION_PREFILTER_RE: re.Pattern = re.compile(r'git(?:hub|lab)\.com/', re.IGNORECASE)
 GITHUB_REPO_TREE_RE: re.Pattern = re.compile(r'(?:https?://)?github\.com/(?P<repo>[\w-]+/[\w-]+)/tree/(?P<ref>[\w-]+)/(?P<path>[\w/-]+)')
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+A one-use script moving the release feeds embedded in guild documents into the normalized release_feed collection,
+one document per (guild, channel, repo) subscription, plus one per channel with repo set to None.
+
+Guilds are streamed and written in chunks, so the script can be run against a live database and re-run if interrupted:
+a guild's normalized documents are rewritten from scratch, and its embedded feed is only unset
+if it didn't change in the meantime - otherwise the guild is left for the next run.
+"""
+
+from pymongo import MongoClient, ASCENDING, InsertOne, DeleteMany, UpdateOne
+from pymongo.collection import Collection
+from dotenv import load_dotenv
+from os import getenv
+
+load_dotenv()
+
+CHUNK_SIZE: int = 500
+
+store = MongoClient(getenv('DB_CONNECTION'))['store']
+guilds: Collection = store['guilds']
+release_feed: Collection = store['release_feed']
+
+release_feed.create_index([('repo', ASCENDING)])
+release_feed.create_index([('guild_id', ASCENDING), ('cid', ASCENDING), ('repo', ASCENDING)], unique=True)
+release_feed.create_index([('guild_id', ASCENDING), ('hook', ASCENDING)])
+
+
+def to_documents(guild_id: int, feed: list) -> list[dict]:
+    documents: list[dict] = []
+    for rfi in feed:
+        base: dict = {'guild_id': guild_id, 'cid': rfi['cid'], 'hook': rfi['hook'], 'mention': rfi.get('mention')}
+        documents.append({**base, 'repo': None, 'name': None, 'tag': None})
+        documents.extend({**base, 'repo': rfr['name'].lower(), 'name': rfr['name'], 'tag': rfr['tag']}
+                         for rfr in rfi['repos'])
+    return documents
+
+
+def flush(feed_ops: list, guild_ops: list) -> int:
+    if not guild_ops:
+        return 0
+    release_feed.bulk_write(feed_ops, ordered=True)  # a guild's documents have to be cleared before they're inserted
+    return guilds.bulk_write(guild_ops, ordered=False).modified_count
+
+
+feed_ops: list = []
+guild_ops: list = []
+seen: int = 0
+migrated: int = 0
+
+for g in guilds.find({'feed': {'$exists': True}}, {'feed': 1}, batch_size=CHUNK_SIZE):
+    seen += 1
+    feed_ops.append(DeleteMany({'guild_id': g['_id']}))
+    feed_ops.extend(InsertOne(document) for document in to_documents(g['_id'], g['feed']))
+    guild_ops.append(UpdateOne({'_id': g['_id'], 'feed': g['feed']}, {'$unset': {'feed': ''}}))
+    if len(guild_ops) >= CHUNK_SIZE:
+        migrated += flush(feed_ops, guild_ops)
+        feed_ops, guild_ops = [], []
+        print(f'Migrated {migrated}/{seen}')
+
+migrated += flush(feed_ops, guild_ops)
+print(f'Migrated {migrated}/{seen}' + (f', {seen - migrated} changed while migrating - run again' if seen - migrated else ''))